@@ -1,23 +1,25 @@
 import os
-from dotenv import load_dotenv
 
-# Load shared .env FIRST
-load_dotenv()
+
+def _env_flag(name, default="true"):
+    return os.getenv(name, default).lower() == "true"
+
+
+if _env_flag("LOAD_DOTENV"):
+    from dotenv import load_dotenv
+
+    # Load shared .env FIRST
+    load_dotenv()
 
 # Set service identity (override shared .env)
 os.environ.setdefault("SERVICE_NAME", "auth-service")
 from flask import Flask, request, jsonify
-from flask_migrate import Migrate
 from db import db
 import models
-from routes import auth_routes
-from flask_cors import CORS
 from werkzeug.exceptions import HTTPException
 from datetime import datetime, timezone
 from notify import notify_event
-from prometheus_flask_exporter import PrometheusMetrics
 
-app = Flask(__name__)
 
 def _get_cors_origins():
     raw_origins = os.getenv(
@@ -26,52 +28,90 @@ def _get_cors_origins():
     )
     return [origin.strip() for origin in raw_origins.split(",") if origin.strip()]
 
-CORS(
-    app,
-    origins=_get_cors_origins(),
-    allow_headers="*",
-    methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    supports_credentials=False,
-)
-
-metrics = PrometheusMetrics(app)
-
-app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL")
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-
-db.init_app(app)
-migrate = Migrate(app, db)
-
-app.register_blueprint(auth_routes, url_prefix="/api")
-
-@app.errorhandler(Exception)
-def handle_unhandled_exception(e):
-    print("UNHANDLED ERROR:", repr(e))
-    # Let Flask handle HTTP errors normally
-    if isinstance(e, HTTPException):
-        return e
-
-    notify_event(
-        event_type="server_error",
-        dedupe_key=f"{request.method}:{request.path}:{request.remote_addr}",
-        subject="Unhandled exception (500)",
-        body=(
-            f"ts={datetime.now(timezone.utc).isoformat()} "
-            f"service={os.getenv('SERVICE_NAME')} "
-            f"event=server_error status=500 "
-            f"method={request.method} path={request.path} "
-            f"ip={request.remote_addr} "
-            f"error={type(e).__name__}"
-        ),
+
+def create_app(database_uri=None):
+    """
+    Builds the auth-service app. Optional integrations are imported only when
+    enabled, and JWT keys are loaded on first use (utils/keys.py), so worker
+    and test processes start quickly.
+    """
+    from flask_cors import CORS
+    from routes import auth_routes, jwks_routes, internal_routes
+
+    app = Flask(__name__)
+
+    CORS(
+        app,
+        origins=_get_cors_origins(),
+        allow_headers="*",
+        methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        supports_credentials=False,
     )
 
-    return jsonify({"error": "Internal Server Error"}), 500
+    app.config["ENABLE_METRICS"] = _env_flag("ENABLE_METRICS")
+    if app.config["ENABLE_METRICS"]:
+        from prometheus_flask_exporter import PrometheusMetrics
+
+        PrometheusMetrics(app)
+
+    if database_uri is None:
+        database_uri = os.getenv("DATABASE_URL")
+
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    db.init_app(app)
+
+    # Only the `flask db` CLI needs Flask-Migrate (and alembic)
+    if _env_flag("ENABLE_MIGRATIONS"):
+        from flask_migrate import Migrate
 
-@app.get("/health")
-def health():
-    return {"status": "ok"}
+        Migrate(app, db)
+
+    app.register_blueprint(auth_routes, url_prefix="/api")
+    app.register_blueprint(jwks_routes)
+    app.register_blueprint(internal_routes, url_prefix="/internal")
+
+    @app.cli.command("prune-sessions")
+    def prune_sessions_command():
+        """Delete expired refresh sessions; meant to run periodically (cron)."""
+        from routes import prune_refresh_sessions
+
+        batch_size = int(os.getenv("SESSION_PRUNE_BATCH_SIZE", "1000"))
+        print(f"pruned {prune_refresh_sessions(batch_size)} expired refresh sessions")
+
+    @app.errorhandler(Exception)
+    def handle_unhandled_exception(e):
+        print("UNHANDLED ERROR:", repr(e))
+        # Let Flask handle HTTP errors normally
+        if isinstance(e, HTTPException):
+            return e
+
+        notify_event(
+            event_type="server_error",
+            dedupe_key=f"{request.method}:{request.path}:{request.remote_addr}",
+            subject="Unhandled exception (500)",
+            body=(
+                f"ts={datetime.now(timezone.utc).isoformat()} "
+                f"service={os.getenv('SERVICE_NAME')} "
+                f"event=server_error status=500 "
+                f"method={request.method} path={request.path} "
+                f"ip={request.remote_addr} "
+                f"error={type(e).__name__}"
+            ),
+        )
+
+        return jsonify({"error": "Internal Server Error"}), 500
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    return app
+
+
+app = create_app() if os.getenv("DATABASE_URL") else None
 
 if __name__ == "__main__":
     debug_mode = os.getenv("FLASK_DEBUG", "0") == "1"
     app.run(host="0.0.0.0", port=5000, debug=debug_mode)
-
@@ -0,0 +1,48 @@
+# Production WSGI server config for auth-service
+#   gunicorn -c gunicorn.conf.py app:app
+# Every setting can be overridden through the environment.
+import os
+import multiprocessing
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Serving never needs the `flask db` CLI; skip importing Flask-Migrate/alembic
+os.environ.setdefault("ENABLE_MIGRATIONS", "false")
+
+# CPU-bound work (password hashing) runs in the hashing process pool,
+# so a modest number of threaded workers is enough here.
+workers = int(os.getenv("GUNICORN_WORKERS", str(multiprocessing.cpu_count() + 1)))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Recycle workers periodically to cap slow memory growth
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "500"))
+
+# Import the app (config, keys, DB engine setup) once in the master
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is imported and before any
+    # worker is forked, so workers inherit already-parsed signing keys
+    from utils.keys import get_keyring, is_test_mode
+
+    if not is_test_mode():
+        get_keyring().signing_key()
+
+
+def post_fork(server, worker):
+    # Pooled DB connections must never be shared across processes
+    from db import db
+
+    app = server.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -3,6 +3,10 @@ from db import db
 
 class User(db.Model):
     __tablename__ = "users"
+    __table_args__ = (
+        # Keyset pagination for the admin user listing
+        db.Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -21,3 +25,44 @@ class User(db.Model):
         nullable=False
     )
 
+
+
+class RefreshSession(db.Model):
+    __tablename__ = "refresh_sessions"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    # SHA-256 of the refresh token; the raw token is never stored
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)
+
+    created_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        nullable=False
+    )
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+class RevokedToken(db.Model):
+    __tablename__ = "revoked_tokens"
+
+    # Monotonic id doubles as the sync position for consumers
+    id = db.Column(db.Integer, primary_key=True)
+
+    jti = db.Column(db.String(64), unique=True, nullable=False)
+
+    # Same as the token's exp; rows are useless (and pruned) after this
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    created_at = db.Column(
+        db.DateTime,
+        default=datetime.utcnow,
+        nullable=False
+    )
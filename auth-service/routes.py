@@ -1,43 +1,112 @@
 # ===== Imports =====
 from functools import wraps
 import os
+import io
+import csv
+import json
+import base64
+import binascii
+import hmac
+import hashlib
+import secrets
 import jwt
 from datetime import datetime, timedelta, UTC
-from flask import Blueprint, request, jsonify
-from werkzeug.security import check_password_hash
-from werkzeug.security import generate_password_hash
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from sqlalchemy import select, insert, delete, tuple_
+from sqlalchemy.exc import IntegrityError
 from db import db
-from models import User
-from pathlib import Path
+from models import User, RefreshSession, RevokedToken
 from notify import notify_event
+from utils.hashing import hashing_executor, HashingBusy
+from utils.jwt_utils import encode_payload, decode_token, jwks_document
+from utils.revocation import RevocationList
 
 # Blueprint
 auth_routes = Blueprint("auth_routes", __name__)
 
+# Served at the root (not under /api) so consumers find it at the standard path
+jwks_routes = Blueprint("jwks_routes", __name__)
+
+# Service-to-service endpoints; mounted at /internal, not proxied by ui-gateway
+internal_routes = Blueprint("internal_routes", __name__)
+
+JWKS_MAX_AGE_SECONDS = int(os.getenv("JWKS_MAX_AGE_SECONDS", "300"))
+
+
+@jwks_routes.get("/.well-known/jwks.json")
+def jwks():
+    body, etag = jwks_document()
+
+    resp = Response(body, status=200, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = f"public, max-age={JWKS_MAX_AGE_SECONDS}"
+
+    # Answers If-None-Match with 304 so consumers can refresh cheaply
+    return resp.make_conditional(request)
+
 # ===== JWT CONFIG =====
-BASE_DIR = Path(__file__).resolve().parent
+# Keys, algorithm and kid headers live in utils/jwt_utils.py + utils/keys.py
 JWT_EXPIRY_HOURS = 1
+REFRESH_TOKEN_EXPIRY_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRY_DAYS", "14"))
 
-IS_TEST = (
-    os.getenv("TESTING") == "true"
-    or os.getenv("CI") == "true"
-    or os.getenv("DOCKER") == "true"
-)
+def _issue_access_token(user_id, role):
+    payload = {
+        "sub": str(user_id),
+        "role": role,
+        "exp": datetime.now(UTC) + timedelta(hours=JWT_EXPIRY_HOURS)
+    }
 
-if IS_TEST:
-    # CI / pytest
-    JWT_ALGORITHM = "HS256"
-    PRIVATE_KEY = os.getenv("JWT_SECRET", "unit-test-secret")
-    PUBLIC_KEY = PRIVATE_KEY
-else:
-    # Local dev / production
-    JWT_ALGORITHM = "ES256"
+    try:
+        return encode_payload(payload)
+    except Exception as e:
+        print("JWT ERROR:", repr(e))
+        raise
 
-    with open(BASE_DIR / "ec_private.pem", "rb") as f:
-        PRIVATE_KEY = f.read()
 
-    with open(BASE_DIR / "ec_public.pem", "rb") as f:
-        PUBLIC_KEY = f.read()
+def _hash_refresh_token(refresh_token):
+    # Refresh tokens are high-entropy random values, so a fast digest is enough
+    return hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()
+
+
+def prune_refresh_sessions(batch_size=1000):
+    """
+    Deletes expired refresh sessions in batches; returns how many went.
+    Meant to run periodically (`flask prune-sessions`).
+    """
+    removed = 0
+    while True:
+        ids = db.session.execute(
+            select(RefreshSession.id)
+            .where(RefreshSession.expires_at <= datetime.utcnow())
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return removed
+        db.session.execute(delete(RefreshSession).where(RefreshSession.id.in_(ids)))
+        db.session.commit()
+        removed += len(ids)
+
+
+def _create_refresh_session(user_id):
+    refresh_token = secrets.token_urlsafe(32)
+
+    # This user's expired sessions can never be used again (indexed by user)
+    db.session.execute(
+        delete(RefreshSession)
+        .where(RefreshSession.user_id == user_id, RefreshSession.expires_at <= datetime.utcnow())
+    )
+    db.session.add(RefreshSession(
+        user_id=user_id,
+        token_hash=_hash_refresh_token(refresh_token),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRY_DAYS)
+    ))
+    db.session.commit()
+    return refresh_token
+
+
+def _busy_response():
+    # Password hashing queue is full: shed load instead of queueing more KDF work
+    return jsonify({"message": "Service busy, please retry"}), 503, {"Retry-After": "1"}
 
 
 # LOGIN API (Authentication)
@@ -56,7 +125,12 @@ def login():
 
     user = User.query.filter_by(username=username).first()
 
-    if not user or not check_password_hash(user.password_hash, password):
+    try:
+        password_ok = bool(user) and hashing_executor.verify_password(password, user.password_hash)
+    except HashingBusy:
+        return _busy_response()
+
+    if not password_ok:
         notify_event(
             event_type="security_login_failed",
             dedupe_key=f"{username}:{request.remote_addr}",
@@ -70,17 +144,8 @@ def login():
         )
         return jsonify({"message": "Invalid credentials"}), 401
 
-    payload = {
-        "sub": str(user.id),
-        "role": user.role,
-        "exp": datetime.now(UTC) + timedelta(hours=JWT_EXPIRY_HOURS)
-    }
-
-    try:
-        token = jwt.encode(payload, PRIVATE_KEY, algorithm=JWT_ALGORITHM)
-    except Exception as e:
-        print("JWT ERROR:", repr(e))
-        raise
+    token = _issue_access_token(user.id, user.role)
+    refresh_token = _create_refresh_session(user.id)
 
     notify_event(
         event_type="auth_login",
@@ -96,10 +161,122 @@ def login():
 
     return jsonify({
         "access_token": token,
+        "refresh_token": refresh_token,
         "token_type": "Bearer",
         "role": user.role
     }), 200
 
+# TOKEN REFRESH API
+# One indexed lookup + one signature; no password KDF
+@auth_routes.route("/token/refresh", methods=["POST"])
+def refresh_access_token():
+    data = request.get_json(silent=True)
+    refresh_token = data.get("refresh_token") if isinstance(data, dict) else None
+
+    if not refresh_token or not isinstance(refresh_token, str):
+        return jsonify({"message": "Missing refresh token"}), 400
+
+    row = db.session.execute(
+        select(RefreshSession.user_id, RefreshSession.expires_at, User.role)
+        .join(User, User.id == RefreshSession.user_id)
+        .where(RefreshSession.token_hash == _hash_refresh_token(refresh_token))
+    ).first()
+
+    if not row or row.expires_at <= datetime.utcnow():
+        notify_event(
+            event_type="security_refresh_failed",
+            dedupe_key=f"refresh:{request.remote_addr}",
+            subject="Token refresh failed",
+            body=(
+                f"ts={datetime.now(UTC).isoformat()} "
+                f"service=auth-service "
+                f"event=security_refresh_failed "
+                f"ip={request.remote_addr}"
+            ),
+        )
+        return jsonify({"message": "Invalid refresh token"}), 401
+
+    return jsonify({
+        "access_token": _issue_access_token(row.user_id, row.role),
+        "token_type": "Bearer",
+        "role": row.role
+    }), 200
+
+# ===== TOKEN REVOCATION =====
+REVOCATIONS_PAGE_SIZE = 10000
+
+
+def _epoch(dt):
+    return dt.replace(tzinfo=UTC).timestamp()
+
+
+def _fetch_revocations(since_id):
+    rows = db.session.execute(
+        select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+        .where(RevokedToken.id > since_id, RevokedToken.expires_at > datetime.utcnow())
+        .order_by(RevokedToken.id)
+        .limit(REVOCATIONS_PAGE_SIZE)
+    ).all()
+
+    last_id = rows[-1].id if rows else since_id
+    return last_id, [(r.jti, _epoch(r.expires_at)) for r in rows]
+
+
+revocations = RevocationList(
+    _fetch_revocations,
+    sync_seconds=int(os.getenv("REVOCATION_SYNC_SECONDS", "5")),
+)
+
+
+def _revoke_token(decoded):
+    jti = decoded.get("jti")
+    exp = decoded.get("exp")
+    if not jti or not exp:
+        return
+
+    expires_at = datetime.fromtimestamp(exp, UTC).replace(tzinfo=None)
+    now = datetime.utcnow()
+
+    if not db.session.execute(select(RevokedToken.id).where(RevokedToken.jti == jti)).first():
+        db.session.add(RevokedToken(jti=jti, expires_at=expires_at))
+
+    # Expired rows can never match a live token again
+    db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at < now))
+    db.session.commit()
+
+    revocations.add(jti, float(exp))
+
+
+def _internal_caller_ok():
+    # Shared secret between the services. Unset means no service is
+    # configured to call us, so the internal API stays closed
+    expected = os.getenv("INTERNAL_API_TOKEN", "")
+    supplied = request.headers.get("X-Internal-Token", "")
+    return bool(expected) and hmac.compare_digest(supplied.encode(), expected.encode())
+
+
+@internal_routes.get("/revocations")
+def list_revocations():
+    """
+    Incremental revocation feed for other services: returns revocations with
+    id > since, oldest first, plus the id to pass as `since` next time.
+    Callers must send the shared INTERNAL_API_TOKEN as X-Internal-Token.
+    """
+    if not _internal_caller_ok():
+        return jsonify({"message": "Forbidden"}), 403
+
+    try:
+        since = max(0, int(request.args.get("since", "0")))
+    except ValueError:
+        return jsonify({"message": "Invalid since"}), 400
+
+    last_id, rows = _fetch_revocations(since)
+    return jsonify({
+        "last_id": last_id,
+        "revocations": [{"jti": jti, "exp": exp} for jti, exp in rows]
+    }), 200
+
+
 # AUTH MIDDLEWARE
 def token_required(f):
     @wraps(f)
@@ -112,13 +289,16 @@ def token_required(f):
         token = auth_header.split(" ")[1]
 
         try:
-            decoded = jwt.decode(token, PUBLIC_KEY, algorithms=[JWT_ALGORITHM])
+            decoded = decode_token(token)
             request.user = decoded
         except jwt.ExpiredSignatureError:
             return jsonify({"message": "Token expired"}), 401
         except jwt.InvalidTokenError:
             return jsonify({"message": "Invalid token"}), 401
 
+        if revocations.is_revoked(decoded.get("jti")):
+            return jsonify({"message": "Token revoked"}), 401
+
         return f(*args, **kwargs)
 
     return decorated
@@ -165,6 +345,21 @@ def logout():
         )
         return jsonify({"message": "Token missing or invalid"}), 401
 
+    # Revoke the access token itself; an already invalid token has nothing to revoke
+    try:
+        _revoke_token(decode_token(auth_header.split(" ", 1)[1].strip()))
+    except jwt.InvalidTokenError:
+        pass
+
+    data = request.get_json(silent=True)
+    refresh_token = data.get("refresh_token") if isinstance(data, dict) else None
+    if refresh_token and isinstance(refresh_token, str):
+        db.session.execute(
+            delete(RefreshSession)
+            .where(RefreshSession.token_hash == _hash_refresh_token(refresh_token))
+        )
+        db.session.commit()
+
     notify_event(
         event_type="auth_logout",
         dedupe_key=f"{request.remote_addr}",
@@ -179,21 +374,122 @@ def logout():
 
     return jsonify({"message": "Logged out"}), 200
 
+# ===== USER LISTING =====
+USERS_PAGE_DEFAULT_LIMIT = 100
+USERS_PAGE_MAX_LIMIT = 1000
+USERS_STREAM_BATCH_SIZE = 500
+
+
+def _user_to_dict(row):
+    return {
+        "id": row.id,
+        "username": row.username,
+        "role": row.role,
+        "created_at": row.created_at.isoformat()
+    }
+
+
+def _encode_users_cursor(row):
+    raw = f"{row.created_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_users_cursor(cursor):
+    """
+    Returns (created_at, id). Raises ValueError on a malformed cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, user_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(user_id)
+    except (UnicodeError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _users_query(after=None):
+    # Ordered on (created_at, id) so the ix_users_created_at_id index serves both
+    # the sort and the keyset predicate
+    query = (
+        select(User.id, User.username, User.role, User.created_at)
+        .order_by(User.created_at, User.id)
+    )
+    if after is not None:
+        query = query.where(tuple_(User.created_at, User.id) > after)
+    return query
+
+
+def _stream_users(query, ndjson):
+    """
+    Yields users from a server-side cursor, so memory stays flat no matter
+    how many rows the table holds.
+    """
+    rows = db.session.execute(query.execution_options(yield_per=USERS_STREAM_BATCH_SIZE))
+
+    if ndjson:
+        for row in rows:
+            yield json.dumps(_user_to_dict(row)) + "\n"
+        return
+
+    yield "["
+    first = True
+    for row in rows:
+        if not first:
+            yield ","
+        first = False
+        yield json.dumps(_user_to_dict(row))
+    yield "]"
+
+
 @auth_routes.route("/admin/users", methods=["GET"])
 @token_required
 @admin_required
 def get_all_users():
-    users = User.query.all()
-
-    return jsonify([
-        {
-            "id": u.id,
-            "username": u.username,
-            "role": u.role,
-            "created_at": u.created_at.isoformat()
-        }
-        for u in users
-    ]), 200
+    """
+    - no params: full list as a JSON array, streamed
+    - ?format=ndjson: full list as newline-delimited JSON, streamed
+    - ?limit=N&cursor=C: one page; the next cursor is in X-Next-Cursor
+    """
+    cursor = request.args.get("cursor")
+    limit = request.args.get("limit")
+    ndjson = request.args.get("format") == "ndjson"
+
+    after = None
+    if cursor:
+        try:
+            after = _decode_users_cursor(cursor)
+        except ValueError:
+            return jsonify({"message": "Invalid cursor"}), 400
+
+    if limit is None and not cursor:
+        mimetype = "application/x-ndjson" if ndjson else "application/json"
+        return Response(
+            stream_with_context(_stream_users(_users_query(after), ndjson)),
+            status=200,
+            mimetype=mimetype,
+        )
+
+    try:
+        limit = int(limit) if limit is not None else USERS_PAGE_DEFAULT_LIMIT
+    except ValueError:
+        return jsonify({"message": "Invalid limit"}), 400
+    if limit < 1:
+        return jsonify({"message": "Invalid limit"}), 400
+    limit = min(limit, USERS_PAGE_MAX_LIMIT)
+
+    # Fetch one extra row to know whether another page exists
+    rows = db.session.execute(_users_query(after).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    headers = {}
+    if has_more:
+        headers["X-Next-Cursor"] = _encode_users_cursor(rows[-1])
+
+    if ndjson:
+        body = "".join(json.dumps(_user_to_dict(r)) + "\n" for r in rows)
+        return Response(body, status=200, mimetype="application/x-ndjson", headers=headers)
+
+    return jsonify([_user_to_dict(r) for r in rows]), 200, headers
 
 @auth_routes.route("/admin/users", methods=["POST"])
 @token_required
@@ -250,9 +546,14 @@ def create_user():
         )
         return jsonify({"message": "Username already exists"}), 400
 
+    try:
+        password_hash = hashing_executor.hash_password(password)
+    except HashingBusy:
+        return _busy_response()
+
     new_user = User(
         username=username,
-        password_hash=generate_password_hash(password),
+        password_hash=password_hash,
         role="user"  # FIXED ROLE
     )
 
@@ -275,6 +576,172 @@ def create_user():
 
     return jsonify({"message": "User created successfully"}), 201
 
+# ===== BULK IMPORT =====
+IMPORT_DEFAULT_BATCH_SIZE = 500
+IMPORT_MAX_BATCH_SIZE = 5000
+
+
+def _iter_import_rows(content_type, stream):
+    """
+    Yields (row_number, username, password) from a CSV or JSONL body without
+    buffering the whole upload. Malformed rows yield (row_number, None, None).
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+
+    if content_type == "text/csv":
+        reader = csv.DictReader(text)
+        for row_number, row in enumerate(reader, start=1):
+            yield row_number, (row.get("username") or "").strip(), row.get("password") or ""
+        return
+
+    for row_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield row_number, None, None
+            continue
+        if not isinstance(row, dict):
+            yield row_number, None, None
+            continue
+        yield row_number, str(row.get("username") or "").strip(), str(row.get("password") or "")
+
+
+def _import_batch(batch, seen):
+    """
+    Inserts one batch of parsed rows. Duplicates are resolved with a single
+    set-based lookup on the users.username unique index.
+    Returns the per-row results for the batch.
+    """
+    results = []
+    candidates = []
+
+    for row_number, username, password in batch:
+        if username is None:
+            results.append({"row": row_number, "status": "invalid", "message": "Malformed row"})
+        elif not username or not password:
+            results.append({"row": row_number, "username": username, "status": "invalid", "message": "Username and password required"})
+        elif len(username) > 50:
+            results.append({"row": row_number, "username": username, "status": "invalid", "message": "Username too long"})
+        elif username in seen:
+            results.append({"row": row_number, "username": username, "status": "duplicate", "message": "Duplicate in import"})
+        else:
+            seen.add(username)
+            candidates.append((row_number, username, password))
+
+    if not candidates:
+        return results
+
+    existing = set(db.session.execute(
+        select(User.username).where(User.username.in_([c[1] for c in candidates]))
+    ).scalars())
+
+    to_insert = []
+    for row_number, username, password in candidates:
+        if username in existing:
+            results.append({"row": row_number, "username": username, "status": "duplicate", "message": "Username already exists"})
+        else:
+            to_insert.append((row_number, username, password))
+
+    if not to_insert:
+        return results
+
+    hashes = hashing_executor.hash_passwords([c[2] for c in to_insert])
+    now = datetime.utcnow()
+
+    try:
+        db.session.execute(insert(User), [
+            {"username": username, "password_hash": password_hash, "role": "user", "created_at": now}
+            for (_, username, _), password_hash in zip(to_insert, hashes)
+        ])
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent create took one of the names; report the batch as failed
+        db.session.rollback()
+        for row_number, username, _ in to_insert:
+            results.append({"row": row_number, "username": username, "status": "error", "message": "Conflict, retry this row"})
+        return results
+
+    for row_number, username, _ in to_insert:
+        results.append({"row": row_number, "username": username, "status": "created"})
+    return results
+
+
+def _import_summary(results):
+    summary = {}
+    for r in results:
+        summary[r["status"]] = summary.get(r["status"], 0) + 1
+    return summary
+
+
+@auth_routes.route("/admin/users/import", methods=["POST"])
+@token_required
+@admin_required
+def import_users():
+    """
+    Bulk-creates users from a text/csv (header: username,password) or
+    application/x-ndjson body. Always creates role=user accounts.
+    """
+    content_type = (request.mimetype or "").lower()
+    if content_type in ("application/jsonl", "application/json-lines"):
+        content_type = "application/x-ndjson"
+    if content_type not in ("text/csv", "application/x-ndjson"):
+        return jsonify({"message": "Content-Type must be text/csv or application/x-ndjson"}), 415
+
+    try:
+        batch_size = int(request.args.get("batch_size", IMPORT_DEFAULT_BATCH_SIZE))
+    except ValueError:
+        return jsonify({"message": "Invalid batch_size"}), 400
+    if batch_size < 1:
+        return jsonify({"message": "Invalid batch_size"}), 400
+    batch_size = min(batch_size, IMPORT_MAX_BATCH_SIZE)
+
+    results = []
+    seen = set()
+    batch = []
+
+    try:
+        for row in _iter_import_rows(content_type, request.stream):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                results.extend(_import_batch(batch, seen))
+                batch = []
+        if batch:
+            results.extend(_import_batch(batch, seen))
+    except HashingBusy:
+        # Earlier batches are already committed: say which rows made it, so
+        # a retry can skip them instead of reading them back as duplicates
+        db.session.rollback()
+        results.sort(key=lambda r: r["row"])
+        return jsonify({
+            "message": "Service busy, import stopped early; rows not listed were not imported",
+            "summary": _import_summary(results),
+            "results": results,
+        }), 503, {"Retry-After": "1"}
+    except (UnicodeDecodeError, csv.Error):
+        db.session.rollback()
+        return jsonify({"message": "Invalid import body", "results": results}), 400
+
+    results.sort(key=lambda r: r["row"])
+    summary = _import_summary(results)
+
+    notify_event(
+        event_type="auth_user_import",
+        dedupe_key=f"{request.user['sub']}:{request.remote_addr}",
+        subject="Bulk user import",
+        body=(
+            f"ts={datetime.now(UTC).isoformat()} "
+            f"service=auth-service "
+            f"event=auth_user_import "
+            f"admin_id={request.user['sub']} "
+            f"created={summary.get('created', 0)} rows={len(results)} "
+            f"ip={request.remote_addr}"
+        ),
+    )
+
+    return jsonify({"summary": summary, "results": results}), 200
+
 @auth_routes.route("/admin/users/<int:user_id>", methods=["DELETE"])
 @token_required
 @admin_required
@@ -1,3 +1,4 @@
+import json
 import pytest
 
 # AC-ADMIN-01 — Create User Account (Admin)
@@ -126,4 +127,127 @@ def test_non_admin_cannot_create_user(client, test_user):
 
     assert res.status_code == 403
     data = res.get_json()
-    assert "message" in data
\ No newline at end of file
+    assert "message" in data
+
+def _admin_headers(client):
+    login_res = client.post("/api/login", json={
+        "username": "admin",
+        "password": "admin123"
+    })
+    token = login_res.get_json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+# Admin user listing — keyset pagination
+def test_admin_list_users_paginates_with_cursor(client, test_user):
+    headers = _admin_headers(client)
+    for i in range(3):
+        client.post(
+            "/api/admin/users",
+            json={"username": f"page{i}", "password": "pass"},
+            headers=headers
+        )
+
+    seen = []
+    cursor = None
+    while True:
+        query = "limit=2" + (f"&cursor={cursor}" if cursor else "")
+        res = client.get(f"/api/admin/users?{query}", headers=headers)
+        assert res.status_code == 200
+        page = res.get_json()
+        assert len(page) <= 2
+        seen.extend(u["username"] for u in page)
+
+        cursor = res.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert len(seen) == 5
+    assert len(set(seen)) == 5
+
+def test_admin_list_users_ndjson_stream(client, test_user):
+    headers = _admin_headers(client)
+
+    res = client.get("/api/admin/users?format=ndjson", headers=headers)
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-ndjson"
+
+    lines = [line for line in res.get_data(as_text=True).splitlines() if line]
+    usernames = {json.loads(line)["username"] for line in lines}
+    assert usernames == {"admin", "user1"}
+
+def test_admin_list_users_invalid_cursor(client, test_user):
+    headers = _admin_headers(client)
+
+    res = client.get("/api/admin/users?cursor=not-a-cursor", headers=headers)
+    assert res.status_code == 400
+
+# Bulk user import
+def test_admin_import_users_csv(client, test_user):
+    headers = _admin_headers(client)
+    body = "username,password\nbulk1,pass1\nbulk2,pass2\nuser1,dup\nbulk1,again\n,nopass\n"
+
+    res = client.post(
+        "/api/admin/users/import?batch_size=2",
+        data=body,
+        content_type="text/csv",
+        headers=headers
+    )
+    assert res.status_code == 200
+
+    data = res.get_json()
+    statuses = [r["status"] for r in data["results"]]
+    assert statuses == ["created", "created", "duplicate", "duplicate", "invalid"]
+    assert data["summary"]["created"] == 2
+
+    # Imported users can log in
+    login_res = client.post("/api/login", json={"username": "bulk2", "password": "pass2"})
+    assert login_res.status_code == 200
+
+def test_admin_import_users_jsonl(client, test_user):
+    headers = _admin_headers(client)
+    body = '{"username": "jl1", "password": "p"}\nnot json\n{"username": "admin", "password": "p"}\n'
+
+    res = client.post(
+        "/api/admin/users/import",
+        data=body,
+        content_type="application/x-ndjson",
+        headers=headers
+    )
+    assert res.status_code == 200
+    statuses = [r["status"] for r in res.get_json()["results"]]
+    assert statuses == ["created", "invalid", "duplicate"]
+
+def test_admin_import_users_rejects_unknown_content_type(client, test_user):
+    headers = _admin_headers(client)
+
+    res = client.post("/api/admin/users/import", json={"username": "x"}, headers=headers)
+    assert res.status_code == 415
+
+def test_admin_import_users_busy_reports_rows_already_created(client, test_user, monkeypatch):
+    import routes
+    from utils.hashing import HashingBusy
+
+    headers = _admin_headers(client)
+    real_hash = routes.hashing_executor.hash_passwords
+    calls = []
+
+    def busy_on_second_batch(passwords):
+        calls.append(passwords)
+        if len(calls) > 1:
+            raise HashingBusy()
+        return real_hash(passwords)
+
+    monkeypatch.setattr(routes.hashing_executor, "hash_passwords", busy_on_second_batch)
+
+    res = client.post(
+        "/api/admin/users/import?batch_size=1",
+        data="username,password\npart1,pass1\npart2,pass2\n",
+        content_type="text/csv",
+        headers=headers
+    )
+    assert res.status_code == 503
+    assert res.headers.get("Retry-After") == "1"
+
+    data = res.get_json()
+    assert data["results"] == [{"row": 1, "username": "part1", "status": "created"}]
+    assert data["summary"] == {"created": 1}
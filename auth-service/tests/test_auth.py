@@ -1,3 +1,4 @@
+import jwt
 import pytest
 
 # AC-LOGIN-04 — Unauthorized Access (No Token)
@@ -79,4 +80,133 @@ def test_login_returns_token_and_role(client, test_user):
     data = response.get_json()
     assert "access_token" in data
     assert "role" in data
-    assert data["role"] == "admin"
\ No newline at end of file
+    assert data["role"] == "admin"
+
+# Refresh-token sessions
+def test_refresh_issues_new_access_token(client, test_user):
+    login_res = client.post("/api/login", json={
+        "username": "user1",
+        "password": "user123"
+    })
+    refresh_token = login_res.get_json()["refresh_token"]
+
+    res = client.post("/api/token/refresh", json={"refresh_token": refresh_token})
+    assert res.status_code == 200
+    data = res.get_json()
+    assert data["role"] == "user"
+
+    profile_res = client.get(
+        "/api/profile",
+        headers={"Authorization": f"Bearer {data['access_token']}"}
+    )
+    assert profile_res.status_code == 200
+
+
+def test_refresh_does_not_run_password_kdf(client, test_user, monkeypatch):
+    import routes
+
+    login_res = client.post("/api/login", json={
+        "username": "user1",
+        "password": "user123"
+    })
+    refresh_token = login_res.get_json()["refresh_token"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("KDF must not run on refresh")
+
+    monkeypatch.setattr(routes.hashing_executor, "verify_password", fail)
+
+    res = client.post("/api/token/refresh", json={"refresh_token": refresh_token})
+    assert res.status_code == 200
+
+
+def test_refresh_with_unknown_token_returns_401(client, test_user):
+    res = client.post("/api/token/refresh", json={"refresh_token": "bogus"})
+    assert res.status_code == 401
+
+
+def test_refresh_after_logout_returns_401(client, test_user):
+    login_res = client.post("/api/login", json={
+        "username": "user1",
+        "password": "user123"
+    })
+    data = login_res.get_json()
+
+    logout_res = client.post(
+        "/api/logout",
+        json={"refresh_token": data["refresh_token"]},
+        headers={"Authorization": f"Bearer {data['access_token']}"}
+    )
+    assert logout_res.status_code == 200
+
+    res = client.post("/api/token/refresh", json={"refresh_token": data["refresh_token"]})
+    assert res.status_code == 401
+
+
+
+def test_expired_refresh_sessions_are_pruned(client, test_user):
+    from datetime import datetime, timedelta
+    from db import db
+    from models import RefreshSession, User
+    from routes import prune_refresh_sessions
+
+    user = User.query.filter_by(username="user1").one()
+    past = datetime.utcnow() - timedelta(days=1)
+    db.session.add_all([
+        RefreshSession(user_id=user.id, token_hash="a" * 64, expires_at=past),
+        RefreshSession(user_id=user.id, token_hash="b" * 64, expires_at=past),
+    ])
+    db.session.commit()
+
+    # Logging in clears the user's own expired sessions
+    client.post("/api/login", json={"username": "user1", "password": "user123"})
+    assert RefreshSession.query.filter_by(user_id=user.id).count() == 1
+
+    db.session.add(RefreshSession(user_id=user.id, token_hash="c" * 64, expires_at=past))
+    db.session.commit()
+    assert prune_refresh_sessions(batch_size=1) == 1
+    assert RefreshSession.query.count() == 1
+
+# Token revocation on logout
+def test_access_token_rejected_after_logout(client, test_user):
+    login_res = client.post("/api/login", json={
+        "username": "admin",
+        "password": "admin123"
+    })
+    headers = {"Authorization": f"Bearer {login_res.get_json()['access_token']}"}
+
+    assert client.get("/api/admin", headers=headers).status_code == 200
+
+    logout_res = client.post("/api/logout", headers=headers)
+    assert logout_res.status_code == 200
+
+    res = client.get("/api/admin", headers=headers)
+    assert res.status_code == 401
+    assert res.get_json()["message"] == "Token revoked"
+
+
+def test_revocation_feed_lists_revoked_jti(client, test_user, monkeypatch):
+    monkeypatch.setenv("INTERNAL_API_TOKEN", "feed-secret")
+    login_res = client.post("/api/login", json={
+        "username": "user1",
+        "password": "user123"
+    })
+    token = login_res.get_json()["access_token"]
+    client.post("/api/logout", headers={"Authorization": f"Bearer {token}"})
+
+    res = client.get("/internal/revocations?since=0", headers={"X-Internal-Token": "feed-secret"})
+    assert res.status_code == 200
+    data = res.get_json()
+
+    jti = jwt.decode(token, options={"verify_signature": False})["jti"]
+    assert jti in {r["jti"] for r in data["revocations"]}
+    assert data["last_id"] >= 1
+
+
+def test_revocation_feed_requires_internal_token(client, monkeypatch):
+    monkeypatch.delenv("INTERNAL_API_TOKEN", raising=False)
+    assert client.get("/internal/revocations").status_code == 403
+
+    monkeypatch.setenv("INTERNAL_API_TOKEN", "feed-secret")
+    assert client.get("/internal/revocations").status_code == 403
+    assert client.get("/internal/revocations", headers={"X-Internal-Token": "wrong"}).status_code == 403
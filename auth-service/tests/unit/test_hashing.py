@@ -0,0 +1,108 @@
+import os
+import time
+import pytest
+from utils.hashing import HashingExecutor, HashingBusy
+
+
+def _slow_job(seconds):
+    time.sleep(seconds)
+    return "done", seconds
+
+
+def _crash_job():
+    # Like an OOM kill: the worker process vanishes mid-job
+    os._exit(1)
+
+
+def test_executor_hashes_and_verifies_in_pool():
+    executor = HashingExecutor(workers=1, max_pending=2)
+    try:
+        hashed = executor.hash_password("secret123")
+        assert executor.verify_password("secret123", hashed) is True
+        assert executor.verify_password("wrong", hashed) is False
+    finally:
+        executor.shutdown()
+
+
+def test_executor_rejects_when_queue_full():
+    executor = HashingExecutor(workers=0, max_pending=1)
+
+    # Occupy the only slot
+    executor._slots.acquire()
+    try:
+        with pytest.raises(HashingBusy):
+            executor.hash_password("secret123")
+    finally:
+        executor._slots.release()
+
+    assert isinstance(executor.hash_password("secret123"), str)
+
+
+def test_executor_timeout_is_busy_and_keeps_slot_until_job_ends():
+    executor = HashingExecutor(workers=1, max_pending=1, timeout_seconds=0.1)
+    try:
+        with pytest.raises(HashingBusy):
+            executor._run("hash", _slow_job, 0.6)
+
+        # The job is still running in the pool, so it still holds the slot
+        assert executor._slots.acquire(blocking=False) is False
+
+        deadline = time.monotonic() + 5
+        while not executor._slots.acquire(blocking=False):
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        executor._slots.release()
+    finally:
+        executor.shutdown()
+
+
+def test_dead_worker_is_busy_and_the_pool_is_rebuilt():
+    executor = HashingExecutor(workers=1, max_pending=1)
+    try:
+        with pytest.raises(HashingBusy):
+            executor._run("hash", _crash_job)
+
+        # The slot came back and the next job gets a fresh pool
+        hashed = executor.hash_password("secret123")
+        assert executor.verify_password("secret123", hashed) is True
+
+        with pytest.raises(HashingBusy):
+            executor._run("hash", _crash_job)
+        assert len(executor.hash_passwords(["a", "b"])) == 2
+    finally:
+        executor.shutdown()
+
+
+def test_login_returns_503_when_hashing_busy(client, test_user, monkeypatch):
+    import routes
+
+    def busy(*args, **kwargs):
+        raise HashingBusy()
+
+    monkeypatch.setattr(routes.hashing_executor, "verify_password", busy)
+
+    res = client.post("/api/login", json={"username": "admin", "password": "admin123"})
+    assert res.status_code == 503
+    assert res.headers.get("Retry-After") == "1"
+
+
+def test_batch_hashing_takes_a_slot_per_busy_worker():
+    executor = HashingExecutor(workers=0, max_pending=4)
+
+    # Inline mode keeps one "worker" busy: one slot
+    assert len(executor.hash_passwords(["a", "b"])) == 2
+
+    executor.workers = 3
+    for _ in range(2):
+        executor._slots.acquire()
+    try:
+        # Needs min(3 passwords, 3 workers) = 3 slots, only 2 are free
+        with pytest.raises(HashingBusy):
+            executor.hash_passwords(["a", "b", "c"])
+    finally:
+        for _ in range(2):
+            executor._slots.release()
+
+    # Nothing was leaked by the rejected batch
+    for _ in range(4):
+        assert executor._slots.acquire(blocking=False)
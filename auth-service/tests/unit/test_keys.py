@@ -0,0 +1,74 @@
+import os
+import json
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from utils.keys import KeyRing, is_test_mode
+
+
+def _write_private_key(path):
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    path.write_bytes(private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ))
+    return private_key
+
+
+def test_keyring_publishes_all_keys_and_signs_with_newest(tmp_path):
+    _write_private_key(tmp_path / "a.pem")
+    _write_private_key(tmp_path / "b.pem")
+    os.utime(tmp_path / "b.pem", (1, os.stat(tmp_path / "a.pem").st_mtime + 10))
+
+    ring = KeyRing(tmp_path, tmp_path / "missing.pem", check_seconds=0)
+
+    body, etag = ring.jwks()
+    keys = json.loads(body)["keys"]
+    assert len(keys) == 2
+    assert all(k["alg"] == "ES256" and k["kid"] for k in keys)
+    assert etag
+
+    kid, _ = ring.signing_key()
+    newest = [k for k in keys if k["kid"] == kid]
+    assert newest
+
+
+def test_keyring_rotation_keeps_old_tokens_valid(tmp_path):
+    _write_private_key(tmp_path / "a.pem")
+    ring = KeyRing(tmp_path, tmp_path / "missing.pem", check_seconds=0)
+
+    old_kid, old_key = ring.signing_key()
+    token = jwt.encode({"sub": "1"}, old_key, algorithm="ES256", headers={"kid": old_kid})
+
+    _write_private_key(tmp_path / "b.pem")
+    os.utime(tmp_path / "b.pem", (1, os.stat(tmp_path / "a.pem").st_mtime + 10))
+
+    new_kid, _ = ring.signing_key()
+    assert new_kid != old_kid
+
+    kid = jwt.get_unverified_header(token)["kid"]
+    assert jwt.decode(token, ring.public_key(kid), algorithms=["ES256"])["sub"] == "1"
+
+
+def test_jwks_endpoint_supports_conditional_get(client):
+    res = client.get("/.well-known/jwks.json")
+    assert res.status_code == 200
+    assert "keys" in res.get_json()
+    etag = res.headers["ETag"]
+
+    res = client.get("/.well-known/jwks.json", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+
+
+def test_test_mode_matches_file_service(monkeypatch):
+    # Same switches as file-service's auth._is_testing: both services must
+    # agree on HS256 vs ES256 for the same environment
+    for name in ("TESTING", "CI", "DOCKER"):
+        monkeypatch.delenv(name, raising=False)
+    assert is_test_mode() is False
+
+    for name in ("TESTING", "CI", "DOCKER"):
+        monkeypatch.setenv(name, "true")
+        assert is_test_mode() is True
+        monkeypatch.delenv(name)
@@ -0,0 +1,40 @@
+import time
+from utils.revocation import BloomFilter, RevocationList
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"jti-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 500
+
+
+def test_revocation_list_syncs_incrementally():
+    store = [(1, "a", time.time() + 60), (2, "b", time.time() + 60)]
+    calls = []
+
+    def fetch(since_id):
+        calls.append(since_id)
+        rows = [r for r in store if r[0] > since_id]
+        last_id = rows[-1][0] if rows else since_id
+        return last_id, [(jti, exp) for _, jti, exp in rows]
+
+    revocations = RevocationList(fetch, sync_seconds=0, overlap=0)
+    assert revocations.is_revoked("a")
+    assert not revocations.is_revoked("c")
+
+    store.append((3, "c", time.time() + 60))
+    assert revocations.is_revoked("c")
+    assert calls[-1] == 2
+
+
+def test_expired_revocations_are_ignored():
+    revocations = RevocationList(lambda since: (since, []), sync_seconds=3600)
+    revocations.add("old", time.time() - 1)
+
+    assert not revocations.is_revoked("old")
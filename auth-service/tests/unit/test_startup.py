@@ -0,0 +1,53 @@
+import os
+import sys
+import subprocess
+from pathlib import Path
+
+SERVICE_DIR = Path(__file__).resolve().parents[2]
+
+# Generous enough for CI runners; lower it locally to catch smaller regressions
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "3.0"))
+
+OPTIONAL_MODULES = ("flask_migrate", "alembic", "prometheus_flask_exporter", "dotenv")
+
+
+def _run_fresh_interpreter(code, **extra_env):
+    env = {k: v for k, v in os.environ.items() if k != "DATABASE_URL"}
+    env.update({"TESTING": "true", **extra_env})
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=SERVICE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.strip()
+
+
+def test_lean_startup_skips_optional_integrations():
+    code = (
+        "import sys, app; app.create_app('sqlite://'); "
+        f"print(','.join(m for m in {OPTIONAL_MODULES!r} if m in sys.modules))"
+    )
+    loaded = _run_fresh_interpreter(
+        code,
+        ENABLE_METRICS="false",
+        ENABLE_MIGRATIONS="false",
+        LOAD_DOTENV="false",
+    )
+
+    assert loaded == ""
+
+
+def test_create_app_within_startup_budget():
+    code = (
+        "import time; start = time.perf_counter(); "
+        "import app; app.create_app('sqlite://'); "
+        "print(time.perf_counter() - start)"
+    )
+    elapsed = float(_run_fresh_interpreter(code))
+
+    assert elapsed < STARTUP_BUDGET_SECONDS, (
+        f"auth-service startup took {elapsed:.2f}s (budget {STARTUP_BUDGET_SECONDS}s)"
+    )
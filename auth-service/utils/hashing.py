@@ -0,0 +1,232 @@
+import os
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout, wait
+from concurrent.futures.process import BrokenProcessPool
+from prometheus_client import Counter, Gauge, Histogram
+from utils.password import hash_password, verify_password
+
+HASH_QUEUE_DEPTH = Gauge(
+    "auth_hash_queue_depth",
+    "Password hashing jobs admitted and not yet finished",
+)
+HASH_DURATION = Histogram(
+    "auth_hash_duration_seconds",
+    "Time spent inside the password KDF",
+    ["operation"],
+)
+HASH_REJECTED = Counter(
+    "auth_hash_rejected",
+    "Password hashing jobs rejected because the queue was full",
+)
+HASH_POOL_RESTARTS = Counter(
+    "auth_hash_pool_restarts",
+    "Hashing pools discarded because a worker process died",
+)
+
+
+class HashingBusy(Exception):
+    """
+    Raised when the hashing queue is full, or a job did not finish in time,
+    and the request should be shed.
+    """
+
+
+def _timed_hash(password):
+    start = time.perf_counter()
+    result = hash_password(password)
+    return result, time.perf_counter() - start
+
+
+def _timed_verify(password, hashed):
+    start = time.perf_counter()
+    result = verify_password(password, hashed)
+    return result, time.perf_counter() - start
+
+
+class HashingExecutor:
+    """
+    Runs password KDF work in a process pool so it does not hold the GIL of
+    the request worker.
+
+    Admission is bounded: at most `max_pending` jobs may be queued or running.
+    Past that, `HashingBusy` is raised immediately instead of piling up work.
+    `workers=0` runs the KDF inline (still bounded and measured).
+
+    If a worker process dies (OOM kill, crash in the KDF) the pool is broken
+    for good: it is discarded, rebuilt on the next job, and the jobs that
+    were caught in it are answered with `HashingBusy`.
+    """
+
+    def __init__(self, workers=None, max_pending=None, timeout_seconds=10):
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if max_pending is None:
+            max_pending = max(workers, 1) * 4
+
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout_seconds = timeout_seconds
+
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+
+    def _get_pool(self):
+        # A pool inherited across fork() is unusable; build one per process
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _discard_pool(self, pool):
+        with self._lock:
+            if self._pool is not pool:
+                # Already replaced by another request that saw it break
+                return
+            self._pool = None
+            self._pool_pid = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        HASH_POOL_RESTARTS.inc()
+        print("Password hashing pool broken; rebuilding")
+
+    def _admit(self, slots=1):
+        for taken in range(slots):
+            if not self._slots.acquire(blocking=False):
+                for _ in range(taken):
+                    self._slots.release()
+                HASH_REJECTED.inc()
+                raise HashingBusy()
+        HASH_QUEUE_DEPTH.inc(slots)
+
+    def _release(self, slots=1):
+        HASH_QUEUE_DEPTH.dec(slots)
+        for _ in range(slots):
+            self._slots.release()
+
+    def _release_when_done(self, futures, slots=1):
+        """
+        Frees the admission slots only once every future has finished (or was
+        cancelled), so a job still running after a timeout keeps counting
+        against the CPU it is using.
+        """
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def _done(_):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._release(slots)
+
+        for future in futures:
+            future.add_done_callback(_done)
+
+    def _run(self, operation, fn, *args):
+        self._admit()
+
+        if self.workers == 0:
+            try:
+                result, duration = fn(*args)
+            finally:
+                self._release()
+        else:
+            pool = self._get_pool()
+            try:
+                future = pool.submit(fn, *args)
+            except BrokenProcessPool:
+                self._release()
+                self._discard_pool(pool)
+                raise HashingBusy()
+            except BaseException:
+                self._release()
+                raise
+            self._release_when_done([future])
+
+            try:
+                result, duration = future.result(timeout=self.timeout_seconds)
+            except FutureTimeout:
+                future.cancel()
+                print("Password hashing timed out:", operation)
+                raise HashingBusy()
+            except BrokenProcessPool:
+                # The failed future is done, so its slot is already released
+                self._discard_pool(pool)
+                raise HashingBusy()
+
+        HASH_DURATION.labels(operation=operation).observe(duration)
+        return result
+
+    def hash_password(self, password):
+        return self._run("hash", _timed_hash, password)
+
+    def verify_password(self, password, hashed):
+        return self._run("verify", _timed_verify, password, hashed)
+
+    def hash_passwords(self, passwords):
+        """
+        Hash a batch of passwords across the pool workers. The batch takes
+        one admission slot per worker it can keep busy, so a bulk import
+        is charged for the CPU it uses and cannot starve logins unnoticed.
+        """
+        if not passwords:
+            return []
+        slots = min(len(passwords), max(self.workers, 1))
+        if slots > self.max_pending:
+            # Could never be admitted; take the whole queue instead
+            slots = self.max_pending
+        self._admit(slots)
+
+        if self.workers == 0:
+            try:
+                results = [_timed_hash(p) for p in passwords]
+            finally:
+                self._release(slots)
+        else:
+            pool = self._get_pool()
+            try:
+                futures = [pool.submit(_timed_hash, p) for p in passwords]
+            except BrokenProcessPool:
+                self._release(slots)
+                self._discard_pool(pool)
+                raise HashingBusy()
+            except BaseException:
+                self._release(slots)
+                raise
+            self._release_when_done(futures, slots)
+
+            per_worker = -(-len(passwords) // self.workers)
+            done, not_done = wait(futures, timeout=self.timeout_seconds * max(1, per_worker))
+            if not_done:
+                for future in not_done:
+                    future.cancel()
+                print("Password hashing timed out: batch of", len(passwords))
+                raise HashingBusy()
+            try:
+                results = [future.result() for future in futures]
+            except BrokenProcessPool:
+                self._discard_pool(pool)
+                raise HashingBusy()
+
+        hashes = []
+        for hashed, duration in results:
+            HASH_DURATION.labels(operation="hash").observe(duration)
+            hashes.append(hashed)
+        return hashes
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._pool_pid = None
+
+
+hashing_executor = HashingExecutor(
+    workers=int(os.getenv("HASH_POOL_WORKERS", str(os.cpu_count() or 1))),
+    max_pending=int(os.getenv("HASH_MAX_PENDING", "0")) or None,
+    timeout_seconds=float(os.getenv("HASH_TIMEOUT_SECONDS", "10")),
+)
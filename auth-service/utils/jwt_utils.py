@@ -1,47 +1,82 @@
 import os
+import json
+import uuid
+import hashlib
 import jwt
 from datetime import datetime, timedelta, UTC
-from pathlib import Path
+from utils.keys import get_keyring, is_test_mode, TEST_KID
 
 # ===== Config =====
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-IS_TEST = (
-    os.getenv("TESTING") == "true"
-    or os.getenv("CI") == "true"
-)
-
-BASE_DIR = Path(__file__).resolve().parent
+IS_TEST = is_test_mode()
 
 # ===== Key + Algorithm Selection =====
-if IS_TEST:
-    # CI / pytest / unit tests
-    ALGORITHM = "HS256"
-    PRIVATE_KEY = os.getenv("JWT_SECRET", "test-secret")
-    PUBLIC_KEY = PRIVATE_KEY
-else:
-    # Local dev / production
-    ALGORITHM = "ES256"
+# CI / pytest / unit tests use HS256 with JWT_SECRET.
+# Local dev / production use ES256 keys from the key ring (utils/keys.py),
+# loaded on first use rather than at import.
+ALGORITHM = "HS256" if IS_TEST else "ES256"
+
 
-    PRIVATE_KEY_PATH = BASE_DIR / "ec_private.pem"
-    PUBLIC_KEY_PATH = BASE_DIR / "ec_public.pem"
+def _test_secret():
+    return os.getenv("JWT_SECRET", "test-secret")
 
-    if not PRIVATE_KEY_PATH.exists() or not PUBLIC_KEY_PATH.exists():
-        raise RuntimeError("JWT key files missing for ES256 mode")
 
-    PRIVATE_KEY = PRIVATE_KEY_PATH.read_text()
-    PUBLIC_KEY = PUBLIC_KEY_PATH.read_text()
+def __getattr__(name):
+    # PRIVATE_KEY / PUBLIC_KEY are kept for callers that still import them
+    if name == "PRIVATE_KEY":
+        return _test_secret() if IS_TEST else get_keyring().signing_key()[1]
+    if name == "PUBLIC_KEY":
+        return _test_secret() if IS_TEST else get_keyring().public_key()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # ===== Token Creation =====
+def encode_payload(payload: dict) -> str:
+    # jti makes every token individually revocable
+    payload.setdefault("jti", uuid.uuid4().hex)
+
+    if IS_TEST:
+        kid, key = TEST_KID, _test_secret()
+    else:
+        kid, key = get_keyring().signing_key()
+
+    return jwt.encode(payload, key, algorithm=ALGORITHM, headers={"kid": kid})
+
+
 def generate_token(user_id: int, role: str) -> str:
     payload = {
-        "sub": str(user_id),   #
+        "sub": str(user_id),
         "role": role,
         "exp": datetime.now(UTC) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
     }
 
-    return jwt.encode(payload, PRIVATE_KEY, algorithm=ALGORITHM)
+    return encode_payload(payload)
+
 
 # ===== Token Decode =====
 def decode_token(token: str) -> dict:
-    return jwt.decode(token, PUBLIC_KEY, algorithms=[ALGORITHM])
+    if IS_TEST:
+        key = _test_secret()
+    else:
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = get_keyring().public_key(kid)
+        if key is None:
+            raise jwt.InvalidTokenError("Unknown signing key")
+
+    return jwt.decode(token, key, algorithms=[ALGORITHM])
+
+
+# ===== JWKS =====
+_EMPTY_JWKS = json.dumps({"keys": []})
+_EMPTY_JWKS_ETAG = hashlib.sha256(_EMPTY_JWKS.encode("utf-8")).hexdigest()[:32]
+
+
+def jwks_document():
+    """
+    Returns (json_body, etag) for the public key set.
+    HS256 secrets are never published, so test mode serves an empty set.
+    """
+    if IS_TEST:
+        return _EMPTY_JWKS, _EMPTY_JWKS_ETAG
+    return get_keyring().jwks()
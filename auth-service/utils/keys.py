@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import hashlib
+import base64
+import threading
+from pathlib import Path
+from cryptography.hazmat.primitives import serialization
+from jwt.algorithms import ECAlgorithm
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# kid used for HS256 (CI / pytest) tokens; nothing is published for it
+TEST_KID = "hs256"
+
+
+def is_test_mode():
+    # CI / pytest / the compose stack (DOCKER=true) use HS256 with JWT_SECRET.
+    # Must match file-service's auth._is_testing, or tokens fail to verify
+    return (
+        os.getenv("TESTING") == "true"
+        or os.getenv("CI") == "true"
+        or os.getenv("DOCKER") == "true"
+    )
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _thumbprint(jwk: dict) -> str:
+    # RFC 7638: SHA-256 over the required members in lexicographic order
+    canonical = json.dumps(
+        {k: jwk[k] for k in ("crv", "kty", "x", "y")},
+        separators=(",", ":"),
+        sort_keys=True,
+    )
+    return _b64url(hashlib.sha256(canonical.encode("utf-8")).digest())
+
+
+class KeyRing:
+    """
+    ES256 signing keys for auth-service.
+
+    Every private key PEM in `keys_dir` is an active key: all of them are
+    published in the JWKS and accepted for verification. New tokens are signed
+    with `active_kid` if set, otherwise with the most recently added key.
+    When `keys_dir` has no keys, `ec_private.pem` next to the app is used.
+
+    The directory is re-scanned at most every `check_seconds`, so dropping a
+    new key in (or removing a retired one) needs no restart.
+    """
+
+    def __init__(self, keys_dir, fallback_private_path, active_kid=None, check_seconds=30):
+        self.keys_dir = Path(keys_dir)
+        self.fallback_private_path = Path(fallback_private_path)
+        self.active_kid = active_kid
+        self.check_seconds = check_seconds
+
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._fingerprint = None
+        self._private_keys = {}
+        self._public_keys = {}
+        self._signing_kid = None
+        self._jwks_body = None
+        self._jwks_etag = None
+
+    def _key_files(self):
+        files = []
+        if self.keys_dir.is_dir():
+            files = sorted(p for p in self.keys_dir.iterdir() if p.suffix == ".pem")
+        if not files and self.fallback_private_path.exists():
+            files = [self.fallback_private_path]
+        return files
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._fingerprint is not None and now - self._checked_at < self.check_seconds:
+            return
+        self._checked_at = now
+
+        files = self._key_files()
+        fingerprint = tuple((str(p), p.stat().st_mtime) for p in files)
+        if fingerprint == self._fingerprint:
+            return
+
+        if not files:
+            raise RuntimeError("JWT key files missing for ES256 mode")
+
+        private_keys = {}
+        public_keys = {}
+        jwks = []
+        newest = None
+        for path in files:
+            private_key = serialization.load_pem_private_key(path.read_bytes(), password=None)
+            public_key = private_key.public_key()
+
+            jwk = json.loads(ECAlgorithm.to_jwk(public_key))
+            kid = _thumbprint(jwk)
+            jwk.update({"kid": kid, "use": "sig", "alg": "ES256"})
+
+            private_keys[kid] = private_key
+            public_keys[kid] = public_key
+            jwks.append(jwk)
+
+            mtime = path.stat().st_mtime
+            if newest is None or mtime > newest[0]:
+                newest = (mtime, kid)
+
+        signing_kid = self.active_kid if self.active_kid in private_keys else newest[1]
+
+        body = json.dumps({"keys": jwks}, separators=(",", ":"), sort_keys=True)
+        self._private_keys = private_keys
+        self._public_keys = public_keys
+        self._signing_kid = signing_kid
+        self._jwks_body = body
+        self._jwks_etag = hashlib.sha256(body.encode("utf-8")).hexdigest()[:32]
+        self._fingerprint = fingerprint
+
+    def signing_key(self):
+        """
+        Returns (kid, private_key) for new tokens.
+        """
+        with self._lock:
+            self._refresh()
+            return self._signing_kid, self._private_keys[self._signing_kid]
+
+    def public_key(self, kid=None):
+        """
+        Returns the public key for `kid`, or None if it is not active.
+        Tokens without a kid (issued before rotation support) use the signing key.
+        """
+        with self._lock:
+            self._refresh()
+            if kid is None:
+                kid = self._signing_kid
+            return self._public_keys.get(kid)
+
+    def jwks(self):
+        """
+        Returns (json_body, etag) for /.well-known/jwks.json.
+        """
+        with self._lock:
+            self._refresh()
+            return self._jwks_body, self._jwks_etag
+
+
+_keyring = None
+_keyring_lock = threading.Lock()
+
+
+def get_keyring():
+    global _keyring
+    if _keyring is None:
+        with _keyring_lock:
+            if _keyring is None:
+                _keyring = KeyRing(
+                    keys_dir=os.getenv("JWT_KEYS_DIR", str(BASE_DIR / "keys")),
+                    fallback_private_path=BASE_DIR / "ec_private.pem",
+                    active_kid=os.getenv("JWT_ACTIVE_KID") or None,
+                    check_seconds=int(os.getenv("JWT_KEYS_CHECK_SECONDS", "30")),
+                )
+    return _keyring
@@ -0,0 +1,120 @@
+import math
+import time
+import hashlib
+import threading
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. No false negatives; false positives
+    at roughly `error_rate` once `capacity` items have been added.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.01):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing (Kirsch-Mitzenmacher) from one SHA-256 digest
+        digest = hashlib.sha256(item.encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationList:
+    """
+    In-process mirror of the revoked-token store.
+
+    `fetch(since_id)` must return (last_id, [(jti, expires_at_epoch), ...]) for
+    revocations newer than `since_id`. It is called at most every
+    `sync_seconds`, so only new rows cross the wire. The last `overlap` ids
+    are re-read each time so rows committed out of id order are not missed.
+
+    `is_revoked` checks the Bloom filter first; only a filter hit touches the
+    exact set. Expired entries are dropped (and the filter rebuilt) every
+    `prune_seconds`.
+    """
+
+    def __init__(self, fetch, sync_seconds=5, prune_seconds=3600, capacity=100000,
+                 error_rate=0.01, overlap=100):
+        self.fetch = fetch
+        self.sync_seconds = sync_seconds
+        self.overlap = overlap
+        self.prune_seconds = prune_seconds
+        self.error_rate = error_rate
+
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._exact = {}  # jti -> expires_at
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._last_id = 0
+        self._synced_at = None
+        self._pruned_at = time.monotonic()
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._add_locked(jti, expires_at)
+
+    def _add_locked(self, jti, expires_at):
+        self._exact[jti] = expires_at
+        self._bloom.add(jti)
+        if len(self._exact) > self._bloom.capacity:
+            self._rebuild_locked(time.time(), self._bloom.capacity * 2)
+
+    def _rebuild_locked(self, now, capacity):
+        self._exact = {j: exp for j, exp in self._exact.items() if exp > now}
+        bloom = BloomFilter(max(capacity, len(self._exact) * 2), self.error_rate)
+        for jti in self._exact:
+            bloom.add(jti)
+        self._bloom = bloom
+
+    def sync(self, force=False):
+        now = time.monotonic()
+        if not force and self._synced_at is not None and now - self._synced_at < self.sync_seconds:
+            return
+
+        if not self._sync_lock.acquire(blocking=False):
+            # Another thread is already syncing
+            return
+        try:
+            self._synced_at = now
+            try:
+                last_id, rows = self.fetch(max(0, self._last_id - self.overlap))
+            except Exception as e:
+                print("REVOCATION SYNC FAILED:", repr(e))
+                return
+
+            with self._lock:
+                for jti, expires_at in rows:
+                    self._add_locked(jti, expires_at)
+                self._last_id = max(self._last_id, last_id)
+
+                if now - self._pruned_at >= self.prune_seconds:
+                    self._rebuild_locked(time.time(), self._bloom.capacity)
+                    self._pruned_at = now
+        finally:
+            self._sync_lock.release()
+
+    def is_revoked(self, jti):
+        if not jti:
+            return False
+
+        self.sync()
+
+        if jti not in self._bloom:
+            return False
+
+        with self._lock:
+            expires_at = self._exact.get(jti)
+        return expires_at is not None and expires_at > time.time()
@@ -49,6 +49,17 @@ def create_app(database_uri=None):
 
     app.config["UPLOAD_DIR"] = os.getenv("UPLOAD_DIR", "uploads")
     app.config["MAX_UPLOAD_SIZE_BYTES"] = 5 * 1024 * 1024
+    # Resumable uploads (/dashboard/uploads) are bounded separately
+    app.config["MAX_RESUMABLE_UPLOAD_SIZE_BYTES"] = int(os.getenv("MAX_RESUMABLE_UPLOAD_SIZE_BYTES", str(10 * 1024 ** 3)))
+    app.config["MAX_UPLOAD_CHUNK_SIZE_BYTES"] = int(os.getenv("MAX_UPLOAD_CHUNK_SIZE_BYTES", str(16 * 1024 * 1024)))
+    app.config["UPLOAD_SESSION_TTL_SECONDS"] = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", "86400"))
+    # Unexpired resumable uploads a user may have at once; 0 disables the cap
+    app.config["MAX_OPEN_UPLOAD_SESSIONS"] = int(os.getenv("MAX_OPEN_UPLOAD_SESSIONS", "10")) or None
+    # Per-user storage limit; 0 disables it
+    quota_bytes = int(os.getenv("STORAGE_QUOTA_BYTES", str(10 * 1024 ** 3)))
+    app.config["STORAGE_QUOTA_BYTES"] = quota_bytes or None
+    # Behind nginx/Apache: hand file bodies to the proxy via X-Sendfile
+    app.config["USE_X_SENDFILE"] = os.getenv("USE_X_SENDFILE", "false").lower() == "true"
     app.config["ALLOWED_CONTENT_TYPES"] = {
         "text/plain",
         "image/png",
@@ -61,6 +72,33 @@ def create_app(database_uri=None):
     from routes import bp
     app.register_blueprint(bp)
 
+    @app.cli.command("reconcile-usage")
+    def reconcile_usage_command():
+        """Fix drift in user_storage_usage; meant to run periodically (cron)."""
+        from quota import reconcile_storage_usage
+
+        batch_size = int(os.getenv("USAGE_RECONCILE_BATCH_SIZE", "500"))
+        print(f"reconciled {reconcile_storage_usage(batch_size)} usage counters")
+
+    @app.cli.command("expire-uploads")
+    def expire_uploads_command():
+        """Delete expired resumable upload sessions and their chunks; meant to run periodically (cron)."""
+        from resumable import expire_upload_sessions
+
+        print(f"removed {expire_upload_sessions(app.config['UPLOAD_DIR'])} expired upload sessions")
+
+    @app.cli.command("shard-uploads")
+    def shard_uploads_command():
+        """Move stored files into the UPLOAD_FANOUT_DEPTH layout; safe while serving."""
+        from layout import migrate_to_sharded_layout
+
+        moved = migrate_to_sharded_layout(
+            app.config["UPLOAD_DIR"],
+            batch_size=int(os.getenv("SHARD_BATCH_SIZE", "500")),
+            grace_seconds=float(os.getenv("SHARD_GRACE_SECONDS", "2")),
+        )
+        print(f"moved {moved} stored files")
+
     def _sanitize_for_log(value):
         """
         Basic log injection mitigation:
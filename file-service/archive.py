@@ -0,0 +1,87 @@
+import os
+import zipfile
+from upload import CHUNK_SIZE
+from blobs import open_stored
+
+# Already compressed: deflating again costs CPU and saves nothing
+STORED_CONTENT_TYPES = {"image/png", "image/x-png"}
+
+
+class _StreamSink:
+    """
+    Write-only target for ZipFile. Having no tell/seek makes ZipFile write
+    data descriptors instead of seeking back to patch headers, which is what
+    allows the archive to be streamed.
+    """
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _unique_name(name, seen):
+    """
+    Entry names must be unique inside the archive: a.txt, a (1).txt, ...
+    """
+    candidate = name
+    root, ext = os.path.splitext(name)
+    n = 1
+    while candidate in seen:
+        candidate = f"{root} ({n}){ext}"
+        n += 1
+    seen.add(candidate)
+    return candidate
+
+
+def iter_zip(files):
+    """
+    Yields a ZIP archive of `files` piece by piece. Each item needs
+    filename, storage_path, content_type, content_encoding, size_bytes and
+    created_at.
+
+    Memory stays around one CHUNK_SIZE read plus its compressed output, and
+    the first entry is on the wire before later files are opened.
+    """
+    sink = _StreamSink()
+    seen = set()
+
+    with zipfile.ZipFile(sink, mode="w") as zf:
+        for f in files:
+            info = zipfile.ZipInfo(_unique_name(f.filename, seen), date_time=f.created_at.timetuple()[:6])
+            # Known up front, so ZipFile picks ZIP64 headers for huge entries
+            info.file_size = f.size_bytes
+            if f.content_type in STORED_CONTENT_TYPES:
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+
+            with open_stored(f.storage_path, f.content_encoding) as src, zf.open(info, mode="w") as dest:
+                while True:
+                    data = src.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    dest.write(data)
+
+                    out = sink.take()
+                    if out:
+                        yield out
+
+            out = sink.take()
+            if out:
+                yield out
+
+    # Central directory
+    out = sink.take()
+    if out:
+        yield out
@@ -1,44 +1,281 @@
 import os
+import json
+import time
+import hashlib
+import threading
+import urllib.request
+import urllib.error
+from collections import OrderedDict
 import jwt
+from jwt.algorithms import ECAlgorithm
 from jwt.exceptions import PyJWTError
+from revocation import RevocationList
+from background import PeriodicTask
 
-def get_authenticated_user_id(request):
-    auth = request.headers.get("Authorization", "")
-    if not auth.startswith("Bearer "):
-        return None
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PUBLIC_KEY_PATH = os.path.join(BASE_DIR, "ec_public.pem")
 
-    token = auth.split(" ", 1)[1].strip()
-    if not token:
-        return None
 
+def _is_testing():
     # Match user_service behavior
-    testing = (
-    os.getenv("TESTING") == "true"
-    or os.getenv("CI") == "true"
-    or os.getenv("DOCKER") == "true"
-)
+    return (
+        os.getenv("TESTING") == "true"
+        or os.getenv("CI") == "true"
+        or os.getenv("DOCKER") == "true"
+    )
+
+
+class JWKSClient:
+    """
+    Caches auth-service's published key set (/.well-known/jwks.json).
+
+    - Keys are held as a kid -> public key dict, so lookups do no I/O.
+    - A background thread refreshes the set every `refresh_seconds` with a
+      conditional GET (If-None-Match), so an unchanged set costs a 304 and
+      a slow auth-service never stalls a request.
+    - An unknown kid wakes that thread early (at most every
+      `min_refresh_seconds`) to pick up a freshly rotated key; the token
+      itself is rejected, and the next one finds the key.
+    - Only the first lookup in a process waits for the first fetch.
+    - If auth-service is unreachable the last good set is kept.
+    """
+
+    def __init__(self, url, refresh_seconds=300, min_refresh_seconds=30, timeout_seconds=3):
+        self.url = url
+        self.refresh_seconds = refresh_seconds
+        self.min_refresh_seconds = min_refresh_seconds
+        self.timeout_seconds = timeout_seconds
+
+        self._wake_lock = threading.Lock()
+        self._keys = {}
+        self._etag = None
+        self._attempted_at = None
+        self.version = 0
+        self._task = PeriodicTask(self.refresh, refresh_seconds, name="jwks-refresh")
+
+    def _fetch(self):
+        req = urllib.request.Request(self.url)
+        if self._etag:
+            req.add_header("If-None-Match", self._etag)
+
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout_seconds) as resp:
+                body = resp.read()
+                etag = resp.headers.get("ETag")
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return False
+            raise
+
+        keys = {}
+        for jwk in json.loads(body).get("keys", []):
+            if jwk.get("kty") != "EC" or not jwk.get("kid"):
+                continue
+            keys[jwk["kid"]] = ECAlgorithm.from_jwk(json.dumps(jwk))
 
+        self._keys = keys
+        self._etag = etag
+        return True
 
-    if testing:
-        alg = "HS256"
-        key = os.getenv("JWT_SECRET", "test-secret")
-        options = {"require": ["exp"]}
-    else:
-        alg = "ES256"
-        BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-        PUBLIC_KEY_PATH = os.path.join(BASE_DIR, "ec_public.pem")
+    def refresh(self):
+        self._attempted_at = time.monotonic()
         try:
-            with open(PUBLIC_KEY_PATH, "rb") as f:
-                key = f.read()
+            if self._fetch():
+                self.version += 1
+        except (OSError, ValueError) as e:
+            print("JWKS refresh failed:", repr(e))
+
+    def start(self):
+        self._task.wait_first_run(self.timeout_seconds)
+
+    def get_key(self, kid):
+        self.start()
+        key = self._keys.get(kid)
+        if key is None:
+            # Rate-limited against the last fetch, scheduled or woken
+            with self._wake_lock:
+                attempted_at = self._attempted_at
+                if attempted_at is None or time.monotonic() - attempted_at >= self.min_refresh_seconds:
+                    self._attempted_at = time.monotonic()
+                    self._task.wake()
+        return key
+
+
+class TokenVerifier:
+    """
+    Verifies bearer tokens and remembers the result.
+
+    - With a `jwks` client, ES256 keys come from auth-service's key set and
+      are picked by the token's `kid`.
+    - Otherwise the ES256 public key is read once and only re-read when the
+      PEM file's mtime changes (checked at most every `key_check_seconds`).
+    - Verified tokens are kept in a bounded LRU keyed by the SHA-256 digest of
+      the token. An entry never outlives the token's own `exp`.
+    """
+
+    def __init__(self, public_key_path=PUBLIC_KEY_PATH, max_entries=10000,
+                 ttl_seconds=300, key_check_seconds=30, jwks=None):
+        self.public_key_path = public_key_path
+        self.jwks = jwks
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.key_check_seconds = key_check_seconds
+
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # digest -> (expires_at, payload)
+        self._key = None
+        self._key_mtime = None
+        self._key_checked_at = 0.0
+        self._key_id = None
+
+    def _load_public_key(self, now):
+        if self._key is not None and now - self._key_checked_at < self.key_check_seconds:
+            return self._key
+
+        self._key_checked_at = now
+        try:
+            mtime = os.stat(self.public_key_path).st_mtime
         except FileNotFoundError:
             print("ec_public.pem not found")
+            self._key = None
+            self._key_mtime = None
             return None
-        options = {"require": ["exp"]}
 
-    try:
-        payload = jwt.decode(token, key, algorithms=[alg], options=options)
-    except PyJWTError as e:
-        print("JWT decode failed:", e)
+        if self._key is None or mtime != self._key_mtime:
+            with open(self.public_key_path, "rb") as f:
+                self._key = f.read()
+            self._key_mtime = mtime
+
+        return self._key
+
+    def _key_set_id(self, now):
+        """
+        Identifies the current verification key material; cached results are
+        dropped whenever it changes (rotation, different test secret).
+        """
+        if _is_testing():
+            return ("HS256", os.getenv("JWT_SECRET", "test-secret"))
+        if self.jwks is not None:
+            return ("jwks", self.jwks.version)
+        key = self._load_public_key(now)
+        return ("ES256", key) if key is not None else None
+
+    def _resolve_key(self, token, key_set_id):
+        if key_set_id[0] == "HS256":
+            return "HS256", key_set_id[1]
+        if key_set_id[0] == "jwks":
+            kid = jwt.get_unverified_header(token).get("kid")
+            return "ES256", self.jwks.get_key(kid)
+        return "ES256", key_set_id[1]
+
+    def verify(self, token):
+        """
+        Return the decoded payload for a valid token, otherwise None.
+        """
+        now = time.time()
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+
+        # Starts the background refresh; only the very first call waits
+        if self.jwks is not None and not _is_testing():
+            self.jwks.start()
+
+        with self._lock:
+            key_id = self._key_set_id(now)
+            if key_id is None:
+                return None
+
+            if key_id != self._key_id:
+                self._cache.clear()
+                self._key_id = key_id
+
+            entry = self._cache.get(digest)
+            if entry is not None:
+                expires_at, payload = entry
+                if expires_at > now:
+                    self._cache.move_to_end(digest)
+                    return payload
+                del self._cache[digest]
+
+        try:
+            alg, key = self._resolve_key(token, key_id)
+            if key is None:
+                print("JWT decode failed: unknown signing key")
+                return None
+            payload = jwt.decode(token, key, algorithms=[alg], options={"require": ["exp"]})
+        except PyJWTError as e:
+            print("JWT decode failed:", e)
+            return None
+
+        expires_at = min(now + self.ttl_seconds, float(payload["exp"]))
+
+        with self._lock:
+            if key_id == self._key_id:
+                self._cache[digest] = (expires_at, payload)
+                self._cache.move_to_end(digest)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+        return payload
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_jwks_url = os.getenv("AUTH_JWKS_URL")
+
+_verifier = TokenVerifier(
+    jwks=JWKSClient(
+        _jwks_url,
+        refresh_seconds=int(os.getenv("JWKS_REFRESH_SECONDS", "300")),
+    ) if _jwks_url else None,
+    max_entries=int(os.getenv("JWT_CACHE_MAX_ENTRIES", "10000")),
+    ttl_seconds=int(os.getenv("JWT_CACHE_TTL_SECONDS", "300")),
+    key_check_seconds=int(os.getenv("JWT_KEY_CHECK_SECONDS", "30")),
+)
+
+
+def _fetch_revocations_from(url, token=None, timeout_seconds=3):
+    """
+    Builds a RevocationList fetch function backed by auth-service's
+    /internal/revocations feed, authenticated with the shared `token`.
+    """
+    def fetch(since_id):
+        req = urllib.request.Request(f"{url}?since={int(since_id)}")
+        if token:
+            req.add_header("X-Internal-Token", token)
+        with urllib.request.urlopen(req, timeout=timeout_seconds) as resp:
+            data = json.loads(resp.read())
+        rows = [(r["jti"], float(r["exp"])) for r in data.get("revocations", [])]
+        return int(data.get("last_id", since_id)), rows
+
+    return fetch
+
+
+_revocations_url = os.getenv("AUTH_REVOCATIONS_URL")
+
+# Disabled (nothing is ever revoked) when no feed is configured
+_revocations = RevocationList(
+    _fetch_revocations_from(_revocations_url, os.getenv("INTERNAL_API_TOKEN")),
+    sync_seconds=int(os.getenv("REVOCATION_SYNC_SECONDS", "5")),
+) if _revocations_url else None
+
+
+def get_authenticated_user_id(request):
+    auth = request.headers.get("Authorization", "")
+    if not auth.startswith("Bearer "):
+        return None
+
+    token = auth.split(" ", 1)[1].strip()
+    if not token:
+        return None
+
+    payload = _verifier.verify(token)
+    if payload is None:
+        return None
+
+    # Checked on every call, cached or not: revocation can happen after caching
+    if _revocations is not None and _revocations.is_revoked(payload.get("jti")):
         return None
 
     user_id = payload.get("sub")
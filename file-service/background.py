@@ -0,0 +1,59 @@
+import os
+import threading
+
+
+class PeriodicTask:
+    """
+    Runs `func` every `interval_seconds` on a daemon thread, off the request
+    path.
+
+    - One thread per process, started on first use (so it exists in each
+      gunicorn worker, not only in the preloading master).
+    - `wake` asks for an early run; the thread is never run more than once
+      at a time.
+    - `wait_first_run` blocks until the first run in this process has
+      finished (whether or not it succeeded). Later calls return at once.
+    - `func` reports its own failures; anything it lets escape is printed
+      and the next run goes ahead as scheduled.
+    """
+
+    def __init__(self, func, interval_seconds, name):
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._wake = threading.Event()
+        self._first_run = threading.Event()
+
+    def ensure_started(self):
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            # Events inherited across fork may hold a parent thread's state
+            self._wake = threading.Event()
+            self._first_run = threading.Event()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        self.ensure_started()
+        self._wake.set()
+
+    def wait_first_run(self, timeout=None):
+        self.ensure_started()
+        return self._first_run.wait(timeout)
+
+    def _run(self):
+        wake, first_run = self._wake, self._first_run
+        while True:
+            try:
+                self.func()
+            except Exception as e:
+                print(f"{self.name.upper()} FAILED:", repr(e))
+            first_run.set()
+            wake.wait(self.interval_seconds)
+            wake.clear()
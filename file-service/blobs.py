@@ -0,0 +1,190 @@
+import os
+import gzip
+import uuid
+import shutil
+from collections import Counter, defaultdict
+from sqlalchemy import select, update, delete
+from models import Blob
+from db import db
+from layout import make_sharded_path
+
+# Content types stored gzip-compressed at rest (comma separated; empty disables)
+COMPRESSED_CONTENT_TYPES = {
+    t.strip() for t in os.getenv("COMPRESS_AT_REST_TYPES", "text/plain").split(",") if t.strip()
+}
+GZIP_LEVEL = int(os.getenv("COMPRESS_AT_REST_LEVEL", "6"))
+
+
+class StoredFileReader:
+    """
+    Reads a gzip-stored blob back as its original bytes.
+
+    Deliberately has no fileno(): a WSGI server's sendfile path would
+    otherwise send the compressed bytes underneath.
+    """
+
+    def __init__(self, path):
+        self._gz = gzip.open(path, "rb")
+
+    def read(self, size=-1):
+        return self._gz.read(size)
+
+    def close(self):
+        self._gz.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def open_stored(storage_path, content_encoding=None):
+    """
+    Opens a stored file for reading its original (decoded) bytes.
+    """
+    if content_encoding == "gzip":
+        return StoredFileReader(storage_path)
+    return open(storage_path, "rb")
+
+
+def _write_gzip(src_path, dest_path):
+    """
+    Compresses src_path into dest_path, streaming. Returns the compressed size.
+    """
+    with open(src_path, "rb") as src, open(dest_path, "wb") as raw:
+        # mtime=0: same content always gives the same bytes
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL, mtime=0) as gz:
+            shutil.copyfileobj(src, gz)
+        return raw.tell()
+
+
+def _store_new_blob(temp_path, storage_path, size, content_type):
+    """
+    Moves temp_path into place, gzip-compressed when the type is compressible
+    and compression actually saves space. Returns the content encoding.
+    """
+    if content_type in COMPRESSED_CONTENT_TYPES and size > 0:
+        try:
+            compressed_size = _write_gzip(temp_path, storage_path)
+        except BaseException:
+            try:
+                os.remove(storage_path)
+            except OSError:
+                pass
+            raise
+
+        if compressed_size < size:
+            os.remove(temp_path)
+            return "gzip"
+
+    os.replace(temp_path, storage_path)
+    return None
+
+
+def unstore_new_blob(storage_path, temp_path, content_encoding):
+    """
+    Undoes _store_new_blob: puts the original bytes back at temp_path.
+    """
+    if content_encoding == "gzip":
+        with open_stored(storage_path, content_encoding) as src, open(temp_path, "wb") as dest:
+            shutil.copyfileobj(src, dest)
+        os.remove(storage_path)
+    else:
+        os.replace(storage_path, temp_path)
+
+
+def acquire_blob(temp_path, sha256, size, upload_dir, content_type=None):
+    """
+    Takes a reference on the blob for `sha256`, creating it from temp_path if
+    this content has not been stored before. Runs inside the caller's
+    transaction; the caller commits.
+
+    Returns (storage_path, created, content_encoding). When an existing blob
+    is reused the temp file is removed, so duplicate uploads only cost a
+    metadata row.
+    """
+    # The path comes back from the same statement that locks the row, so a
+    # concurrent move (shard-uploads) is either fully before or after it
+    existing = db.session.execute(
+        update(Blob)
+        .where(Blob.sha256 == sha256)
+        .values(ref_count=Blob.ref_count + 1)
+        .returning(Blob.storage_path, Blob.content_encoding)
+    ).first()
+    if existing is not None:
+        os.remove(temp_path)
+        storage_path, content_encoding = existing
+        return storage_path, False, content_encoding
+
+    # Unique suffix: a blob re-created after its last reference was deleted
+    # never shares a path with the old copy that is being unlinked
+    storage_path = make_sharded_path(upload_dir, f"{sha256}.{uuid.uuid4().hex[:8]}")
+    content_encoding = _store_new_blob(temp_path, storage_path, size, content_type)
+
+    db.session.add(Blob(
+        sha256=sha256,
+        storage_path=storage_path,
+        size_bytes=size,
+        content_encoding=content_encoding,
+        ref_count=1,
+    ))
+    return storage_path, True, content_encoding
+
+def release_blob(sha256, storage_path):
+    """
+    Drops one reference. Runs inside the caller's transaction.
+
+    Returns the path to unlink once the caller has committed, or None while
+    other files still reference the blob. Files stored before deduplication
+    (no matching blob) own their path outright, so that path is returned.
+    """
+    paths = release_blobs([(sha256, storage_path)])
+    return paths[0] if paths else None
+
+def release_blobs(refs):
+    """
+    release_blob for many files at once: `refs` is an iterable of
+    (sha256, storage_path). A constant number of statements regardless of
+    how many files are released. Returns the paths to unlink after commit.
+    """
+    refs = list(refs)
+    hashes = {sha256 for sha256, _ in refs if sha256}
+
+    blob_paths = {}
+    if hashes:
+        blob_paths = dict(db.session.execute(
+            select(Blob.sha256, Blob.storage_path).where(Blob.sha256.in_(hashes))
+        ).all())
+
+    unlink_paths = []
+    released = Counter()
+    for sha256, storage_path in refs:
+        if sha256 and blob_paths.get(sha256) == storage_path:
+            released[sha256] += 1
+        else:
+            unlink_paths.append(storage_path)
+
+    if not released:
+        return unlink_paths
+
+    # One UPDATE per distinct reference count dropped (nearly always just 1)
+    by_count = defaultdict(list)
+    for sha256, count in released.items():
+        by_count[count].append(sha256)
+    for count, shas in by_count.items():
+        db.session.execute(
+            update(Blob)
+            .where(Blob.sha256.in_(shas))
+            .values(ref_count=Blob.ref_count - count)
+            .execution_options(synchronize_session=False)
+        )
+
+    unlink_paths.extend(db.session.execute(
+        delete(Blob)
+        .where(Blob.sha256.in_(list(released)), Blob.ref_count <= 0)
+        .returning(Blob.storage_path)
+        .execution_options(synchronize_session=False)
+    ).scalars().all())
+    return unlink_paths
@@ -1,6 +1,14 @@
 import os
+import base64
+import binascii
+from datetime import datetime
+from sqlalchemy import tuple_, delete
 from models import File
 from db import db
+from blobs import release_blob, release_blobs
+from quota import remove_usage
+from unlinker import unlinker
+from thumbnails import thumbnail_paths, THUMBNAIL_CONTENT_TYPES
 
 def get_files_for_user(user_id: int):
     """
@@ -11,7 +19,57 @@ def get_files_for_user(user_id: int):
         List[File] (SQLAlchemy model objects)
     """
 
-    return File.query.filter_by(owner_user_id=user_id).all()
+    return File.query.filter_by(owner_user_id=user_id).order_by(File.created_at, File.id).all()
+
+def get_files_page_for_user(user_id: int, limit: int, after=None, descending=False):
+    """
+    One page of the user's files, ordered by (created_at, id).
+    `after` is the (created_at, id) of the last row of the previous page.
+
+    Keyset pagination on ix_files_owner_created_at_id: each page is an index
+    range scan, so its cost does not grow with the number of files.
+
+    Returns: (List[File], has_more)
+    """
+    query = File.query.filter_by(owner_user_id=user_id)
+
+    key = tuple_(File.created_at, File.id)
+    if descending:
+        if after is not None:
+            query = query.filter(key < after)
+        query = query.order_by(File.created_at.desc(), File.id.desc())
+    else:
+        if after is not None:
+            query = query.filter(key > after)
+        query = query.order_by(File.created_at, File.id)
+
+    # Fetch one extra row to know whether another page exists
+    files = query.limit(limit + 1).all()
+    return files[:limit], len(files) > limit
+
+
+def encode_files_cursor(f, descending=False):
+    """
+    Opaque cursor for the page after `f`. It records the order it was issued
+    for, so it cannot be replayed against the other one.
+    """
+    raw = f"{'desc' if descending else 'asc'}|{f.created_at.isoformat()}|{f.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_files_cursor(cursor, descending=False):
+    """
+    Returns (created_at, id). Raises ValueError on a malformed cursor, or one
+    issued for the other order.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        order, created_at, file_id = raw.split("|")
+        after = datetime.fromisoformat(created_at), int(file_id)
+    except (UnicodeError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+    if order != ("desc" if descending else "asc"):
+        raise ValueError("Cursor does not match the requested order")
+    return after
 
 
 def get_owned_file_or_none(user_id: int, file_id: int):
@@ -23,7 +81,8 @@ def get_owned_file_or_none(user_id: int, file_id: int):
 
 def delete_file_for_user(user_id: int, file_id: int) -> bool:
     """
-    Permanently deletes the file record + underlying stored file
+    Permanently deletes the file record. The stored blob is removed only
+    when no other file shares its content.
     Returns True if deleted, False if not found/not owned.
     """
 
@@ -31,18 +90,70 @@ def delete_file_for_user(user_id: int, file_id: int) -> bool:
     if not f:
         return False
     
-    # Try deleting from disk first
-    try:
-        if f.storage_path and os.path.exists(f.storage_path):
-            os.remove(f.storage_path)
-    except OSError:
-        # Can use RAISE if strict behaviour, for now still proceed to remove DB record
-        pass
+    # Drop this file's reference; the blob is only unlinked with its last one
+    unlink_path = release_blob(f.sha256, f.storage_path)
+    remove_usage(f.owner_user_id, f.size_bytes)
 
     db.session.delete(f)
     db.session.commit()
+
+    # Unlink after commit so a failed commit never loses shared content
+    if unlink_path:
+        for path in [unlink_path] + thumbnail_paths(unlink_path):
+            try:
+                os.remove(path)
+            except OSError:
+                # Can use RAISE if strict behaviour; the DB record is already gone
+                pass
+
     return True
 
+def delete_files_for_user(user_id: int, file_ids) -> list:
+    """
+    Deletes many of the user's files at once. Ownership check and row
+    delete are one statement; blob references and the usage counter are
+    updated set-wise in the same transaction. Disk unlinks are handed to
+    the background unlinker after commit.
+
+    Returns the ids actually deleted (ids not owned or not found are skipped).
+    """
+    file_ids = list(set(file_ids))
+    if not file_ids:
+        return []
+
+    rows = db.session.execute(
+        delete(File)
+        .where(File.owner_user_id == user_id, File.id.in_(file_ids))
+        .returning(File.id, File.sha256, File.storage_path, File.size_bytes, File.content_type)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    if not rows:
+        db.session.rollback()
+        return []
+
+    unlink_paths = release_blobs((r.sha256, r.storage_path) for r in rows)
+    remove_usage(user_id, sum(r.size_bytes for r in rows), len(rows))
+    db.session.commit()
+
+    # Only images can have cached thumbnails; skip the directory scan for the rest
+    image_paths = {r.storage_path for r in rows if r.content_type in THUMBNAIL_CONTENT_TYPES}
+    thumbs = [t for p in unlink_paths if p in image_paths for t in thumbnail_paths(p)]
+    unlinker.submit(unlink_paths + thumbs)
+    return [r.id for r in rows]
+
+def get_files_for_archive(user_id: int, file_ids):
+    """
+    The owned files among `file_ids`, in the order they were requested.
+    Returns (files, missing_ids).
+    """
+    wanted = list(dict.fromkeys(file_ids))
+    found = {
+        f.id: f
+        for f in File.query.filter(File.owner_user_id == user_id, File.id.in_(wanted))
+    }
+    return [found[i] for i in wanted if i in found], [i for i in wanted if i not in found]
+
 def get_file_for_download(user_id: int, file_id: int):
     """
     Returns the File object if owned; otherwise None.
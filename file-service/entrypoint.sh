@@ -9,5 +9,5 @@ if [ "$(id -u)" = "0" ]; then
   chown -R appuser:appuser "${UPLOAD_DIR:-/data/uploads}"
 fi
 
-# Drop to appuser and run app
-exec su appuser -c "python app.py"
\ No newline at end of file
+# Drop to appuser and run app under gunicorn (see gunicorn.conf.py)
+exec su appuser -c "gunicorn -c gunicorn.conf.py app:app"
\ No newline at end of file
@@ -0,0 +1,41 @@
+# Production WSGI server config for file-service
+#   gunicorn -c gunicorn.conf.py app:app
+# Every setting can be overridden through the environment.
+import os
+import multiprocessing
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5002")
+
+# Mostly disk and DB I/O: threaded workers keep uploads from blocking each other
+workers = int(os.getenv("GUNICORN_WORKERS", str(multiprocessing.cpu_count() * 2 + 1)))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Uploads and downloads of large files need more headroom than JSON calls
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Recycle workers periodically to cap slow memory growth
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "500"))
+
+# Import the app (config, DB engine setup) once in the master
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# Serve download bodies with sendfile(2) through wsgi.file_wrapper
+sendfile = os.getenv("GUNICORN_SENDFILE", "true").lower() == "true"
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    # Pooled DB connections must never be shared across processes
+    from db import db
+
+    app = server.app.wsgi()
+    if app is None:
+        return
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,189 @@
+import os
+import time
+from sqlalchemy import select, update
+from models import File, Blob
+from db import db
+from thumbnails import thumbnail_paths
+
+# Stored files go under <UPLOAD_DIR>/ab/cd/<name> (two levels of two hex
+# characters from the name). 0 keeps everything flat in UPLOAD_DIR
+FANOUT_DEPTH = int(os.getenv("UPLOAD_FANOUT_DEPTH", "2"))
+FANOUT_WIDTH = 2
+
+
+def sharded_path(upload_dir, name, depth=None):
+    """
+    Where a stored file called `name` lives. Names are hex (SHA-256 or
+    uuid4), so every shard directory gets an even share.
+    """
+    depth = FANOUT_DEPTH if depth is None else depth
+    shards = [name[i * FANOUT_WIDTH:(i + 1) * FANOUT_WIDTH] for i in range(depth)]
+    return os.path.join(upload_dir, *shards, name)
+
+
+def make_sharded_path(upload_dir, name, depth=None):
+    path = sharded_path(upload_dir, name, depth)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def _target_for(upload_dir, storage_path, depth):
+    return sharded_path(upload_dir, os.path.basename(storage_path), depth)
+
+
+def _link(old_path, new_path):
+    """
+    Makes the content reachable at new_path too. Returns True if this call
+    created the link, False if it was already there, None if there is no
+    content to move.
+    """
+    if not os.path.exists(old_path):
+        return None
+
+    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+    try:
+        os.link(old_path, new_path)
+        return True
+    except FileExistsError:
+        return False
+    except FileNotFoundError:
+        return None
+
+
+def _still_referenced(sha256, old_path):
+    """
+    True if a file row or blob still points at old_path, e.g. a duplicate
+    upload that read the blob's path just before it was moved.
+    """
+    if db.session.execute(
+        select(File.id).where(File.storage_path == old_path).limit(1)
+    ).first():
+        return True
+    return sha256 is not None and db.session.execute(
+        select(Blob.sha256).where(Blob.sha256 == sha256, Blob.storage_path == old_path)
+    ).first() is not None
+
+
+def _finish_batch(moved, grace_seconds):
+    """
+    Unlinks the old names once the new ones are committed. The grace period
+    lets requests that read the old path just before commit open it.
+    Cached thumbnails at the old name go too; they are re-rendered on demand.
+    """
+    if not moved:
+        return
+    time.sleep(grace_seconds)
+    for old_path in moved:
+        for path in [old_path] + thumbnail_paths(old_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def migrate_to_sharded_layout(upload_dir, depth=None, batch_size=500, grace_seconds=2.0):
+    """
+    Moves existing stored files into the sharded layout while the service
+    keeps running. Returns how many files on disk were moved.
+
+    Each file is first hard-linked at its new path, so both names work. The
+    row is then repointed with a compare-and-set on the old path, and the
+    old name is only unlinked after commit. A row changed underneath us
+    (deleted, re-pointed) is skipped and our extra link removed.
+
+    Safe to re-run: anything already in place is left alone.
+    """
+    depth = FANOUT_DEPTH if depth is None else depth
+    moved_total = 0
+
+    # Pass 1: shared blobs, and every file row pointing at them
+    last_sha = ""
+    while True:
+        blobs = db.session.execute(
+            select(Blob.sha256, Blob.storage_path)
+            .where(Blob.sha256 > last_sha)
+            .order_by(Blob.sha256)
+            .limit(batch_size)
+        ).all()
+        if not blobs:
+            break
+        last_sha = blobs[-1].sha256
+
+        moved = []
+        for sha256, old_path in blobs:
+            new_path = _target_for(upload_dir, old_path, depth)
+            if os.path.normpath(new_path) == os.path.normpath(old_path):
+                continue
+
+            created = _link(old_path, new_path)
+            if created is None:
+                continue
+
+            result = db.session.execute(
+                update(Blob)
+                .where(Blob.sha256 == sha256, Blob.storage_path == old_path)
+                .values(storage_path=new_path)
+            )
+            if not result.rowcount:
+                if created:
+                    os.remove(new_path)
+                continue
+
+            db.session.execute(
+                update(File)
+                .where(File.sha256 == sha256, File.storage_path == old_path)
+                .values(storage_path=new_path)
+                .execution_options(synchronize_session=False)
+            )
+            moved.append((sha256, old_path))
+
+        db.session.commit()
+
+        # A row that still names the old path keeps it; pass 2 moves it
+        old_paths = [p for sha256, p in moved if not _still_referenced(sha256, p)]
+        _finish_batch(old_paths, grace_seconds)
+        moved_total += len(old_paths)
+
+    # Pass 2: files stored before deduplication, which own their path
+    last_id = 0
+    while True:
+        files = db.session.execute(
+            select(File.id, File.sha256, File.storage_path)
+            .where(File.id > last_id)
+            .order_by(File.id)
+            .limit(batch_size)
+        ).all()
+        if not files:
+            break
+        last_id = files[-1].id
+
+        moved = []
+        for file_id, sha256, old_path in files:
+            new_path = _target_for(upload_dir, old_path, depth)
+            if os.path.normpath(new_path) == os.path.normpath(old_path):
+                continue
+
+            created = _link(old_path, new_path)
+            if created is None:
+                continue
+
+            result = db.session.execute(
+                update(File)
+                .where(File.id == file_id, File.storage_path == old_path)
+                .values(storage_path=new_path)
+                .execution_options(synchronize_session=False)
+            )
+            if not result.rowcount:
+                if created:
+                    os.remove(new_path)
+                continue
+            moved.append((sha256, old_path))
+
+        db.session.commit()
+
+        # Keep an old name that some other row (or blob) still points at
+        old_paths = [p for sha256, p in moved if not _still_referenced(sha256, p)]
+        _finish_batch(old_paths, grace_seconds)
+        moved_total += len(old_paths)
+
+    return moved_total
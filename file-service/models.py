@@ -3,6 +3,11 @@ from db import db
 
 class File(db.Model):
     __tablename__ = "files"
+    __table_args__ = (
+        # Serves the per-owner dashboard listing: filter, sort and keyset
+        # predicate all come from this one index
+        db.Index("ix_files_owner_created_at_id", "owner_user_id", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     owner_user_id = db.Column(db.Integer, nullable=False)
@@ -12,4 +17,75 @@ class File(db.Model):
     content_type = db.Column(db.String(100), nullable=False)
     size_bytes = db.Column(db.BigInteger, nullable=False)
 
+    # SHA-256 of the stored bytes, computed while streaming the upload
+    sha256 = db.Column(db.String(64), nullable=True, index=True)
+    # "gzip" when stored compressed at rest; NULL when stored as uploaded
+    content_encoding = db.Column(db.String(20), nullable=True)
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class Blob(db.Model):
+    """
+    One stored copy of some content, shared by every File row whose sha256
+    matches. ref_count is the number of those File rows.
+    """
+    __tablename__ = "blobs"
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    storage_path = db.Column(db.String(500), nullable=False)
+    size_bytes = db.Column(db.BigInteger, nullable=False)
+    content_encoding = db.Column(db.String(20), nullable=True)
+    ref_count = db.Column(db.Integer, nullable=False, default=1)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class UploadSession(db.Model):
+    """
+    A resumable upload in progress. Chunks are stored separately on disk and
+    assembled into a File when the client completes the session.
+    """
+    __tablename__ = "upload_sessions"
+
+    id = db.Column(db.String(32), primary_key=True)
+    owner_user_id = db.Column(db.Integer, nullable=False)
+
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(100), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+
+    # "open" while chunks are accepted; "completing"/"aborting" once one
+    # request has claimed the session to finish it
+    state = db.Column(db.String(16), nullable=False, default="open", server_default="open")
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class UploadChunk(db.Model):
+    __tablename__ = "upload_chunks"
+
+    session_id = db.Column(
+        db.String(32),
+        db.ForeignKey("upload_sessions.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    chunk_index = db.Column(db.Integer, primary_key=True)
+    size_bytes = db.Column(db.Integer, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)
+
+
+class UserStorageUsage(db.Model):
+    """
+    Running totals of what each user stores, kept in step with `files` by
+    the upload and delete transactions (and corrected by reconciliation).
+    """
+    __tablename__ = "user_storage_usage"
+
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    used_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    file_count = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
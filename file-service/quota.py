@@ -0,0 +1,151 @@
+from sqlalchemy import select, update, func, case
+from sqlalchemy.exc import IntegrityError
+from models import File, UserStorageUsage
+from db import db
+
+class QuotaExceeded(ValueError):
+    pass
+
+def get_usage(user_id: int):
+    """
+    Returns (used_bytes, file_count) from the counter row; one primary-key read.
+    """
+    usage = db.session.get(UserStorageUsage, user_id)
+    if usage is None:
+        return 0, 0
+    return usage.used_bytes, usage.file_count
+
+def _ensure_usage_row(user_id: int):
+    if db.session.get(UserStorageUsage, user_id) is not None:
+        return
+    db.session.add(UserStorageUsage(user_id=user_id, used_bytes=0, file_count=0))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Created concurrently by another request
+        db.session.rollback()
+
+def check_quota(user_id: int, incoming_bytes: int, quota_bytes):
+    """
+    Cheap pre-check, run before any bytes are written. Raises QuotaExceeded
+    if `incoming_bytes` more would not fit. A quota of None means unlimited.
+
+    Also makes sure the user's counter row exists, so later updates in the
+    upload transaction never have to insert it.
+    """
+    _ensure_usage_row(user_id)
+    if quota_bytes is None:
+        return
+
+    used_bytes, _ = get_usage(user_id)
+    if used_bytes + incoming_bytes > quota_bytes:
+        raise QuotaExceeded("Storage quota exceeded")
+
+def add_usage(user_id: int, size: int, quota_bytes=None):
+    """
+    Counts a new file against the user, inside the caller's transaction.
+    The quota test is part of the UPDATE, so concurrent uploads cannot
+    overshoot it together.
+    """
+    stmt = (
+        update(UserStorageUsage)
+        .where(UserStorageUsage.user_id == user_id)
+        .values(
+            used_bytes=UserStorageUsage.used_bytes + size,
+            file_count=UserStorageUsage.file_count + 1,
+        )
+    )
+    if quota_bytes is not None:
+        stmt = stmt.where(UserStorageUsage.used_bytes + size <= quota_bytes)
+
+    if db.session.execute(stmt).rowcount:
+        return
+
+    if db.session.get(UserStorageUsage, user_id) is not None:
+        raise QuotaExceeded("Storage quota exceeded")
+
+    if quota_bytes is not None and size > quota_bytes:
+        raise QuotaExceeded("Storage quota exceeded")
+    db.session.add(UserStorageUsage(user_id=user_id, used_bytes=size, file_count=1))
+
+def remove_usage(user_id: int, size: int, file_count: int = 1):
+    """
+    Uncounts deleted files (`size` is their total), inside the caller's
+    transaction.
+    """
+    db.session.execute(
+        update(UserStorageUsage)
+        .where(UserStorageUsage.user_id == user_id)
+        .values(
+            # Never below zero, even if the counter had drifted low
+            used_bytes=case(
+                (UserStorageUsage.used_bytes > size, UserStorageUsage.used_bytes - size),
+                else_=0,
+            ),
+            file_count=case(
+                (UserStorageUsage.file_count > file_count, UserStorageUsage.file_count - file_count),
+                else_=0,
+            ),
+        )
+    )
+
+def reconcile_storage_usage(batch_size: int = 500) -> int:
+    """
+    Recomputes the counters from `files` and fixes any drift, one batch of
+    users per transaction so no long lock is held. Returns how many counter
+    rows were corrected.
+
+    The batch's counter rows are locked before the sums are read, so an
+    upload or delete committing in between is not overwritten.
+    """
+    fixed = 0
+    last_user_id = None
+
+    while True:
+        owners = select(File.owner_user_id).distinct().order_by(File.owner_user_id).limit(batch_size)
+        if last_user_id is not None:
+            owners = owners.where(File.owner_user_id > last_user_id)
+        user_ids = db.session.execute(owners).scalars().all()
+        if not user_ids:
+            break
+        last_user_id = user_ids[-1]
+
+        counters = {
+            u.user_id: u
+            for u in db.session.execute(
+                select(UserStorageUsage)
+                .where(UserStorageUsage.user_id.in_(user_ids))
+                .with_for_update()
+            ).scalars()
+        }
+        totals = db.session.execute(
+            select(File.owner_user_id, func.sum(File.size_bytes), func.count(File.id))
+            .where(File.owner_user_id.in_(user_ids))
+            .group_by(File.owner_user_id)
+        ).all()
+
+        for user_id, used_bytes, file_count in totals:
+            usage = counters.get(user_id)
+            if usage is None:
+                db.session.add(UserStorageUsage(user_id=user_id, used_bytes=used_bytes, file_count=file_count))
+                fixed += 1
+            elif (usage.used_bytes, usage.file_count) != (used_bytes, file_count):
+                usage.used_bytes = used_bytes
+                usage.file_count = file_count
+                fixed += 1
+
+        db.session.commit()
+
+    # Counters for users who no longer have any files
+    stale = db.session.execute(
+        update(UserStorageUsage)
+        .where(
+            (UserStorageUsage.used_bytes != 0) | (UserStorageUsage.file_count != 0),
+            ~select(File.id).where(File.owner_user_id == UserStorageUsage.user_id).exists(),
+        )
+        .values(used_bytes=0, file_count=0)
+    )
+    fixed += stale.rowcount
+    db.session.commit()
+
+    return fixed
@@ -0,0 +1,291 @@
+import os
+import uuid
+import shutil
+import hashlib
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, func, or_
+from sqlalchemy.exc import IntegrityError
+from models import UploadSession, UploadChunk
+from db import db
+from upload import CHUNK_SIZE, _stream_to_temp_file, create_file_from_temp
+from quota import check_quota
+
+# Chunks live under UPLOAD_DIR, next to the blobs they are assembled into,
+# so the final rename never crosses filesystems
+SESSIONS_DIRNAME = ".sessions"
+
+SESSION_OPEN = "open"
+SESSION_COMPLETING = "completing"
+SESSION_ABORTING = "aborting"
+
+# A claimed session whose request died mid-way is swept this long after it expires
+CLAIMED_SESSION_GRACE = timedelta(hours=1)
+
+class UploadSessionBusy(Exception):
+    """
+    Another request is already completing or aborting the session.
+    """
+
+class TooManyUploadSessions(Exception):
+    """
+    The user already has as many unexpired sessions as allowed.
+    """
+
+def _session_dir(upload_dir, session_id):
+    return os.path.join(upload_dir, SESSIONS_DIRNAME, session_id)
+
+def _chunk_path(upload_dir, session_id, index):
+    return os.path.join(_session_dir(upload_dir, session_id), str(index))
+
+def chunk_count(session):
+    return max(1, -(-session.total_size // session.chunk_size))
+
+def expected_chunk_size(session, index):
+    """
+    Every chunk is chunk_size bytes except the last, which holds the rest.
+    """
+    last = chunk_count(session) - 1
+    if index < last:
+        return session.chunk_size
+    return session.total_size - last * session.chunk_size
+
+def _delete_session_rows(session):
+    UploadChunk.query.filter_by(session_id=session.id).delete()
+    db.session.delete(session)
+
+def expire_upload_sessions(upload_dir, now=None):
+    """
+    Deletes abandoned sessions and their chunks. Returns how many were removed.
+    """
+    now = now or datetime.utcnow()
+    # A claimed session is left to the request that claimed it, unless
+    # that request is long gone
+    expired = UploadSession.query.filter(
+        UploadSession.expires_at <= now,
+        or_(UploadSession.state == SESSION_OPEN, UploadSession.expires_at <= now - CLAIMED_SESSION_GRACE),
+    ).all()
+    for session in expired:
+        _delete_session_rows(session)
+    if expired:
+        db.session.commit()
+
+    # Chunk files go only after the rows are gone
+    for session in expired:
+        shutil.rmtree(_session_dir(upload_dir, session.id), ignore_errors=True)
+    return len(expired)
+
+def open_session_usage(user_id, now=None):
+    """
+    Returns (session count, declared bytes) of the user's unexpired
+    sessions: disk their chunks may still take up under `.sessions/`.
+    """
+    now = now or datetime.utcnow()
+    count, reserved = db.session.execute(
+        select(func.count(), func.coalesce(func.sum(UploadSession.total_size), 0))
+        .where(UploadSession.owner_user_id == user_id, UploadSession.expires_at > now)
+    ).one()
+    return count, reserved
+
+def create_upload_session(user_id, filename, content_type, total_size, chunk_size,
+                          upload_dir, max_size, max_chunk_size, ttl_seconds,
+                          allowed_types=None, quota_bytes=None, max_open_sessions=None):
+    if not filename:
+        raise ValueError("No filename provided")
+
+    if allowed_types is not None and content_type not in allowed_types:
+        raise ValueError("The uploaded file does not meet the upload requirements.")
+
+    if not isinstance(total_size, int) or total_size < 0 or total_size > max_size:
+        raise ValueError("The uploaded file does not meet the upload requirements.")
+
+    if not isinstance(chunk_size, int) or chunk_size <= 0 or chunk_size > max_chunk_size:
+        raise ValueError("Invalid chunk size")
+
+    # Cheap indexed query; keeps abandoned sessions from piling up
+    expire_upload_sessions(upload_dir)
+
+    # Open sessions hold disk before they become files: cap how many a user
+    # may have, and count their declared sizes as already used
+    open_count, reserved = open_session_usage(user_id)
+    if max_open_sessions is not None and open_count >= max_open_sessions:
+        raise TooManyUploadSessions(user_id)
+
+    # Refuse before any chunk is sent; completion re-checks atomically
+    check_quota(user_id, total_size + reserved, quota_bytes)
+
+    session = UploadSession(
+        id=uuid.uuid4().hex,
+        owner_user_id=user_id,
+        filename=os.path.basename(filename),
+        content_type=content_type,
+        total_size=total_size,
+        chunk_size=chunk_size,
+        expires_at=datetime.utcnow() + timedelta(seconds=ttl_seconds),
+    )
+
+    os.makedirs(_session_dir(upload_dir, session.id), exist_ok=True)
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+def get_upload_session(user_id, session_id):
+    """
+    Returns the caller's live session, or None if missing, expired or not owned.
+    """
+    session = db.session.get(UploadSession, session_id)
+    if not session or session.owner_user_id != user_id:
+        return None
+    if session.expires_at <= datetime.utcnow():
+        return None
+    return session
+
+def received_chunks(session):
+    return UploadChunk.query.filter_by(session_id=session.id).order_by(UploadChunk.chunk_index).all()
+
+def contiguous_offset(session, chunks):
+    """
+    Bytes received without gaps from the start: where a sequential client resumes.
+    """
+    offset = 0
+    for expected, chunk in enumerate(chunks):
+        if chunk.chunk_index != expected:
+            break
+        offset += chunk.size_bytes
+    return offset
+
+def claim_upload_session(session, state):
+    """
+    Moves an open session to `state` in one conditional UPDATE, so only one
+    request can complete or abort it. Raises UploadSessionBusy for the others.
+    """
+    claimed = db.session.execute(
+        update(UploadSession)
+        .where(UploadSession.id == session.id, UploadSession.state == SESSION_OPEN)
+        .values(state=state)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        raise UploadSessionBusy(session.id)
+
+def _reopen_upload_session(session):
+    db.session.rollback()
+    db.session.execute(
+        update(UploadSession)
+        .where(UploadSession.id == session.id, UploadSession.state == SESSION_COMPLETING)
+        .values(state=SESSION_OPEN)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+def _ensure_open(session):
+    db.session.refresh(session)
+    if session.state != SESSION_OPEN:
+        raise UploadSessionBusy(session.id)
+
+def save_chunk(session, index, stream, upload_dir, expected_sha256=None):
+    """
+    Stores one chunk. Chunks may arrive in any order and in parallel;
+    re-sending an index replaces the earlier copy. Refused once the session
+    is being completed or aborted.
+    """
+    _ensure_open(session)
+    if index < 0 or index >= chunk_count(session):
+        raise ValueError("Chunk index out of range")
+
+    expected_size = expected_chunk_size(session, index)
+    chunk_dir = _session_dir(upload_dir, session.id)
+    os.makedirs(chunk_dir, exist_ok=True)
+
+    temp_path, size, checksum = _stream_to_temp_file(stream, chunk_dir, expected_size)
+    if size != expected_size or (expected_sha256 and expected_sha256.lower() != checksum):
+        os.remove(temp_path)
+        raise ValueError("Chunk does not match its declared size or checksum")
+
+    # The session may have been claimed while the chunk streamed in
+    try:
+        _ensure_open(session)
+    except UploadSessionBusy:
+        os.remove(temp_path)
+        raise
+
+    os.replace(temp_path, _chunk_path(upload_dir, session.id, index))
+
+    chunk = db.session.get(UploadChunk, (session.id, index))
+    if chunk is None:
+        chunk = UploadChunk(session_id=session.id, chunk_index=index, size_bytes=size, sha256=checksum)
+        db.session.add(chunk)
+    else:
+        chunk.size_bytes = size
+        chunk.sha256 = checksum
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Same index sent twice concurrently: the other request recorded it,
+        # and both wrote identical bytes
+        db.session.rollback()
+    return checksum
+
+def complete_upload_session(session, upload_dir, expected_sha256=None, quota_bytes=None):
+    """
+    Concatenates the chunks into one temp file, piece by piece, then stores
+    it like a normal upload. The session and its chunks are removed.
+
+    The session is claimed first, so a retried or concurrent completion
+    gets UploadSessionBusy instead of storing the file twice. If this one
+    fails before the File is stored, the session is reopened for another try.
+    """
+    claim_upload_session(session, SESSION_COMPLETING)
+    try:
+        file = _assemble_upload(session, upload_dir, expected_sha256, quota_bytes)
+    except BaseException:
+        _reopen_upload_session(session)
+        raise
+
+    # The File is committed; a failure from here on only leaves the session
+    # for expiry to clean up
+    abort_upload_session(session, upload_dir)
+    return file
+
+def _assemble_upload(session, upload_dir, expected_sha256, quota_bytes):
+    chunks = received_chunks(session)
+    if [c.chunk_index for c in chunks] != list(range(chunk_count(session))):
+        raise ValueError("Upload is missing chunks")
+
+    fd, temp_path = tempfile.mkstemp(dir=upload_dir, prefix=".upload-")
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in chunks:
+                with open(_chunk_path(upload_dir, session.id, chunk.chunk_index), "rb") as src:
+                    while True:
+                        data = src.read(CHUNK_SIZE)
+                        if not data:
+                            break
+                        size += len(data)
+                        digest.update(data)
+                        out.write(data)
+
+        checksum = digest.hexdigest()
+        if size != session.total_size or (expected_sha256 and expected_sha256.lower() != checksum):
+            raise ValueError("Assembled upload does not match its declared size or checksum")
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    return create_file_from_temp(
+        session.owner_user_id, session.filename, session.content_type,
+        temp_path, size, checksum, upload_dir, quota_bytes,
+    )
+
+def abort_upload_session(session, upload_dir):
+    _delete_session_rows(session)
+    db.session.commit()
+    shutil.rmtree(_session_dir(upload_dir, session.id), ignore_errors=True)
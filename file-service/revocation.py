@@ -0,0 +1,67 @@
+import time
+import threading
+from background import PeriodicTask
+
+
+class RevocationList:
+    """
+    Read-only mirror of auth-service's revoked tokens, fed from its
+    /internal/revocations feed.
+
+    The authoritative store, and the Bloom-filtered list it uses on its
+    own hot path, live in auth-service (utils/revocation.py). This side
+    only needs the feed's sync contract and a set lookup:
+
+    `fetch(since_id)` must return (last_id, [(jti, expires_at_epoch), ...]) for
+    revocations newer than `since_id`. A background thread calls it every
+    `sync_seconds`, so only new rows cross the wire and a slow or down
+    auth-service never stalls a request. The last `overlap` ids are re-read
+    each time so rows committed out of id order are not missed. Expired
+    entries are dropped every `prune_seconds`.
+
+    Lookups are served from the current mirror. Only the first lookup in a
+    process waits (up to `first_sync_timeout`) for the first sync.
+    """
+
+    def __init__(self, fetch, sync_seconds=5, prune_seconds=3600, overlap=100, first_sync_timeout=3):
+        self.fetch = fetch
+        self.sync_seconds = sync_seconds
+        self.prune_seconds = prune_seconds
+        self.overlap = overlap
+        self.first_sync_timeout = first_sync_timeout
+
+        self._lock = threading.Lock()
+        self._revoked = {}  # jti -> expires_at
+        self._last_id = 0
+        self._pruned_at = time.monotonic()
+        self._task = PeriodicTask(self.sync, sync_seconds, name="revocation-sync")
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def sync(self):
+        try:
+            last_id, rows = self.fetch(max(0, self._last_id - self.overlap))
+        except Exception as e:
+            print("REVOCATION SYNC FAILED:", repr(e))
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            self._revoked.update(rows)
+            self._last_id = max(self._last_id, last_id)
+
+            if now - self._pruned_at >= self.prune_seconds:
+                wall = time.time()
+                self._revoked = {j: exp for j, exp in self._revoked.items() if exp > wall}
+                self._pruned_at = now
+
+    def is_revoked(self, jti):
+        if not jti:
+            return False
+
+        self._task.wait_first_run(self.first_sync_timeout)
+
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
@@ -1,8 +1,40 @@
 import os
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request, jsonify, send_file, current_app, Response, stream_with_context
 from models import File
-from dashboard import get_files_for_user, delete_file_for_user, get_file_for_download
+from dashboard import (
+    get_files_for_user,
+    get_files_page_for_user,
+    encode_files_cursor,
+    decode_files_cursor,
+    delete_file_for_user,
+    delete_files_for_user,
+    get_file_for_download,
+    get_files_for_archive,
+)
+from archive import iter_zip
+from blobs import open_stored
+from thumbnails import (
+    thumbnail_pool,
+    ThumbnailsBusy,
+    ThumbnailFailed,
+    THUMBNAIL_CONTENT_TYPES,
+)
 from upload import save_upload_for_user
+from resumable import (
+    create_upload_session,
+    get_upload_session,
+    received_chunks,
+    contiguous_offset,
+    chunk_count,
+    save_chunk,
+    complete_upload_session,
+    claim_upload_session,
+    abort_upload_session,
+    UploadSessionBusy,
+    TooManyUploadSessions,
+    SESSION_ABORTING,
+)
+from quota import check_quota, get_usage, QuotaExceeded
 from auth import get_authenticated_user_id
 from notify import notify_event
 from datetime import datetime, timezone
@@ -19,10 +51,45 @@ def _email_body(event, status, user_id=None, extra=""):
     )
     return base + (f" {extra}" if extra else "")
 
+def _file_json(f):
+    return {
+        "id": f.id,
+        "filename": f.filename,
+        "content_type": f.content_type,
+        "size_bytes": f.size_bytes,
+        "created_at": f.created_at.isoformat(),
+    }
+
+def _after_upload(saved):
+    # Queue the preview now so the first dashboard view finds it ready
+    if saved.content_type in THUMBNAIL_CONTENT_TYPES:
+        thumbnail_pool.schedule(saved.storage_path, saved.content_encoding)
+
+def _quota_exceeded_response(user_id):
+    current_app.logger.warning("upload_quota_exceeded | user_id=%s", user_id)
+    notify_event(
+        event_type="upload_invalid",
+        subject="Upload rejected",
+        body=_email_body("upload_quota_exceeded", 413, user_id),
+        dedupe_key=request.remote_addr or "unknown"
+    )
+    return jsonify({"error": "Storage quota exceeded"}), 413
+
 bp = Blueprint("routes", __name__)
 
+# Slack for multipart boundaries and part headers on top of the file itself
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+
+DASHBOARD_PAGE_DEFAULT_LIMIT = 100
+DASHBOARD_PAGE_MAX_LIMIT = 1000
+
 @bp.get("/dashboard")
 def dashboard():
+    """
+    - no params: every file the user owns, oldest first
+    - ?limit=N&cursor=C&order=asc|desc: one page ordered by upload time;
+      the next cursor is in `next_cursor` and the X-Next-Cursor header
+    """
     user_id = get_authenticated_user_id(request)
 
     #AC-DASH-02: unauthenticated -> 401
@@ -36,20 +103,69 @@ def dashboard():
         current_app.logger.warning("dashboard_unauthorized | ip=%s", request.remote_addr)
         return jsonify({"error": "Unauthorized"}), 401
 
+    limit = request.args.get("limit")
+    cursor = request.args.get("cursor")
+    order = request.args.get("order", "asc")
+    if order not in ("asc", "desc"):
+        return jsonify({"error": "Invalid order"}), 400
+    descending = order == "desc"
+
     # AC-DASH-03/04: server-enforced ownership filtering + empty list is OK
-    files = get_files_for_user(user_id)
+    if limit is None and not cursor:
+        files = get_files_for_user(user_id)
+        if descending:
+            files.reverse()
+        return jsonify({"files": [_file_json(f) for f in files]}), 200
+
+    after = None
+    if cursor:
+        try:
+            after = decode_files_cursor(cursor, descending)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    try:
+        limit = int(limit) if limit is not None else DASHBOARD_PAGE_DEFAULT_LIMIT
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    if limit < 1:
+        return jsonify({"error": "Invalid limit"}), 400
+    limit = min(limit, DASHBOARD_PAGE_MAX_LIMIT)
+
+    files, has_more = get_files_page_for_user(user_id, limit, after, descending=descending)
+
+    next_cursor = encode_files_cursor(files[-1], descending) if has_more else None
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+    return jsonify({
+        "files": [_file_json(f) for f in files],
+        "next_cursor": next_cursor,
+    }), 200, headers
+
+@bp.get("/dashboard/usage")
+def dashboard_usage():
+    """
+    The user's storage usage, read from the counter row (no SUM over files).
+    """
+    user_id = get_authenticated_user_id(request)
+    if not user_id:
+        notify_event(
+            event_type="security_dashboard_unauthorized",
+            subject="Unauthorized dashboard access",
+            body=f"event=dashboard_unauthorized status=401 method={request.method} path={request.path} ip={request.remote_addr}",
+            dedupe_key=request.remote_addr or "unknown"
+        )
+        current_app.logger.warning("dashboard_unauthorized | ip=%s", request.remote_addr)
+        return jsonify({"error": "Unauthorized"}), 401
+
+    used_bytes, file_count = get_usage(user_id)
+    quota_bytes = current_app.config["STORAGE_QUOTA_BYTES"]
 
     return jsonify({
-        "files": [
-            {
-                "id": f.id,
-                "filename": f.filename,
-                "content_type": f.content_type,
-                "size_bytes": f.size_bytes,
-                "created_at": f.created_at.isoformat(),
-            }
-            for f in files
-        ]
+        "used_bytes": used_bytes,
+        "file_count": file_count,
+        "quota_bytes": quota_bytes,
+        "remaining_bytes": max(0, quota_bytes - used_bytes) if quota_bytes is not None else None,
     }), 200
 
 @bp.post("/dashboard/upload")
@@ -67,7 +183,41 @@ def upload_dashboard_file():
         )
         current_app.logger.warning("upload_unauthorized | ip=%s", request.remote_addr)
         return jsonify({"error": "Unauthorized"}), 401
-    
+
+    # request.files makes Werkzeug read (and spool) the whole body, bounded
+    # only by Content-Length. A chunked body has none, so nothing would bound it
+    if request.content_length is None and "chunked" in request.headers.get("Transfer-Encoding", "").lower():
+        current_app.logger.warning("upload_length_required | user_id=%s", user_id)
+        return jsonify({"error": "Content-Length required"}), 411
+
+    # Reject bodies that are too large from Content-Length alone,
+    # before request.files makes Werkzeug read (and spool) them
+    max_size = current_app.config["MAX_UPLOAD_SIZE_BYTES"]
+    if request.content_length is not None and request.content_length > max_size + UPLOAD_FORM_OVERHEAD_BYTES:
+        current_app.logger.warning(
+            "upload_too_large | user_id=%s content_length=%s", user_id, request.content_length
+        )
+        notify_event(
+            event_type="upload_invalid",
+            subject="Upload rejected",
+            body=_email_body("upload_too_large", 413, user_id),
+            dedupe_key=request.remote_addr or "unknown"
+        )
+        return jsonify({"error": "File too large"}), 413
+
+    # O(1) quota check before anything is written. The file is at least
+    # Content-Length minus the form overhead; the exact size is enforced
+    # when the usage counter is updated
+    quota_bytes = current_app.config["STORAGE_QUOTA_BYTES"]
+    try:
+        check_quota(
+            user_id,
+            max(0, (request.content_length or 0) - UPLOAD_FORM_OVERHEAD_BYTES),
+            quota_bytes,
+        )
+    except QuotaExceeded:
+        return _quota_exceeded_response(user_id)
+
     # Uploaded files are sent via multipart/form-data
     # Flask stores them in request.files (a dict-like object).
     # If the "file" field isn't present then reject
@@ -86,7 +236,6 @@ def upload_dashboard_file():
     
     # Get CONFIG
     upload_dir = current_app.config["UPLOAD_DIR"]
-    max_size = current_app.config["MAX_UPLOAD_SIZE_BYTES"]
     allowed_types = current_app.config.get("ALLOWED_CONTENT_TYPES")
 
     try:
@@ -97,7 +246,10 @@ def upload_dashboard_file():
             upload_dir=upload_dir,
             max_size=max_size,
             allowed_types=allowed_types,
+            quota_bytes=quota_bytes,
         )
+    except QuotaExceeded:
+        return _quota_exceeded_response(user_id)
     except ValueError as e:
         # AC-FILE-02: reject invalid upload, no persistence
         # Log internal error details server-side without exposing them to the client
@@ -118,6 +270,7 @@ def upload_dashboard_file():
         saved.filename,
         saved.size_bytes,
     )
+    _after_upload(saved)
     notify_event(
         event_type="upload_success",
         subject="[Runtime] File Service: Upload successful",
@@ -126,15 +279,216 @@ def upload_dashboard_file():
     )
 
     # Return response json
-    return jsonify({
-        "file" : {
-            "id": saved.id,
-            "filename": saved.filename,
-            "content_type": saved.content_type,
-            "size_bytes": saved.size_bytes,
-            "created_at": saved.created_at.isoformat(),
-        }
-    }), 201
+    return jsonify({"file": _file_json(saved)}), 201
+
+def _upload_session_json(session):
+    chunks = received_chunks(session)
+    return {
+        "upload_id": session.id,
+        "filename": session.filename,
+        "content_type": session.content_type,
+        "size_bytes": session.total_size,
+        "chunk_size": session.chunk_size,
+        "chunk_count": chunk_count(session),
+        "received_chunks": [c.chunk_index for c in chunks],
+        "offset": contiguous_offset(session, chunks),
+        "state": session.state,
+        "expires_at": session.expires_at.isoformat(),
+    }
+
+def _upload_session_busy(user_id, upload_id):
+    current_app.logger.warning("upload_session_busy | user_id=%s upload_id=%s", user_id, upload_id)
+    return jsonify({"error": "Upload is already being completed or cancelled"}), 409
+
+def _upload_session_unauthorized():
+    notify_event(
+        event_type="security_upload_unauthorized",
+        subject="Unauthorized upload",
+        body=_email_body("upload_unauthorized", 401),
+        dedupe_key=request.remote_addr or "unknown"
+    )
+    current_app.logger.warning("upload_unauthorized | ip=%s", request.remote_addr)
+    return jsonify({"error": "Unauthorized"}), 401
+
+@bp.post("/dashboard/uploads")
+def start_resumable_upload():
+    """
+    Opens a resumable upload. The client then PUTs each chunk (in any order,
+    in parallel if it likes), checks progress with GET, and finishes with
+    POST .../complete.
+    """
+    user_id = get_authenticated_user_id(request)
+    if not user_id:
+        return _upload_session_unauthorized()
+
+    data = request.get_json(silent=True) or {}
+    try:
+        session = create_upload_session(
+            user_id=user_id,
+            filename=data.get("filename"),
+            content_type=data.get("content_type"),
+            total_size=data.get("size_bytes"),
+            chunk_size=data.get("chunk_size", current_app.config["MAX_UPLOAD_CHUNK_SIZE_BYTES"]),
+            upload_dir=current_app.config["UPLOAD_DIR"],
+            max_size=current_app.config["MAX_RESUMABLE_UPLOAD_SIZE_BYTES"],
+            max_chunk_size=current_app.config["MAX_UPLOAD_CHUNK_SIZE_BYTES"],
+            ttl_seconds=current_app.config["UPLOAD_SESSION_TTL_SECONDS"],
+            allowed_types=current_app.config.get("ALLOWED_CONTENT_TYPES"),
+            quota_bytes=current_app.config["STORAGE_QUOTA_BYTES"],
+            max_open_sessions=current_app.config["MAX_OPEN_UPLOAD_SESSIONS"],
+        )
+    except TooManyUploadSessions:
+        current_app.logger.warning("upload_sessions_exceeded | user_id=%s", user_id)
+        return jsonify({"error": "Too many uploads in progress"}), 429
+    except QuotaExceeded:
+        return _quota_exceeded_response(user_id)
+    except ValueError as e:
+        current_app.logger.warning("upload_invalid | user_id=%s error=%s", user_id, str(e))
+        return jsonify({"error": "Invalid upload"}), 400
+
+    current_app.logger.info("upload_session_started | user_id=%s upload_id=%s", user_id, session.id)
+    return jsonify({"upload": _upload_session_json(session)}), 201
+
+@bp.get("/dashboard/uploads/<upload_id>")
+def get_resumable_upload(upload_id):
+    user_id = get_authenticated_user_id(request)
+    if not user_id:
+        return _upload_session_unauthorized()
+
+    session = get_upload_session(user_id, upload_id)
+    if not session:
+        return jsonify({"error": "Not found"}), 404
+
+    return jsonify({"upload": _upload_session_json(session)}), 200
+
+@bp.put("/dashboard/uploads/<upload_id>/chunks/<int:index>")
+def put_upload_chunk(upload_id, index: int):
+    user_id = get_authenticated_user_id(request)
+    if not user_id:
+        return _upload_session_unauthorized()
+
+    session = get_upload_session(user_id, upload_id)
+    if not session:
+        return jsonify({"error": "Not found"}), 404
+
+    if request.content_length is not None and request.content_length > session.chunk_size:
+        return jsonify({"error": "Chunk too large"}), 413
+
+    try:
+        checksum = save_chunk(
+            session,
+            index,
+            request.stream,
+            current_app.config["UPLOAD_DIR"],
+            expected_sha256=request.headers.get("X-Chunk-SHA256"),
+        )
+    except UploadSessionBusy:
+        return _upload_session_busy(user_id, upload_id)
+    except ValueError as e:
+        current_app.logger.warning(
+            "upload_chunk_invalid | user_id=%s upload_id=%s index=%s error=%s", user_id, upload_id, index, str(e)
+        )
+        return jsonify({"error": "Invalid chunk"}), 400
+
+    return jsonify({"index": index, "sha256": checksum}), 200
+
+@bp.post("/dashboard/uploads/<upload_id>/complete")
+def complete_resumable_upload(upload_id):
+    user_id = get_authenticated_user_id(request)
+    if not user_id:
+        return _upload_session_unauthorized()
+
+    session = get_upload_session(user_id, upload_id)
+    if not session:
+        return jsonify({"error": "Not found"}), 404
+
+    data = request.get_json(silent=True) or {}
+    try:
+        saved = complete_upload_session(
+            session,
+            current_app.config["UPLOAD_DIR"],
+            expected_sha256=data.get("sha256"),
+            quota_bytes=current_app.config["STORAGE_QUOTA_BYTES"],
+        )
+    except UploadSessionBusy:
+        return _upload_session_busy(user_id, upload_id)
+    except QuotaExceeded:
+        return _quota_exceeded_response(user_id)
+    except ValueError as e:
+        current_app.logger.warning("upload_invalid | user_id=%s upload_id=%s error=%s", user_id, upload_id, str(e))
+        return jsonify({"error": "Invalid upload"}), 400
+
+    current_app.logger.info(
+        "upload_success | user_id=%s file_id=%s filename=%s size_bytes=%s",
+        user_id,
+        saved.id,
+        saved.filename,
+        saved.size_bytes,
+    )
+    _after_upload(saved)
+    notify_event(
+        event_type="upload_success",
+        subject="[Runtime] File Service: Upload successful",
+        body=_email_body("upload_success", 201, user_id, extra=f"filename={saved.filename} size_bytes={saved.size_bytes}"),
+        dedupe_key=f"user:{user_id}"
+    )
+
+    return jsonify({"file": _file_json(saved)}), 201
+
+@bp.delete("/dashboard/uploads/<upload_id>")
+def abort_resumable_upload(upload_id):
+    user_id = get_authenticated_user_id(request)
+    if not user_id:
+        return _upload_session_unauthorized()
+
+    session = get_upload_session(user_id, upload_id)
+    if not session:
+        return jsonify({"error": "Not found"}), 404
+
+    try:
+        claim_upload_session(session, SESSION_ABORTING)
+    except UploadSessionBusy:
+        return _upload_session_busy(user_id, upload_id)
+
+    abort_upload_session(session, current_app.config["UPLOAD_DIR"])
+    return jsonify({"message": "Upload cancelled"}), 200
+
+BULK_DELETE_MAX_IDS = 10000
+
+@bp.post("/dashboard/delete")
+def bulk_delete_files():
+    """
+    Deletes every listed file the caller owns in one request.
+    Body: {"file_ids": [1, 2, ...]}
+    """
+    user_id = get_authenticated_user_id(request)
+    if not user_id:
+        notify_event(
+            event_type="security_delete_unauthorized",
+            subject="Unauthorized delete attempt",
+            body=f"event=delete_unauthorized status=401 method={request.method} path={request.path} ip={request.remote_addr}",
+            dedupe_key=request.remote_addr or "unknown"
+        )
+        return jsonify({"error": "Unauthorized"}), 401
+
+    data = request.get_json(silent=True) or {}
+    file_ids = data.get("file_ids")
+    if (
+        not isinstance(file_ids, list)
+        or not file_ids
+        or len(file_ids) > BULK_DELETE_MAX_IDS
+        or not all(isinstance(i, int) and not isinstance(i, bool) for i in file_ids)
+    ):
+        return jsonify({"error": f"file_ids must be a list of 1 to {BULK_DELETE_MAX_IDS} integers"}), 400
+
+    deleted = delete_files_for_user(user_id, file_ids)
+    deleted_set = set(deleted)
+    not_found = sorted({i for i in file_ids if i not in deleted_set})
+
+    current_app.logger.info(
+        "bulk_delete | user_id=%s deleted=%s not_found=%s", user_id, len(deleted), len(not_found)
+    )
+    return jsonify({"deleted": sorted(deleted), "not_found": not_found}), 200
 
 @bp.post("/dashboard/delete/<int:file_id>")
 def delete_file(file_id: int):
@@ -185,15 +539,143 @@ def download_file(file_id: int):
         )
         return jsonify({"error": "Not found"}), 404
     
-    # If record exists but file missing on disk -> treat as not found
-    if not f.storage_path or not os.path.exists(f.storage_path):
+    # send_file handles Range/If-Range/If-None-Match/If-Modified-Since itself.
+    # The strong ETag is the content hash, so it survives restarts and moves
+    # between blobs. Full responses go through wsgi.file_wrapper, which
+    # gunicorn serves with sendfile(2)
+    compressed = f.content_encoding == "gzip"
+    passthrough = compressed and request.accept_encodings.quality("gzip") > 0
+
+    try:
+        if compressed and not passthrough:
+            # Decompressed while streaming; no Range support on this path
+            response = send_file(
+                open_stored(f.storage_path, f.content_encoding),
+                as_attachment=True,
+                download_name=f.filename,
+                mimetype=f.content_type,
+                conditional=True,
+                etag=f.sha256,
+                last_modified=f.created_at,
+            )
+            response.content_length = f.size_bytes
+            # Range requests get the full body here; say so explicitly
+            response.accept_ranges = "none"
+        else:
+            # Stored bytes as-is: the original file, or its gzip encoding
+            response = send_file(
+                f.storage_path,
+                as_attachment=True,
+                download_name=f.filename,
+                mimetype=f.content_type,
+                conditional=True,
+                etag=f"{f.sha256}-gzip" if passthrough else (f.sha256 or True),
+                last_modified=f.created_at,
+            )
+    except FileNotFoundError:
+        # If record exists but file missing on disk -> treat as not found
         return jsonify({"error": "Not found"}), 404
-    
-    return send_file(
-        f.storage_path,
-        as_attachment=True,
-        download_name=f.filename,
-        mimetype=f.content_type
+
+    if passthrough:
+        response.content_encoding = "gzip"
+    if compressed:
+        response.vary.add("Accept-Encoding")
+
+    response.cache_control.private = True
+    return response
+
+# Thumbnails of a file never change (file content is immutable)
+THUMBNAIL_MAX_AGE_SECONDS = 365 * 24 * 3600
+
+@bp.get("/dashboard/thumbnail/<int:file_id>")
+def thumbnail(file_id: int):
+    user_id = get_authenticated_user_id(request)
+    if not user_id:
+        notify_event(
+            event_type="security_delete_unauthorized",
+            subject="Unauthorized download attempt",
+            body=f"event=thumbnail_unauthorized status=401 method={request.method} path={request.path} file_id={file_id} ip={request.remote_addr}",
+            dedupe_key=request.remote_addr or "unknown"
+        )
+        return jsonify({"error": "Unauthorized"}), 401
+
+    f = get_file_for_download(user_id, file_id)
+    if not f or f.content_type not in THUMBNAIL_CONTENT_TYPES:
+        return jsonify({"error": "Not found"}), 404
+
+    try:
+        # Normally rendered right after upload; rendered here if not yet
+        path = thumbnail_pool.get(f.storage_path, f.content_encoding)
+        response = send_file(
+            path,
+            mimetype="image/png",
+            conditional=True,
+            etag=f"{f.sha256}-thumb-{thumbnail_pool.max_size}" if f.sha256 else True,
+            last_modified=f.created_at,
+            max_age=THUMBNAIL_MAX_AGE_SECONDS,
+        )
+    except ThumbnailsBusy:
+        return jsonify({"error": "Preview not ready, please retry"}), 503, {"Retry-After": "1"}
+    except FileNotFoundError:
+        return jsonify({"error": "Not found"}), 404
+    except ThumbnailFailed as e:
+        current_app.logger.warning("thumbnail_failed | user_id=%s file_id=%s error=%s", user_id, file_id, str(e))
+        return jsonify({"error": "No preview available"}), 404
+
+    response.cache_control.private = True
+    response.cache_control.public = False
+    response.cache_control.immutable = True
+    return response
+
+ARCHIVE_MAX_FILES = 1000
+
+@bp.post("/dashboard/download")
+def download_archive():
+    """
+    Streams the listed files as one ZIP, built on the fly.
+    Body: {"file_ids": [1, 2, ...]}
+    """
+    user_id = get_authenticated_user_id(request)
+    if not user_id:
+        notify_event(
+            event_type="security_delete_unauthorized",
+            subject="Unauthorized download attempt",
+            body=f"event=download_unauthorized status=401 method={request.method} path={request.path} ip={request.remote_addr}",
+            dedupe_key=request.remote_addr or "unknown"
+        )
+        return jsonify({"error": "Unauthorized"}), 401
+
+    data = request.get_json(silent=True) or {}
+    file_ids = data.get("file_ids")
+    if (
+        not isinstance(file_ids, list)
+        or not file_ids
+        or len(file_ids) > ARCHIVE_MAX_FILES
+        or not all(isinstance(i, int) and not isinstance(i, bool) for i in file_ids)
+    ):
+        return jsonify({"error": f"file_ids must be a list of 1 to {ARCHIVE_MAX_FILES} integers"}), 400
+
+    # Everything is checked before the first byte: once streaming starts
+    # the status code can no longer change
+    files, missing = get_files_for_archive(user_id, file_ids)
+    if missing:
+        notify_event(
+            event_type="download_not_found",
+            subject="Download failed (not found)",
+            body=f"event=download_not_found status=404 method={request.method} path={request.path} user_id={user_id} file_ids={missing[:20]} ip={request.remote_addr}",
+            dedupe_key=request.remote_addr or "unknown"
+        )
+        return jsonify({"error": "Not found", "not_found": missing}), 404
+
+    current_app.logger.info("download_archive | user_id=%s files=%s", user_id, len(files))
+
+    return Response(
+        stream_with_context(iter_zip(files)),
+        mimetype="application/zip",
+        headers={
+            "Content-Disposition": "attachment; filename=files.zip",
+            "Cache-Control": "private, no-store",
+        },
     )
 
 @bp.get("/test/crash")
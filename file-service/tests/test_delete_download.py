@@ -1,4 +1,5 @@
 import os
+from io import BytesIO
 from models import File
 from db import db
 from conftest import make_test_jwt
@@ -100,4 +101,142 @@ def test_download_after_delete_returns_404(client, app):
 
     # download should fail
     dl_resp = client.get(f"/dashboard/download/{file_id}", headers={"Authorization": f"Bearer {token}"})
-    assert dl_resp.status_code == 404
\ No newline at end of file
+    assert dl_resp.status_code == 404
+
+def test_download_supports_range_and_conditional_requests(client, app, tmp_path):
+    import hashlib
+
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    content = b"0123456789"
+    with app.app_context():
+        file_id, _, _, _ = _seed_file(app, owner_id=1, filename="range.txt", content=content)
+        rec = db.session.get(File, file_id)
+        rec.sha256 = hashlib.sha256(content).hexdigest()
+        db.session.commit()
+        etag = f'"{rec.sha256}"'
+
+    headers = {"Authorization": f"Bearer {make_test_jwt(user_id=1)}"}
+
+    full = client.get(f"/dashboard/download/{file_id}", headers=headers)
+    assert full.status_code == 200
+    assert full.headers["ETag"] == etag
+    assert full.headers["Accept-Ranges"] == "bytes"
+    assert "Last-Modified" in full.headers
+
+    partial = client.get(f"/dashboard/download/{file_id}", headers={**headers, "Range": "bytes=2-5"})
+    assert partial.status_code == 206
+    assert partial.data == b"2345"
+    assert partial.headers["Content-Range"] == "bytes 2-5/10"
+
+    not_modified = client.get(f"/dashboard/download/{file_id}", headers={**headers, "If-None-Match": etag})
+    assert not_modified.status_code == 304
+
+    # A stale If-Range validator gets the whole file instead of a slice
+    stale = client.get(
+        f"/dashboard/download/{file_id}",
+        headers={**headers, "Range": "bytes=2-5", "If-Range": '"something-else"'},
+    )
+    assert stale.status_code == 200
+    assert stale.data == content
+
+
+def test_bulk_delete_removes_owned_files_only(client, app, tmp_path):
+    from unlinker import unlinker
+    from quota import get_usage
+
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    headers = {"Authorization": f"Bearer {make_test_jwt(user_id=1)}"}
+
+    ids, paths = [], []
+    for i in range(3):
+        resp = client.post(
+            "/dashboard/upload",
+            data={"file": (BytesIO(f"file {i}".encode()), f"{i}.txt")},
+            headers=headers,
+            content_type="multipart/form-data",
+        )
+        ids.append(resp.get_json()["file"]["id"])
+    with app.app_context():
+        paths = [db.session.get(File, i).storage_path for i in ids]
+        other_id, other_path, _, _ = _seed_file(app, owner_id=2, filename="other.txt", content=b"x")
+
+    resp = client.post(
+        "/dashboard/delete",
+        json={"file_ids": ids[:2] + [other_id, 999999]},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    assert resp.get_json() == {"deleted": sorted(ids[:2]), "not_found": sorted([other_id, 999999])}
+
+    assert unlinker.wait_idle(timeout=5)
+    assert not os.path.exists(paths[0]) and not os.path.exists(paths[1])
+    assert os.path.exists(paths[2]) and os.path.exists(other_path)
+
+    with app.app_context():
+        assert File.query.filter_by(owner_user_id=1).count() == 1
+        assert get_usage(1)[1] == 1
+
+    assert client.post("/dashboard/delete", json={"file_ids": []}, headers=headers).status_code == 400
+
+
+def test_download_archive_streams_owned_files(client, app, tmp_path):
+    import io
+    import zipfile
+
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    with app.app_context():
+        a_id, _, _, _ = _seed_file(app, owner_id=1, filename="a.txt", content=b"aaa")
+        b_id, _, _, _ = _seed_file(app, owner_id=1, filename="b.txt", content=b"bbb")
+        other_id, _, _, _ = _seed_file(app, owner_id=2, filename="c.txt", content=b"ccc")
+
+    headers = {"Authorization": f"Bearer {make_test_jwt(user_id=1)}"}
+
+    resp = client.post("/dashboard/download", json={"file_ids": [b_id, a_id]}, headers=headers)
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(resp.data))
+    assert archive.namelist() == ["b.txt", "a.txt"]
+    assert archive.read("a.txt") == b"aaa"
+
+    resp = client.post("/dashboard/download", json={"file_ids": [a_id, other_id]}, headers=headers)
+    assert resp.status_code == 404
+    assert resp.get_json()["not_found"] == [other_id]
+
+
+def test_gzip_stored_text_is_passed_through_or_decompressed(client, app, tmp_path):
+    import gzip
+
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    app.config["ALLOWED_CONTENT_TYPES"] = {"text/plain"}
+    headers = {"Authorization": f"Bearer {make_test_jwt(user_id=1)}"}
+    content = b"log line 42\n" * 500
+
+    resp = client.post(
+        "/dashboard/upload",
+        data={"file": (BytesIO(content), "app.log", "text/plain")},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    file_id = resp.get_json()["file"]["id"]
+
+    gz = client.get(f"/dashboard/download/{file_id}", headers={**headers, "Accept-Encoding": "gzip"})
+    assert gz.status_code == 200
+    assert gz.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in gz.headers["Vary"]
+    assert len(gz.data) < len(content)
+    assert gzip.decompress(gz.data) == content
+
+    plain = client.get(f"/dashboard/download/{file_id}", headers={**headers, "Accept-Encoding": "identity"})
+    assert plain.status_code == 200
+    assert "Content-Encoding" not in plain.headers
+    assert plain.data == content
+    assert plain.headers["ETag"] != gz.headers["ETag"]
+
+    # Decompressed on the fly: ranges are not honoured, and not advertised
+    assert plain.headers["Accept-Ranges"] == "none"
+    ranged = client.get(
+        f"/dashboard/download/{file_id}",
+        headers={**headers, "Accept-Encoding": "identity", "Range": "bytes=0-9"},
+    )
+    assert ranged.status_code == 200
+    assert ranged.headers["Accept-Ranges"] == "none"
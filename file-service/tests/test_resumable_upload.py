@@ -0,0 +1,188 @@
+import os
+import hashlib
+from datetime import datetime, timedelta
+from conftest import make_test_jwt
+from models import UploadSession, UploadChunk
+from db import db
+
+def _headers(user_id=1):
+    return {"Authorization": f"Bearer {make_test_jwt(user_id=user_id)}"}
+
+def _start(client, size, chunk_size, user_id=1):
+    resp = client.post(
+        "/dashboard/uploads",
+        json={"filename": "big.txt", "content_type": "text/plain", "size_bytes": size, "chunk_size": chunk_size},
+        headers=_headers(user_id),
+    )
+    assert resp.status_code == 201
+    return resp.get_json()["upload"]
+
+def test_chunks_out_of_order_assemble_into_file(app, client, tmp_path):
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    content = b"abcdefghij" * 3 + b"xy"  # 32 bytes, 4 chunks of 10/10/10/2
+    upload = _start(client, len(content), 10)
+    assert upload["chunk_count"] == 4
+
+    for index in (3, 1, 0):
+        chunk = content[index * 10:(index + 1) * 10]
+        resp = client.put(
+            f"/dashboard/uploads/{upload['upload_id']}/chunks/{index}",
+            data=chunk,
+            headers={**_headers(), "X-Chunk-SHA256": hashlib.sha256(chunk).hexdigest()},
+        )
+        assert resp.status_code == 200
+
+    progress = client.get(f"/dashboard/uploads/{upload['upload_id']}", headers=_headers()).get_json()["upload"]
+    assert progress["received_chunks"] == [0, 1, 3]
+    assert progress["offset"] == 20
+
+    # Missing chunk 2
+    resp = client.post(f"/dashboard/uploads/{upload['upload_id']}/complete", headers=_headers())
+    assert resp.status_code == 400
+
+    client.put(f"/dashboard/uploads/{upload['upload_id']}/chunks/2", data=content[20:30], headers=_headers())
+    resp = client.post(
+        f"/dashboard/uploads/{upload['upload_id']}/complete",
+        json={"sha256": hashlib.sha256(content).hexdigest()},
+        headers=_headers(),
+    )
+    assert resp.status_code == 201
+    assert resp.get_json()["file"]["size_bytes"] == len(content)
+
+    dl = client.get(f"/dashboard/download/{resp.get_json()['file']['id']}", headers=_headers())
+    assert dl.data == content
+
+    # Session and chunk files are gone
+    assert UploadSession.query.count() == 0
+    assert os.listdir(tmp_path / ".sessions") == []
+
+def test_chunk_with_bad_checksum_or_size_is_rejected(app, client, tmp_path):
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    upload = _start(client, 20, 10)
+    url = f"/dashboard/uploads/{upload['upload_id']}/chunks/0"
+
+    resp = client.put(url, data=b"0123456789", headers={**_headers(), "X-Chunk-SHA256": "0" * 64})
+    assert resp.status_code == 400
+
+    resp = client.put(url, data=b"short", headers=_headers())
+    assert resp.status_code == 400
+
+    resp = client.put(url, data=b"x" * 11, headers=_headers())
+    assert resp.status_code == 413
+
+    assert UploadChunk.query.count() == 0
+
+def test_upload_session_is_private_to_its_owner(app, client, tmp_path):
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    upload = _start(client, 5, 5, user_id=1)
+
+    resp = client.get(f"/dashboard/uploads/{upload['upload_id']}", headers=_headers(user_id=2))
+    assert resp.status_code == 404
+
+def test_expired_sessions_are_removed(app, client, tmp_path):
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    old = _start(client, 5, 5)
+    client.put(f"/dashboard/uploads/{old['upload_id']}/chunks/0", data=b"hello", headers=_headers())
+
+    session = db.session.get(UploadSession, old["upload_id"])
+    session.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+    resp = client.get(f"/dashboard/uploads/{old['upload_id']}", headers=_headers())
+    assert resp.status_code == 404
+
+    # Starting another upload sweeps the expired one
+    _start(client, 5, 5)
+    assert db.session.get(UploadSession, old["upload_id"]) is None
+    assert UploadChunk.query.count() == 0
+    assert not os.path.exists(tmp_path / ".sessions" / old["upload_id"])
+
+def test_claimed_session_refuses_a_second_completion(app, client, tmp_path):
+    from models import File
+    from resumable import SESSION_COMPLETING, SESSION_OPEN
+
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    upload = _start(client, 5, 5)
+    url = f"/dashboard/uploads/{upload['upload_id']}"
+    client.put(f"{url}/chunks/0", data=b"hello", headers=_headers())
+
+    # Another request has claimed it and is still assembling
+    session = db.session.get(UploadSession, upload["upload_id"])
+    session.state = SESSION_COMPLETING
+    db.session.commit()
+
+    assert client.post(f"{url}/complete", headers=_headers()).status_code == 409
+    assert client.put(f"{url}/chunks/0", data=b"hello", headers=_headers()).status_code == 409
+    assert client.delete(url, headers=_headers()).status_code == 409
+    assert File.query.count() == 0
+
+    session.state = SESSION_OPEN
+    db.session.commit()
+    resp = client.post(f"{url}/complete", headers=_headers())
+    assert resp.status_code == 201
+    assert File.query.count() == 1
+    assert client.post(f"{url}/complete", headers=_headers()).status_code == 404
+
+def test_failed_completion_reopens_the_session(app, client, tmp_path):
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    upload = _start(client, 5, 5)
+    url = f"/dashboard/uploads/{upload['upload_id']}"
+    client.put(f"{url}/chunks/0", data=b"hello", headers=_headers())
+
+    resp = client.post(f"{url}/complete", json={"sha256": "0" * 64}, headers=_headers())
+    assert resp.status_code == 400
+    assert client.get(url, headers=_headers()).get_json()["upload"]["state"] == "open"
+
+    assert client.post(f"{url}/complete", headers=_headers()).status_code == 201
+
+def test_expire_uploads_command_leaves_recently_claimed_sessions(app, client, tmp_path):
+    from resumable import SESSION_COMPLETING
+
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    stale = _start(client, 5, 5)
+    claimed = _start(client, 5, 5)
+
+    past = datetime.utcnow() - timedelta(seconds=1)
+    db.session.get(UploadSession, stale["upload_id"]).expires_at = past
+    session = db.session.get(UploadSession, claimed["upload_id"])
+    session.expires_at = past
+    session.state = SESSION_COMPLETING
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["expire-uploads"])
+    assert "removed 1 expired upload sessions" in result.output
+    assert db.session.get(UploadSession, stale["upload_id"]) is None
+    assert db.session.get(UploadSession, claimed["upload_id"]) is not None
+
+def test_open_sessions_count_against_the_quota(app, client, tmp_path):
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    app.config["STORAGE_QUOTA_BYTES"] = 100
+
+    _start(client, 60, 10)
+    # Nothing is stored yet, but the first session's 60 bytes are reserved
+    resp = client.post(
+        "/dashboard/uploads",
+        json={"filename": "b.txt", "content_type": "text/plain", "size_bytes": 50, "chunk_size": 10},
+        headers=_headers(),
+    )
+    assert resp.status_code == 413
+
+    # Other users are unaffected
+    _start(client, 50, 10, user_id=2)
+
+def test_open_sessions_per_user_are_capped(app, client, tmp_path):
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    app.config["MAX_OPEN_UPLOAD_SESSIONS"] = 2
+
+    first = _start(client, 5, 5)
+    _start(client, 5, 5)
+    resp = client.post(
+        "/dashboard/uploads",
+        json={"filename": "c.txt", "content_type": "text/plain", "size_bytes": 5, "chunk_size": 5},
+        headers=_headers(),
+    )
+    assert resp.status_code == 429
+
+    # Finishing (or cancelling) one frees its place
+    assert client.delete(f"/dashboard/uploads/{first['upload_id']}", headers=_headers()).status_code == 200
+    _start(client, 5, 5)
@@ -0,0 +1,113 @@
+import io
+import os
+from io import BytesIO
+from PIL import Image
+from conftest import make_test_jwt
+
+from thumbnails import thumbnail_pool, thumbnail_path
+
+
+def _png_bytes(size=(800, 600)):
+    out = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(out, format="PNG")
+    return out.getvalue()
+
+
+def _upload(client, headers, data, name, content_type):
+    resp = client.post(
+        "/dashboard/upload",
+        data={"file": (BytesIO(data), name, content_type)},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 201
+    return resp.get_json()["file"]["id"]
+
+
+def test_thumbnail_is_rendered_cached_and_served(app, client, tmp_path, monkeypatch):
+    # Render inline so the test does not depend on pool timing
+    monkeypatch.setattr(thumbnail_pool, "workers", 0)
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    app.config["MAX_UPLOAD_SIZE_BYTES"] = 1024 * 1024
+    headers = {"Authorization": f"Bearer {make_test_jwt(user_id=1)}"}
+
+    file_id = _upload(client, headers, _png_bytes(), "pic.png", "image/png")
+
+    resp = client.get(f"/dashboard/thumbnail/{file_id}", headers=headers)
+    assert resp.status_code == 200
+    assert resp.mimetype == "image/png"
+    assert "immutable" in resp.headers["Cache-Control"]
+    assert "private" in resp.headers["Cache-Control"]
+
+    thumb = Image.open(io.BytesIO(resp.data))
+    assert max(thumb.size) == thumbnail_pool.max_size
+
+    # Revalidation is a 304
+    again = client.get(f"/dashboard/thumbnail/{file_id}", headers={**headers, "If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304
+
+    # Deleting the file removes the cached thumbnail with the blob
+    from models import File
+    from db import db
+    storage_path = db.session.get(File, file_id).storage_path
+    assert os.path.exists(thumbnail_path(storage_path, thumbnail_pool.max_size))
+    client.post(f"/dashboard/delete/{file_id}", headers=headers)
+    assert not os.path.exists(thumbnail_path(storage_path, thumbnail_pool.max_size))
+
+
+def test_thumbnail_is_rendered_lazily_and_only_for_pngs(app, client, tmp_path, monkeypatch):
+    monkeypatch.setattr(thumbnail_pool, "workers", 0)
+    # Background render skipped (as if the pool had been saturated)
+    monkeypatch.setattr(thumbnail_pool, "schedule", lambda *args, **kwargs: None)
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    app.config["MAX_UPLOAD_SIZE_BYTES"] = 1024 * 1024
+    headers = {"Authorization": f"Bearer {make_test_jwt(user_id=1)}"}
+
+    png_id = _upload(client, headers, _png_bytes((100, 40)), "small.png", "image/png")
+    assert client.get(f"/dashboard/thumbnail/{png_id}", headers=headers).status_code == 200
+
+    text_id = _upload(client, headers, b"not an image", "a.txt", "text/plain")
+    assert client.get(f"/dashboard/thumbnail/{text_id}", headers=headers).status_code == 404
+
+    other = {"Authorization": f"Bearer {make_test_jwt(user_id=2)}"}
+    assert client.get(f"/dashboard/thumbnail/{png_id}", headers=other).status_code == 404
+
+
+def test_thumbnail_refuses_oversized_images(app, client, tmp_path, monkeypatch):
+    import thumbnails
+
+    monkeypatch.setattr(thumbnail_pool, "workers", 0)
+    monkeypatch.setattr(thumbnail_pool, "schedule", lambda *args, **kwargs: None)
+    # A flat 2000x2000 PNG is a few KB on disk but 4M pixels decoded
+    monkeypatch.setattr(thumbnails, "THUMBNAIL_MAX_PIXELS", 1_000_000)
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    app.config["MAX_UPLOAD_SIZE_BYTES"] = 1024 * 1024
+    headers = {"Authorization": f"Bearer {make_test_jwt(user_id=1)}"}
+
+    big_id = _upload(client, headers, _png_bytes((2000, 2000)), "big.png", "image/png")
+    assert client.get(f"/dashboard/thumbnail/{big_id}", headers=headers).status_code == 404
+
+
+def test_thumbnail_cache_name_includes_size(app, client, tmp_path, monkeypatch):
+    monkeypatch.setattr(thumbnail_pool, "workers", 0)
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    app.config["MAX_UPLOAD_SIZE_BYTES"] = 1024 * 1024
+    headers = {"Authorization": f"Bearer {make_test_jwt(user_id=1)}"}
+
+    file_id = _upload(client, headers, _png_bytes(), "pic.png", "image/png")
+    assert client.get(f"/dashboard/thumbnail/{file_id}", headers=headers).status_code == 200
+
+    # After a size change the old cached image is not served under the new ETag
+    monkeypatch.setattr(thumbnail_pool, "max_size", 64)
+    resp = client.get(f"/dashboard/thumbnail/{file_id}", headers=headers)
+    assert resp.status_code == 200
+    assert max(Image.open(io.BytesIO(resp.data)).size) == 64
+
+    # Deleting removes the thumbnails of every size
+    from models import File
+    from db import db
+    from thumbnails import thumbnail_paths
+    storage_path = db.session.get(File, file_id).storage_path
+    assert len(thumbnail_paths(storage_path)) == 2
+    client.post(f"/dashboard/delete/{file_id}", headers=headers)
+    assert thumbnail_paths(storage_path) == []
@@ -1,3 +1,4 @@
+import os
 from io import BytesIO # BytesIO (a fake file that lives in memory)
 from conftest import make_test_jwt
 
@@ -41,4 +42,97 @@ def test_upload_route_success_returns_201_and_json(app, client, tmp_path):
     assert f["filename"] == "a.txt"
     assert f["content_type"] == "text/plain"
     assert f["size_bytes"] == 11
-    
\ No newline at end of file
+    
+def test_upload_route_rejects_oversized_content_length_with_413(app, client):
+    app.config["MAX_UPLOAD_SIZE_BYTES"] = 10
+
+    token = make_test_jwt(user_id=1)
+    resp = client.post(
+        "/dashboard/upload",
+        data={"file": (BytesIO(b"x" * (200 * 1024)), "big.txt")},
+        headers={"Authorization": f"Bearer {token}"},
+        content_type="multipart/form-data",
+    )
+
+    assert resp.status_code == 413
+
+def test_upload_route_without_content_length_returns_411(app, client, tmp_path):
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    body = (
+        b"--b\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="a.txt"\r\n'
+        b"Content-Type: text/plain\r\n\r\n"
+        b"hello\r\n--b--\r\n"
+    )
+
+    # Chunked: the body's size is unknown until it has all been read
+    resp = client.post(
+        "/dashboard/upload",
+        input_stream=BytesIO(body),
+        headers={"Authorization": f"Bearer {make_test_jwt(user_id=1)}", "Transfer-Encoding": "chunked"},
+        content_type="multipart/form-data; boundary=b",
+    )
+
+    assert resp.status_code == 411
+    assert os.listdir(tmp_path) == []
+
+def test_dashboard_pages_follow_next_cursor(app, client):
+    from models import File
+    from db import db
+
+    db.session.add_all([
+        File(owner_user_id=1, filename=f"{i}.txt", storage_path=f"/files/{i}.txt",
+             content_type="text/plain", size_bytes=i)
+        for i in range(3)
+    ])
+    db.session.commit()
+
+    headers = {"Authorization": f"Bearer {make_test_jwt(user_id=1)}"}
+    first = client.get("/dashboard?limit=2", headers=headers)
+    assert first.status_code == 200
+    body = first.get_json()
+    assert [f["filename"] for f in body["files"]] == ["0.txt", "1.txt"]
+    assert first.headers["X-Next-Cursor"] == body["next_cursor"]
+
+    second = client.get(f"/dashboard?limit=2&cursor={body['next_cursor']}", headers=headers).get_json()
+    assert [f["filename"] for f in second["files"]] == ["2.txt"]
+    assert second["next_cursor"] is None
+
+    assert client.get("/dashboard?cursor=not-a-cursor", headers=headers).status_code == 400
+
+    # A cursor only continues the order it was issued for
+    desc = client.get("/dashboard?limit=2&order=desc", headers=headers).get_json()
+    assert [f["filename"] for f in desc["files"]] == ["2.txt", "1.txt"]
+    assert client.get(f"/dashboard?limit=2&order=desc&cursor={desc['next_cursor']}", headers=headers).status_code == 200
+    assert client.get(f"/dashboard?limit=2&cursor={desc['next_cursor']}", headers=headers).status_code == 400
+    assert client.get(f"/dashboard?order=desc&cursor={body['next_cursor']}", headers=headers).status_code == 400
+
+    # The order is validated on the unpaginated listing too
+    assert client.get("/dashboard?order=sideways", headers=headers).status_code == 400
+
+    # No params: the full list, as before
+    assert len(client.get("/dashboard", headers=headers).get_json()["files"]) == 3
+
+def test_upload_over_quota_returns_413_and_usage_reports_counter(app, client, tmp_path):
+    app.config["UPLOAD_DIR"] = str(tmp_path)
+    app.config["STORAGE_QUOTA_BYTES"] = 15
+    headers = {"Authorization": f"Bearer {make_test_jwt(user_id=1)}"}
+
+    resp = client.post(
+        "/dashboard/upload",
+        data={"file": (BytesIO(b"hello world"), "a.txt")},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 201
+
+    resp = client.post(
+        "/dashboard/upload",
+        data={"file": (BytesIO(b"hello again"), "b.txt")},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 413
+
+    usage = client.get("/dashboard/usage", headers=headers).get_json()
+    assert usage == {"used_bytes": 11, "file_count": 1, "quota_bytes": 15, "remaining_bytes": 4}
@@ -0,0 +1,41 @@
+import io
+import zipfile
+from datetime import datetime
+from types import SimpleNamespace
+
+from archive import iter_zip
+
+
+def _entry(path, name, content_type, content):
+    path.write_bytes(content)
+    return SimpleNamespace(
+        filename=name,
+        storage_path=str(path),
+        content_type=content_type,
+        content_encoding=None,
+        size_bytes=len(content),
+        created_at=datetime(2025, 1, 2, 3, 4, 5),
+    )
+
+
+def test_zip_is_streamed_with_per_type_compression(tmp_path):
+    text = b"hello zip " * 20000
+    png = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 10
+    files = [
+        _entry(tmp_path / "1", "notes.txt", "text/plain", text),
+        _entry(tmp_path / "2", "pic.png", "image/png", png),
+        _entry(tmp_path / "3", "notes.txt", "text/plain", b"second"),
+    ]
+
+    stream = iter_zip(files)
+    first = next(stream)
+    # The first file's bytes are out before the last file is even opened
+    assert first.startswith(b"PK\x03\x04")
+
+    archive = zipfile.ZipFile(io.BytesIO(first + b"".join(stream)))
+    assert archive.testzip() is None
+    assert archive.namelist() == ["notes.txt", "pic.png", "notes (1).txt"]
+    assert archive.read("notes.txt") == text
+    assert archive.read("pic.png") == png
+    assert archive.getinfo("notes.txt").compress_type == zipfile.ZIP_DEFLATED
+    assert archive.getinfo("pic.png").compress_type == zipfile.ZIP_STORED
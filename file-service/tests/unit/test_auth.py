@@ -0,0 +1,245 @@
+import os
+import json
+import time
+import jwt
+from jwt.algorithms import ECAlgorithm
+from datetime import datetime, timedelta, UTC
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+import auth
+from auth import TokenVerifier
+from conftest import make_test_jwt
+
+
+def _write_es256_keypair(path):
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    path.write_bytes(public_pem)
+    return private_key
+
+
+def test_verified_token_is_served_from_cache(monkeypatch):
+    verifier = TokenVerifier()
+    token = make_test_jwt(user_id=7)
+
+    calls = []
+    real_decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(1)
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", counting_decode)
+
+    assert verifier.verify(token)["sub"] == "7"
+    assert verifier.verify(token)["sub"] == "7"
+    assert len(calls) == 1
+
+
+def test_cache_entry_does_not_outlive_token_exp():
+    verifier = TokenVerifier(ttl_seconds=3600)
+    token = jwt.encode(
+        {"sub": "1", "exp": datetime.now(UTC) + timedelta(seconds=1)},
+        "test-secret",
+        algorithm="HS256",
+    )
+
+    assert verifier.verify(token) is not None
+    time.sleep(1.1)
+    assert verifier.verify(token) is None
+
+
+def test_cache_is_bounded():
+    verifier = TokenVerifier(max_entries=2)
+    for user_id in (1, 2, 3):
+        verifier.verify(make_test_jwt(user_id=user_id))
+
+    assert len(verifier._cache) == 2
+
+
+def test_secret_change_invalidates_cached_tokens(monkeypatch):
+    verifier = TokenVerifier()
+    token = make_test_jwt(user_id=1)
+    assert verifier.verify(token) is not None
+
+    monkeypatch.setenv("JWT_SECRET", "rotated-secret")
+    assert verifier.verify(token) is None
+
+
+def test_es256_key_is_reloaded_when_file_changes(monkeypatch, tmp_path):
+    monkeypatch.delenv("TESTING", raising=False)
+    monkeypatch.delenv("CI", raising=False)
+    monkeypatch.delenv("DOCKER", raising=False)
+
+    key_path = tmp_path / "ec_public.pem"
+    old_key = _write_es256_keypair(key_path)
+    verifier = TokenVerifier(public_key_path=str(key_path), key_check_seconds=0)
+
+    exp = datetime.now(UTC) + timedelta(minutes=5)
+    old_token = jwt.encode({"sub": "1", "exp": exp}, old_key, algorithm="ES256")
+    assert verifier.verify(old_token)["sub"] == "1"
+
+    new_key = _write_es256_keypair(key_path)
+    stat = os.stat(key_path)
+    os.utime(key_path, (stat.st_atime, stat.st_mtime + 10))
+
+    new_token = jwt.encode({"sub": "2", "exp": exp}, new_key, algorithm="ES256")
+    assert verifier.verify(new_token)["sub"] == "2"
+    assert verifier.verify(old_token) is None
+
+
+class _FakeJWKSResponse:
+    def __init__(self, body, etag):
+        self._body = body
+        self.headers = {"ETag": etag}
+
+    def read(self):
+        return self._body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_jwks_keys_are_selected_by_kid(monkeypatch):
+    monkeypatch.delenv("TESTING", raising=False)
+    monkeypatch.delenv("CI", raising=False)
+    monkeypatch.delenv("DOCKER", raising=False)
+
+    keys = {kid: ec.generate_private_key(ec.SECP256R1()) for kid in ("old", "new")}
+    jwks = {"keys": []}
+    for kid, private_key in keys.items():
+        jwk = json.loads(ECAlgorithm.to_jwk(private_key.public_key()))
+        jwk["kid"] = kid
+        jwks["keys"].append(jwk)
+
+    fetches = []
+
+    def fake_urlopen(req, timeout=None):
+        fetches.append(req)
+        return _FakeJWKSResponse(json.dumps(jwks).encode("utf-8"), '"v1"')
+
+    monkeypatch.setattr(auth.urllib.request, "urlopen", fake_urlopen)
+
+    verifier = TokenVerifier(jwks=auth.JWKSClient("http://auth/.well-known/jwks.json"))
+    exp = datetime.now(UTC) + timedelta(minutes=5)
+    for user_id, kid in (("1", "old"), ("2", "new")):
+        token = jwt.encode({"sub": user_id, "exp": exp}, keys[kid], algorithm="ES256", headers={"kid": kid})
+        assert verifier.verify(token)["sub"] == user_id
+
+    unknown = jwt.encode({"sub": "3", "exp": exp}, ec.generate_private_key(ec.SECP256R1()),
+                         algorithm="ES256", headers={"kid": "gone"})
+    assert verifier.verify(unknown) is None
+
+    # One initial fetch; the unknown kid refresh is rate-limited
+    assert len(fetches) == 1
+
+
+def test_revoked_token_is_rejected_even_when_cached(monkeypatch):
+    from flask import Request
+    from werkzeug.test import EnvironBuilder
+    from revocation import RevocationList
+
+    token = jwt.encode(
+        {"sub": "5", "jti": "abc", "exp": datetime.now(UTC) + timedelta(minutes=5)},
+        "test-secret",
+        algorithm="HS256",
+    )
+    request = Request(EnvironBuilder(headers={"Authorization": f"Bearer {token}"}).get_environ())
+
+    revocations = RevocationList(lambda since: (since, []), sync_seconds=3600)
+    monkeypatch.setattr(auth, "_revocations", revocations)
+
+    assert auth.get_authenticated_user_id(request) == 5
+
+    revocations.add("abc", time.time() + 60)
+    assert auth.get_authenticated_user_id(request) is None
+
+
+def test_revocations_sync_in_the_background_without_stalling_lookups():
+    import threading
+    from revocation import RevocationList
+
+    feed = [("old", time.time() + 60)]
+    stalled = threading.Event()
+    release = threading.Event()
+
+    def fetch(since):
+        if len(feed) > 1:
+            # auth-service is now hanging
+            stalled.set()
+            release.wait(5)
+        return len(feed), list(feed)
+
+    revocations = RevocationList(fetch, sync_seconds=0.01)
+    assert revocations.is_revoked("old")
+
+    feed.append(("new", time.time() + 60))
+    assert stalled.wait(2)
+
+    # The sync thread is stuck; lookups are answered from the mirror at once
+    started = time.monotonic()
+    assert not revocations.is_revoked("other")
+    assert time.monotonic() - started < 0.5
+
+    release.set()
+    deadline = time.monotonic() + 2
+    while not revocations.is_revoked("new") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert revocations.is_revoked("new")
+
+
+def test_unknown_kid_does_not_wait_for_a_jwks_fetch(monkeypatch):
+    import threading
+
+    monkeypatch.delenv("TESTING", raising=False)
+    monkeypatch.delenv("CI", raising=False)
+    monkeypatch.delenv("DOCKER", raising=False)
+
+    old = ec.generate_private_key(ec.SECP256R1())
+    new = ec.generate_private_key(ec.SECP256R1())
+    published = {"old": old}
+    release = threading.Event()
+
+    def jwks_body():
+        keys = []
+        for kid, private_key in published.items():
+            jwk = json.loads(ECAlgorithm.to_jwk(private_key.public_key()))
+            jwk["kid"] = kid
+            keys.append(jwk)
+        return json.dumps({"keys": keys}).encode("utf-8")
+
+    calls = []
+
+    def fake_urlopen(req, timeout=None):
+        calls.append(req)
+        if len(calls) > 1:
+            release.wait(5)
+        return _FakeJWKSResponse(jwks_body(), f'"v{len(calls)}"')
+
+    monkeypatch.setattr(auth.urllib.request, "urlopen", fake_urlopen)
+
+    jwks = auth.JWKSClient("http://auth/.well-known/jwks.json", min_refresh_seconds=0)
+    verifier = TokenVerifier(jwks=jwks)
+    exp = datetime.now(UTC) + timedelta(minutes=5)
+    assert verifier.verify(jwt.encode({"sub": "1", "exp": exp}, old, algorithm="ES256", headers={"kid": "old"}))
+
+    # A freshly rotated key: rejected at once while the refresh hangs...
+    published["new"] = new
+    token = jwt.encode({"sub": "2", "exp": exp}, new, algorithm="ES256", headers={"kid": "new"})
+    started = time.monotonic()
+    assert verifier.verify(token) is None
+    assert time.monotonic() - started < 0.5
+
+    # ...and accepted once the background refresh lands
+    release.set()
+    deadline = time.monotonic() + 2
+    while verifier.verify(token) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert verifier.verify(token)["sub"] == "2"
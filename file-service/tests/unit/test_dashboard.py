@@ -15,3 +15,32 @@ def test_returns_only_files_owned_by_user(app):
         assert len(result) == 1
         assert result[0].owner_user_id == 1
         assert result[0].filename == "a.txt"
+
+def test_files_page_walks_all_files_with_keyset_cursor(app):
+    from datetime import datetime, timedelta
+    from dashboard import get_files_page_for_user
+
+    with app.app_context():
+        base = datetime(2025, 1, 1)
+        # Same created_at for two rows: id breaks the tie
+        db.session.add_all([
+            File(owner_user_id=1, filename=f"{i}.txt", storage_path=f"/files/{i}.txt",
+                 content_type="text/plain", size_bytes=i, created_at=base + timedelta(minutes=i // 2))
+            for i in range(5)
+        ] + [
+            File(owner_user_id=2, filename="other.txt", storage_path="/files/other.txt",
+                 content_type="text/plain", size_bytes=1, created_at=base),
+        ])
+        db.session.commit()
+
+        for descending in (False, True):
+            seen, after = [], None
+            while True:
+                page, has_more = get_files_page_for_user(1, 2, after, descending=descending)
+                seen.extend(f.filename for f in page)
+                if not has_more:
+                    break
+                after = (page[-1].created_at, page[-1].id)
+
+            expected = [f"{i}.txt" for i in range(5)]
+            assert seen == (expected[::-1] if descending else expected)
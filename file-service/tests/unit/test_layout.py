@@ -0,0 +1,91 @@
+import os
+from io import BytesIO
+from werkzeug.datastructures import FileStorage
+
+from models import File, Blob
+from db import db
+from upload import save_upload_for_user
+from layout import sharded_path, migrate_to_sharded_layout
+
+
+def test_sharded_path_fans_out_by_name_prefix():
+    assert sharded_path("up", "abcdef", depth=2) == os.path.join("up", "ab", "cd", "abcdef")
+    assert sharded_path("up", "abcdef", depth=0) == os.path.join("up", "abcdef")
+
+
+def test_new_uploads_land_in_shard_directories(app, tmp_path):
+    with app.app_context():
+        saved = save_upload_for_user(
+            user_id=1,
+            file_storage=FileStorage(stream=BytesIO(b"data"), filename="a.txt", content_type="text/plain"),
+            upload_dir=str(tmp_path),
+            max_size=1024,
+        )
+        name = os.path.basename(saved.storage_path)
+        assert saved.storage_path == str(tmp_path / name[:2] / name[2:4] / name)
+
+
+def test_migration_moves_flat_files_and_rewrites_paths(app, tmp_path):
+    with app.app_context():
+        # A deduplicated blob shared by two rows, and a legacy file owning its path
+        blob_path = tmp_path / ("ab" * 32 + ".0000")
+        blob_path.write_bytes(b"shared")
+        legacy_path = tmp_path / "cafe1234"
+        legacy_path.write_bytes(b"legacy")
+
+        db.session.add_all([
+            Blob(sha256="ab" * 32, storage_path=str(blob_path), size_bytes=6, ref_count=2),
+            File(owner_user_id=1, filename="1.txt", storage_path=str(blob_path), content_type="text/plain",
+                 size_bytes=6, sha256="ab" * 32),
+            File(owner_user_id=2, filename="2.txt", storage_path=str(blob_path), content_type="text/plain",
+                 size_bytes=6, sha256="ab" * 32),
+            File(owner_user_id=1, filename="3.txt", storage_path=str(legacy_path), content_type="text/plain",
+                 size_bytes=6),
+        ])
+        db.session.commit()
+
+        assert migrate_to_sharded_layout(str(tmp_path), depth=2, batch_size=1, grace_seconds=0) == 2
+
+        new_blob = sharded_path(str(tmp_path), blob_path.name, depth=2)
+        new_legacy = sharded_path(str(tmp_path), legacy_path.name, depth=2)
+        assert db.session.get(Blob, "ab" * 32).storage_path == new_blob
+        assert {f.storage_path for f in File.query.filter_by(sha256="ab" * 32)} == {new_blob}
+        assert File.query.filter_by(filename="3.txt").one().storage_path == new_legacy
+
+        assert not blob_path.exists() and not legacy_path.exists()
+        with open(new_blob, "rb") as f:
+            assert f.read() == b"shared"
+
+        # Re-running finds nothing to do
+        assert migrate_to_sharded_layout(str(tmp_path), depth=2, grace_seconds=0) == 0
+
+
+def test_migration_keeps_old_name_for_row_added_during_move(app, tmp_path, monkeypatch):
+    with app.app_context():
+        blob_path = tmp_path / ("cd" * 32 + ".0000")
+        blob_path.write_bytes(b"shared")
+        db.session.add_all([
+            Blob(sha256="cd" * 32, storage_path=str(blob_path), size_bytes=6, ref_count=1),
+            File(owner_user_id=1, filename="1.txt", storage_path=str(blob_path), content_type="text/plain",
+                 size_bytes=6, sha256="cd" * 32),
+        ])
+        db.session.commit()
+
+        # A duplicate upload that read the old blob path commits together
+        # with the first batch, after its file rows were rewritten
+        real_commit = db.session.commit
+        raced = []
+
+        def commit():
+            if not raced:
+                raced.append(True)
+                db.session.add(File(owner_user_id=2, filename="2.txt", storage_path=str(blob_path),
+                                    content_type="text/plain", size_bytes=6, sha256="cd" * 32))
+            real_commit()
+
+        monkeypatch.setattr(db.session, "commit", commit)
+        migrate_to_sharded_layout(str(tmp_path), depth=2, grace_seconds=0)
+
+        new_blob = sharded_path(str(tmp_path), blob_path.name, depth=2)
+        assert {f.storage_path for f in File.query.filter_by(sha256="cd" * 32)} == {new_blob}
+        assert os.path.exists(new_blob)
@@ -0,0 +1,58 @@
+import pytest
+from io import BytesIO
+from werkzeug.datastructures import FileStorage
+
+from models import File, UserStorageUsage
+from db import db
+from upload import save_upload_for_user
+from dashboard import delete_file_for_user
+from quota import get_usage, QuotaExceeded, reconcile_storage_usage
+
+def _upload(tmp_path, content, quota_bytes=None, name="a.txt"):
+    return save_upload_for_user(
+        user_id=1,
+        file_storage=FileStorage(stream=BytesIO(content), filename=name, content_type="text/plain"),
+        upload_dir=str(tmp_path),
+        max_size=1024,
+        allowed_types={"text/plain"},
+        quota_bytes=quota_bytes,
+    )
+
+def test_usage_follows_uploads_and_deletes(app, tmp_path):
+    with app.app_context():
+        first = _upload(tmp_path, b"12345")
+        _upload(tmp_path, b"1234567890", name="b.txt")
+        assert get_usage(1) == (15, 2)
+
+        delete_file_for_user(1, first.id)
+        assert get_usage(1) == (10, 1)
+
+def test_upload_over_quota_is_rejected_and_persists_nothing(app, tmp_path):
+    with app.app_context():
+        _upload(tmp_path, b"12345", quota_bytes=8)
+
+        with pytest.raises(QuotaExceeded):
+            _upload(tmp_path, b"6789", quota_bytes=8, name="b.txt")
+
+        assert File.query.count() == 1
+        assert get_usage(1) == (5, 1)
+        assert len([p for p in tmp_path.rglob("*") if p.is_file()]) == 1
+
+def test_reconcile_fixes_drifted_counters(app):
+    with app.app_context():
+        db.session.add_all([
+            File(owner_user_id=1, filename="a.txt", storage_path="/files/a.txt", content_type="text/plain", size_bytes=100),
+            File(owner_user_id=1, filename="b.txt", storage_path="/files/b.txt", content_type="text/plain", size_bytes=50),
+            File(owner_user_id=2, filename="c.txt", storage_path="/files/c.txt", content_type="text/plain", size_bytes=7),
+            UserStorageUsage(user_id=1, used_bytes=999, file_count=9),
+            UserStorageUsage(user_id=3, used_bytes=42, file_count=1),  # no files left
+        ])
+        db.session.commit()
+
+        assert reconcile_storage_usage(batch_size=1) == 3
+        assert get_usage(1) == (150, 2)
+        assert get_usage(2) == (7, 1)
+        assert get_usage(3) == (0, 0)
+
+        # Nothing left to fix
+        assert reconcile_storage_usage() == 0
@@ -0,0 +1,24 @@
+from unlinker import BackgroundUnlinker
+
+
+def test_failed_unlink_is_retried(tmp_path, monkeypatch):
+    target = tmp_path / "blob"
+    target.write_bytes(b"x")
+
+    unlinker = BackgroundUnlinker(max_attempts=3, retry_seconds=0.01)
+    real_unlink = unlinker._unlink
+    attempts = []
+
+    def flaky_unlink(path):
+        attempts.append(path)
+        if len(attempts) == 1:
+            raise PermissionError("busy")
+        real_unlink(path)
+
+    monkeypatch.setattr(unlinker, "_unlink", flaky_unlink)
+
+    unlinker.submit([str(target), str(tmp_path / "already-gone")])
+
+    assert unlinker.wait_idle(timeout=5)
+    assert not target.exists()
+    assert attempts.count(str(target)) == 2
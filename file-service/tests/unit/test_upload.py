@@ -1,3 +1,5 @@
+import os
+import hashlib
 import pytest
 from io import BytesIO
 from werkzeug.datastructures import FileStorage
@@ -5,6 +7,7 @@ from werkzeug.datastructures import FileStorage
 from models import File
 from db import db
 from upload import save_upload_for_user
+from blobs import open_stored
 
 def test_save_upload_for_user_creates_file_with_correct_owner(app, tmp_path):
     """
@@ -99,3 +102,63 @@ def test_upload_reject_file_over_size_limit_and_persists_nothing(app, tmp_path):
         # DB row not created
         assert File.query.count() == 0
         assert len(list(upload_dir.iterdir())) == 0 # iterdir() : give me everything inside this folder
+
+def test_upload_computes_checksum_and_leaves_no_temp_files(app, tmp_path):
+    with app.app_context():
+        file_content = b"x" * (3 * 64 * 1024 + 17)  # several chunks
+        fake_file = FileStorage(
+            stream=BytesIO(file_content),
+            filename="chunks.txt",
+            content_type="text/plain",
+        )
+
+        saved = save_upload_for_user(
+            user_id=1,
+            file_storage=fake_file,
+            upload_dir=str(tmp_path),
+            max_size=len(file_content),
+            allowed_types={"text/plain"},
+        )
+
+        assert saved.size_bytes == len(file_content)
+        assert saved.sha256 == hashlib.sha256(file_content).hexdigest()
+        stored = [str(p) for p in tmp_path.rglob("*") if p.is_file()]
+        assert stored == [saved.storage_path]
+
+        # Repetitive text is stored compressed; reads give back the original
+        assert saved.content_encoding == "gzip"
+        assert os.path.getsize(saved.storage_path) < len(file_content)
+        with open_stored(saved.storage_path, saved.content_encoding) as f:
+            assert f.read() == file_content
+
+def test_duplicate_upload_shares_one_blob_until_last_delete(app, tmp_path):
+    from models import Blob
+    from dashboard import delete_file_for_user
+
+    def upload(user_id, name):
+        return save_upload_for_user(
+            user_id=user_id,
+            file_storage=FileStorage(stream=BytesIO(b"same bytes"), filename=name, content_type="text/plain"),
+            upload_dir=str(tmp_path),
+            max_size=1024,
+            allowed_types={"text/plain"},
+        )
+
+    with app.app_context():
+        first = upload(1, "one.txt")
+        second = upload(2, "two.txt")
+
+        # Two metadata rows, one copy on disk
+        assert File.query.count() == 2
+        assert first.storage_path == second.storage_path
+        assert len([p for p in tmp_path.rglob("*") if p.is_file()]) == 1
+        assert db.session.get(Blob, first.sha256).ref_count == 2
+
+        storage_path = first.storage_path
+        assert delete_file_for_user(1, first.id) is True
+        assert os.path.exists(storage_path)
+        assert db.session.get(Blob, second.sha256).ref_count == 1
+
+        assert delete_file_for_user(2, second.id) is True
+        assert not os.path.exists(storage_path)
+        assert Blob.query.count() == 0
@@ -0,0 +1,224 @@
+import io
+import os
+import glob
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+# Cached next to the blob as <blob>.thumb<size>.png, so files sharing
+# content share the thumbnail and a size change never serves old images
+THUMBNAIL_CONTENT_TYPES = {"image/png", "image/x-png"}
+
+# Largest source image we decode, in pixels (~100 MB as RGBA). A small,
+# flat PNG can declare a huge canvas, so this is checked before decoding
+THUMBNAIL_MAX_PIXELS = int(os.getenv("THUMBNAIL_MAX_PIXELS", str(25_000_000)))
+
+
+class ThumbnailsBusy(Exception):
+    """Raised when the thumbnail queue is full and the request should be shed."""
+
+
+class ThumbnailFailed(Exception):
+    """Raised when the source could not be turned into a thumbnail."""
+
+
+def thumbnail_path(storage_path, max_size):
+    return f"{storage_path}.thumb{int(max_size)}.png"
+
+
+def thumbnail_paths(storage_path):
+    """
+    Every cached thumbnail of a stored file, whatever size it was rendered at.
+    """
+    return glob.glob(glob.escape(storage_path) + ".thumb*.png")
+
+
+# Set in each render process (or inline): the machine-wide render limit
+_render_slots = None
+
+
+def _set_render_slots(slots):
+    global _render_slots
+    _render_slots = slots
+
+
+def render_thumbnail(storage_path, content_encoding, max_size, wait_seconds=10):
+    """
+    Runs in a pool process. Writes the thumbnail atomically (temp file +
+    rename), so readers never see a partial PNG.
+    """
+    if _render_slots is not None and not _render_slots.acquire(timeout=wait_seconds):
+        raise ThumbnailsBusy()
+    try:
+        return _render(storage_path, content_encoding, max_size)
+    finally:
+        if _render_slots is not None:
+            _render_slots.release()
+
+
+def _render(storage_path, content_encoding, max_size):
+    from PIL import Image
+    from blobs import open_stored
+
+    with open_stored(storage_path, content_encoding) as src:
+        # Pillow needs to seek; only compressed-at-rest sources are buffered
+        source = src if content_encoding is None else io.BytesIO(src.read())
+
+        # Pillow itself only refuses at twice its limit; we check the
+        # declared size ourselves before any pixel data is decoded
+        Image.MAX_IMAGE_PIXELS = THUMBNAIL_MAX_PIXELS
+        try:
+            img = Image.open(source, formats=["PNG"])
+        except Image.DecompressionBombError as e:
+            raise ThumbnailFailed(str(e)) from e
+
+        with img:
+            width, height = img.size
+            if width * height > THUMBNAIL_MAX_PIXELS:
+                raise ThumbnailFailed(f"image too large: {width}x{height}")
+            img.thumbnail((max_size, max_size))
+
+            dest = thumbnail_path(storage_path, max_size)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(dest) or ".", prefix=".thumb-")
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    img.save(out, format="PNG", optimize=True)
+                os.replace(temp_path, dest)
+            except BaseException:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+                raise
+
+    return dest
+
+
+class ThumbnailPool:
+    """
+    Renders thumbnails in a process pool, off the request threads' GIL.
+
+    - `schedule` queues a render right after upload and never blocks; when
+      the pool is saturated the job is skipped and rendered lazily later.
+    - `get` returns the cached thumbnail, rendering it (and waiting up to
+      `timeout_seconds`) if it is not there yet.
+    - At most `max_pending` renders are queued or running per process.
+      Past that, `get` raises ThumbnailsBusy.
+    - At most `max_renders` renders decode at once on the whole machine:
+      the limit is a semaphore created in the preloading gunicorn master,
+      so every worker and every render process shares it. A burst of
+      uploads therefore cannot take every CPU, however many workers run.
+    - Concurrent requests for the same blob share one render.
+    - `workers=0` renders inline (still bounded).
+    """
+
+    def __init__(self, workers=1, max_pending=None, timeout_seconds=10, max_size=256, max_renders=None):
+        if max_pending is None:
+            max_pending = max(workers, 1) * 4
+        if max_renders is None:
+            max_renders = max(1, (os.cpu_count() or 1) // 2)
+
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout_seconds = timeout_seconds
+        self.max_size = max_size
+        self.max_renders = max_renders
+
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._render_slots = multiprocessing.BoundedSemaphore(max_renders)
+        self._lock = threading.Lock()
+        self._inflight = {}  # storage_path -> Future
+        self._pool = None
+        self._pool_pid = None
+
+    def _get_pool(self):
+        # A pool inherited across fork() is unusable; build one per process
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_set_render_slots,
+                    initargs=(self._render_slots,),
+                )
+                self._pool_pid = os.getpid()
+                self._inflight = {}
+            return self._pool
+
+    def _render_inline(self, storage_path, content_encoding):
+        if not self._slots.acquire(blocking=False):
+            raise ThumbnailsBusy()
+        try:
+            _set_render_slots(self._render_slots)
+            return render_thumbnail(storage_path, content_encoding, self.max_size, self.timeout_seconds)
+        finally:
+            self._slots.release()
+
+    def _submit(self, storage_path, content_encoding):
+        pool = self._get_pool()
+        with self._lock:
+            future = self._inflight.get(storage_path)
+            if future is not None:
+                return future
+
+            if not self._slots.acquire(blocking=False):
+                raise ThumbnailsBusy()
+
+            future = pool.submit(
+                render_thumbnail, storage_path, content_encoding, self.max_size, self.timeout_seconds
+            )
+            self._inflight[storage_path] = future
+
+        def _done(_):
+            with self._lock:
+                if self._inflight.get(storage_path) is future:
+                    del self._inflight[storage_path]
+            self._slots.release()
+
+        future.add_done_callback(_done)
+        return future
+
+    def schedule(self, storage_path, content_encoding=None):
+        if os.path.exists(thumbnail_path(storage_path, self.max_size)):
+            return
+        try:
+            if self.workers == 0:
+                self._render_inline(storage_path, content_encoding)
+            else:
+                self._submit(storage_path, content_encoding)
+        except ThumbnailsBusy:
+            pass
+        except Exception as e:
+            print("THUMBNAIL RENDER FAILED:", storage_path, repr(e))
+
+    def get(self, storage_path, content_encoding=None):
+        dest = thumbnail_path(storage_path, self.max_size)
+        if os.path.exists(dest):
+            return dest
+
+        try:
+            if self.workers == 0:
+                return self._render_inline(storage_path, content_encoding)
+            return self._submit(storage_path, content_encoding).result(timeout=self.timeout_seconds)
+        except (ThumbnailsBusy, FutureTimeout):
+            raise ThumbnailsBusy()
+        except (FileNotFoundError, ThumbnailFailed):
+            raise
+        except Exception as e:
+            raise ThumbnailFailed(repr(e)) from e
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._pool_pid = None
+
+
+thumbnail_pool = ThumbnailPool(
+    workers=int(os.getenv("THUMBNAIL_WORKERS", "1")),
+    max_pending=int(os.getenv("THUMBNAIL_MAX_PENDING", "0")) or None,
+    timeout_seconds=float(os.getenv("THUMBNAIL_TIMEOUT_SECONDS", "10")),
+    max_size=int(os.getenv("THUMBNAIL_SIZE_PX", "256")),
+    max_renders=int(os.getenv("THUMBNAIL_MAX_RENDERS", "0")) or None,
+)
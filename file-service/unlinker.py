@@ -0,0 +1,102 @@
+import os
+import time
+import heapq
+import queue
+import atexit
+import threading
+
+
+class BackgroundUnlinker:
+    """
+    Removes stored files off the request path.
+
+    - One daemon thread per process, started on first use (so it exists in
+      each gunicorn worker, not only in the preloading master).
+    - A failed unlink is retried up to `max_attempts` times, waiting
+      `retry_seconds` (doubling) between tries. A file that is already gone
+      counts as removed.
+    - Paths still queued at exit are lost; the rows are already deleted, so
+      the worst case is an orphaned file, never a dangling record.
+    """
+
+    def __init__(self, max_attempts=5, retry_seconds=1.0):
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._outstanding = 0
+        self._thread = None
+        self._pid = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="file-unlinker", daemon=True)
+            self._thread.start()
+
+    def submit(self, paths):
+        paths = [p for p in paths if p]
+        if not paths:
+            return
+
+        self._ensure_started()
+        with self._lock:
+            self._outstanding += len(paths)
+        for path in paths:
+            self._queue.put((path, 1))
+
+    def _unlink(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _done(self):
+        with self._lock:
+            self._outstanding -= 1
+            if self._outstanding == 0:
+                self._idle.notify_all()
+
+    def _run(self):
+        retries = []  # heap of (due, path, attempt)
+
+        while True:
+            timeout = max(0.0, retries[0][0] - time.monotonic()) if retries else None
+            try:
+                path, attempt = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                _, path, attempt = heapq.heappop(retries)
+
+            try:
+                self._unlink(path)
+            except OSError as e:
+                if attempt >= self.max_attempts:
+                    print("UNLINK FAILED (giving up):", path, repr(e))
+                    self._done()
+                else:
+                    delay = self.retry_seconds * (2 ** (attempt - 1))
+                    heapq.heappush(retries, (time.monotonic() + delay, path, attempt + 1))
+                continue
+
+            self._done()
+
+    def wait_idle(self, timeout=None):
+        """
+        Blocks until every submitted path is removed or given up on.
+        Returns False on timeout.
+        """
+        with self._lock:
+            return self._idle.wait_for(lambda: self._outstanding == 0, timeout)
+
+
+unlinker = BackgroundUnlinker(
+    max_attempts=int(os.getenv("UNLINK_MAX_ATTEMPTS", "5")),
+    retry_seconds=float(os.getenv("UNLINK_RETRY_SECONDS", "1")),
+)
+
+# Give queued unlinks a moment to finish on a clean shutdown
+atexit.register(unlinker.wait_idle, 5)
@@ -1,51 +1,119 @@
 import os
-import uuid
+import hashlib
+import tempfile
+from sqlalchemy.exc import IntegrityError
 from models import File
+from blobs import acquire_blob, unstore_new_blob
+from quota import add_usage, QuotaExceeded
 from db import db
 
-def save_upload_for_user(user_id, file_storage, upload_dir, max_size, allowed_types=None):
+# Copy uploads in fixed-size pieces so memory use does not depend on file size
+CHUNK_SIZE = 64 * 1024
+
+def _stream_to_temp_file(stream, upload_dir, max_size):
+    """
+    Copies `stream` into a temp file inside upload_dir, one chunk at a time.
+    Size and SHA-256 are computed in the same pass. Stops as soon as the
+    running size passes max_size.
+
+    Returns (temp_path, size, sha256_hex). Nothing is left on disk on failure.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=upload_dir, prefix=".upload-")
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                size += len(chunk)
+                if size > max_size:
+                    raise ValueError("The uploaded file does not meet the upload requirements.")
+
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    return temp_path, size, digest.hexdigest()
+
+def save_upload_for_user(user_id, file_storage, upload_dir, max_size, allowed_types=None, quota_bytes=None):
     # basic validation
     if not file_storage or not file_storage.filename:
         raise ValueError("No file provided")
-    
+
     if allowed_types is not None and file_storage.content_type not in allowed_types:
         raise ValueError("The uploaded file does not meet the upload requirements.")
 
-    # Read file content to determine size
-    data = file_storage.stream.read()
-    size = len(data)
-
-    # Reset stream for future use
-    file_storage.stream.seek(0)
-
-    if size > max_size:
-        raise ValueError("The uploaded file does not meet the upload requirements.")
-    
-    # ensure upload directory exists 
+    # ensure upload directory exists
     os.makedirs(upload_dir, exist_ok=True)
 
+    # Stream to a temp file; oversized uploads are rejected mid-copy
+    temp_path, size, checksum = _stream_to_temp_file(file_storage.stream, upload_dir, max_size)
+
     # keep original filename only for metadata
     original_name = os.path.basename(file_storage.filename)
 
-    # disk filename is server-generated ONLY (CodeQL-friendly)
-    stored_name = uuid.uuid4().hex
+    return create_file_from_temp(
+        user_id, original_name, file_storage.content_type,
+        temp_path, size, checksum, upload_dir, quota_bytes,
+    )
 
-    storage_path = os.path.join(upload_dir, stored_name)
+def create_file_from_temp(user_id, filename, content_type, temp_path, size, checksum, upload_dir,
+                          quota_bytes=None):
+    """
+    Turns a fully written temp file into stored content plus a File row.
+    The temp file is consumed: moved into a blob, or removed as a duplicate.
+    The user's usage counter is updated in the same transaction and raises
+    QuotaExceeded if the file does not fit.
+    """
+    # Two uploads of the same new content can race to create its blob; the
+    # loser's insert fails, so it retries once and takes a reference instead
+    for attempt in range(2):
+        try:
+            add_usage(user_id, size, quota_bytes)
+        except QuotaExceeded:
+            db.session.rollback()
+            os.remove(temp_path)
+            raise
 
-    # Save to disk
-    with open(storage_path, "wb") as f:
-        f.write(data)
+        storage_path, created, content_encoding = acquire_blob(
+            temp_path, checksum, size, upload_dir, content_type
+        )
 
-    # Create DB record
-    file = File(
-        owner_user_id=user_id,
-        filename=original_name,
-        storage_path=storage_path,
-        content_type=file_storage.content_type,
-        size_bytes=size,
-    )
-        
-    db.session.add(file)
-    db.session.commit()
+        # Create DB record
+        file = File(
+            owner_user_id=user_id,
+            filename=filename,
+            storage_path=storage_path,
+            content_type=content_type,
+            size_bytes=size,
+            sha256=checksum,
+            content_encoding=content_encoding,
+        )
 
-    return file
\ No newline at end of file
+        try:
+            db.session.add(file)
+            db.session.commit()
+            return file
+        except IntegrityError:
+            db.session.rollback()
+            if not created:
+                raise
+            if attempt:
+                os.remove(storage_path)
+                raise
+            # Put the content back so the retry can find it
+            unstore_new_blob(storage_path, temp_path, content_encoding)
+        except Exception:
+            db.session.rollback()
+            if created:
+                os.remove(storage_path)
+            raise
@@ -1,8 +1,14 @@
-from flask import Flask, render_template, redirect, request, Response
+from flask import Flask, render_template, redirect, request, Response, make_response
 from prometheus_flask_exporter import PrometheusMetrics
 import requests
 import os
+import time
 from flask import jsonify
+from upstream import (
+    HOP_BY_HOP_HEADERS, auth_upstream, files_upstream, register_pool_metrics,
+    StreamedBody, UpstreamBody, streamed_response_headers,
+)
+from listing_cache import dashboard_cache, token_claims, token_user_id
 
 app = Flask(__name__)
 
@@ -19,32 +25,43 @@ FILE_SERVICE_URL = os.getenv(
     "http://localhost:5002"  # safe local default
 )
 
-def _proxy_request(base_url, path):
+# Largest request body passed upstream: a resumable upload chunk plus
+# multipart form overhead. file-service enforces its own, tighter limits
+MAX_PROXY_BODY_BYTES = int(os.getenv("GATEWAY_MAX_BODY_BYTES", str(16 * 1024 * 1024 + 64 * 1024)))
+
+# Pooled keep-alive sessions, one per backend service
+AUTH_UPSTREAM = auth_upstream(f"{AUTH_SERVICE_URL}/api")
+FILES_UPSTREAM = files_upstream(FILE_SERVICE_URL)
+register_pool_metrics([AUTH_UPSTREAM, FILES_UPSTREAM])
+
+def _proxy_request(upstream, path):
     content_type = request.headers.get("Content-Type", "")
     is_multipart = content_type.startswith("multipart/form-data")
     is_json = "application/json" in content_type
 
-    headers = {k: v for k, v in request.headers if k.lower() != "host"}
+    headers = {
+        k: v for k, v in request.headers
+        if k.lower() != "host" and k.lower() not in HOP_BY_HOP_HEADERS
+    }
     params = request.args or None
 
-    files = None
+    if request.content_length is not None and request.content_length > MAX_PROXY_BODY_BYTES:
+        return {"error": "Request body too large."}, 413
+    if request.content_length is None and "chunked" in request.headers.get("Transfer-Encoding", "").lower():
+        return {"error": "Content-Length required."}, 411
+    if is_multipart and "boundary=" not in content_type:
+        return {"error": "Invalid multipart request."}, 400
+
     data = None
     json_body = None
 
-    if is_multipart:
-        # Let requests set the multipart boundary and length
-        headers.pop("Content-Type", None)
-        headers.pop("Content-Length", None)
-        files = {
-            name: (fs.filename, fs.stream, fs.mimetype)
-            for name, fs in request.files.items()
-        }
-        data = request.form
-    elif is_json:
+    if is_json:
         json_body = request.get_json(silent=True)
-    else:
-        data = request.get_data() or None
-
+    elif request.content_length:
+        # Uploads (multipart forms, raw chunks) go upstream byte for byte,
+        # boundary included, read from the client only as fast as the
+        # upstream takes them; the gateway never parses or spools them
+        data = StreamedBody(request.stream, request.content_length)
 
     # SSRF Mitigation: Only allow certain path patterns (example: alphanumeric, dashes, slashes)
     import re
@@ -55,18 +72,35 @@ def _proxy_request(base_url, path):
     if '//' in path or path.startswith('http'):
         return {"error": "Invalid path."}, 400
 
+    stream = upstream.streams(path)
+    if stream:
+        # Passed through still encoded, so only ask for what the client takes
+        headers.setdefault("Accept-Encoding", "identity")
+
     try:
-        resp = requests.request(
-            method=request.method,
-            url=f"{base_url}/{path.lstrip('/')}" ,
+        resp = upstream.request(
+            request.method,
+            path,
             params=params,
             json=json_body,
             data=data,
-            files=files,
             headers=headers,
-            timeout=10
+            stream=stream,
         )
 
+        if stream:
+            # File content: forward status, safe headers and body chunks as
+            # they arrive, so gateway memory does not grow with the file
+            if "application/json" not in resp.headers.get("Content-Type", ""):
+                return Response(
+                    UpstreamBody(resp, on_close=upstream.release),
+                    status=resp.status_code,
+                    headers=streamed_response_headers(resp),
+                    direct_passthrough=True,
+                )
+            # A JSON error instead: read in full below, like any other response
+            upstream.release()
+
         # XSS Mitigation: Do not reflect user input directly, and set content-type safely
         # Force JSON handling to prevent XSS
         try:
@@ -104,14 +138,70 @@ def proxy_api(path):
     """
     Browser -> ui-gateway -> auth-service
     """
-    return _proxy_request(f"{AUTH_SERVICE_URL}/api", path)
+    return _proxy_request(AUTH_UPSTREAM, path)
+
+# Bumped on every write so that a listing cached by another gateway worker
+# (which never saw the write) is not served to this browser afterwards
+DASHBOARD_VERSION_COOKIE = "dashboard_version"
+
+# Not replayed from a cached listing: cookies belong to the request that
+# fetched it, and the length is recomputed
+UNCACHED_RESPONSE_HEADERS = {"set-cookie", "content-length"}
+
+def _bearer_token():
+    auth = request.headers.get("Authorization", "")
+    if not auth.startswith("Bearer "):
+        return None
+    return auth.split(" ", 1)[1].strip() or None
+
+def _cached_dashboard(path, token):
+    key = dashboard_cache.key_for(
+        token,
+        (request.cookies.get(DASHBOARD_VERSION_COOKIE, ""), request.query_string),
+    )
+    cached = dashboard_cache.get(key)
+    if cached is not None:
+        status, headers, body = cached
+        return Response(body, status=status, headers=headers)
+
+    response = make_response(_proxy_request(FILES_UPSTREAM, path))
+    if response.status_code == 200 and response.is_json:
+        # file-service accepted this token, so its claims can be trusted
+        claims = token_claims(token)
+        user_id = token_user_id(claims) if claims else None
+        if user_id is not None:
+            headers = [(k, v) for k, v in response.headers.items() if k.lower() not in UNCACHED_RESPONSE_HEADERS]
+            dashboard_cache.put(key, user_id, (response.status_code, headers, response.get_data()), claims.get("exp"))
+    return response
 
 @app.route("/files/<path:path>", methods=["GET", "POST", "PUT", "DELETE"])
 def proxy_files(path):
     """
     Browser -> ui-gateway -> file-service
     """
-    return _proxy_request(FILE_SERVICE_URL, path)
+    token = _bearer_token()
+    if token is None:
+        return _proxy_request(FILES_UPSTREAM, path)
+
+    if request.method == "GET" and path == "dashboard":
+        return _cached_dashboard(path, token)
+
+    response = make_response(_proxy_request(FILES_UPSTREAM, path))
+    # POST downloads (ZIP archives) read files; every other write may change the listing
+    is_write = request.method != "GET" and not FILES_UPSTREAM.streams(path)
+    if is_write and 200 <= response.status_code < 300:
+        claims = token_claims(token)
+        user_id = token_user_id(claims) if claims else None
+        if user_id is not None:
+            dashboard_cache.invalidate(user_id)
+        response.set_cookie(
+            DASHBOARD_VERSION_COOKIE,
+            format(time.time_ns(), "x"),
+            path="/files/dashboard",
+            httponly=True,
+            samesite="Strict",
+        )
+    return response
 
 @app.get("/health")
 def health():
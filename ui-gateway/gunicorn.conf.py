@@ -0,0 +1,37 @@
+# Production WSGI server config for ui-gateway
+#   gunicorn -c gunicorn.conf.py app:app
+# Every setting can be overridden through the environment.
+import os
+import multiprocessing
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:3000")
+
+# The gateway is almost pure upstream I/O, so by default it runs on gevent's
+# event loop: every proxied request is a greenlet parked on its upstream
+# socket, and one worker holds up to `worker_connections` of them. That makes
+# the tier sized by CPU, not threads. "gthread" remains available.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gevent")
+_default_workers = (
+    multiprocessing.cpu_count() if worker_class == "gevent" else multiprocessing.cpu_count() * 2 + 1
+)
+workers = int(os.getenv("GUNICORN_WORKERS", str(_default_workers)))
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Recycle workers periodically to cap slow memory growth
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+
+# gevent must monkey-patch before requests/ssl are imported, which preloading
+# in the master would defeat; preload by default only for the other workers
+preload_app = os.getenv(
+    "GUNICORN_PRELOAD",
+    "false" if worker_class == "gevent" else "true",
+).lower() == "true"
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from prometheus_client import Counter
+
+DASHBOARD_CACHE_REQUESTS = Counter(
+    "gateway_dashboard_cache_requests_total",
+    "Dashboard listing requests by cache result",
+    ["result"],
+)
+DASHBOARD_CACHE_INVALIDATIONS = Counter(
+    "gateway_dashboard_cache_invalidations_total",
+    "Dashboard listings dropped after a write by their user",
+)
+
+
+def token_claims(token):
+    """
+    Reads a JWT's payload WITHOUT checking its signature. Only use it on a
+    token an upstream has just accepted, which verified it for us.
+    """
+    try:
+        segment = token.split(".")[1]
+        segment += "=" * (-len(segment) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(segment))
+    except (IndexError, ValueError):
+        return None
+    return claims if isinstance(claims, dict) else None
+
+
+def token_user_id(claims):
+    user_id = claims.get("sub")
+    if isinstance(user_id, int):
+        return user_id
+    if isinstance(user_id, str) and user_id.isdigit():
+        return int(user_id)
+    return None
+
+
+class ListingCache:
+    """
+    Remembers each user's dashboard listing for a short while. What is
+    stored per entry is up to the caller (the gateway keeps the whole
+    response: status, headers and body).
+
+    - Entries are keyed by the SHA-256 digest of the bearer token (plus the
+      caller's variant, e.g. query string), so a token is only ever served
+      a listing that file-service produced for that same token.
+    - Entries are grouped by user id, so `invalidate` drops every listing of
+      a user, across all of their tokens.
+    - An entry lives `ttl_seconds`, never past the token's own `exp`; that
+      also bounds how long a revoked token can still read a cached listing.
+    - At most `max_entries` are kept, least recently used dropped first.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=15):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, user_id, value)
+        self._by_user = {}  # user_id -> set of keys
+
+    @staticmethod
+    def key_for(token, variant):
+        return hashlib.sha256(token.encode("utf-8")).digest(), variant
+
+    def _drop(self, key):
+        _, user_id, _ = self._entries.pop(key)
+        keys = self._by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_id]
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                DASHBOARD_CACHE_REQUESTS.labels("miss").inc()
+                return None
+            self._entries.move_to_end(key)
+
+        DASHBOARD_CACHE_REQUESTS.labels("hit").inc()
+        return entry[2]
+
+    def put(self, key, user_id, value, token_exp=None):
+        if self.ttl_seconds <= 0:
+            return
+
+        expires_at = time.time() + self.ttl_seconds
+        if isinstance(token_exp, (int, float)):
+            expires_at = min(expires_at, float(token_exp))
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (expires_at, user_id, value)
+            self._by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, user_id):
+        with self._lock:
+            keys = self._by_user.pop(user_id, ())
+            for key in keys:
+                self._entries.pop(key, None)
+        if keys:
+            DASHBOARD_CACHE_INVALIDATIONS.inc()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+
+dashboard_cache = ListingCache(
+    max_entries=int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "10000")),
+    ttl_seconds=float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "15")),
+)
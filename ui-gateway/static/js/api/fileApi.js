@@ -5,6 +5,8 @@
 const FILE_SERVICE_BASE = "/files";
 
 // Helpers: build headers for file_service request
+// Requests go through authFetch (utils/authGuard.js), which refreshes an
+// expired access token and retries once
 
 function buildAuthHeaders(extraHeaders = {}){
     const token = localStorage.getItem("access_token");
@@ -23,7 +25,7 @@ function buildAuthHeaders(extraHeaders = {}){
 
 // GEt /dashboard
 export async function getDashboardFiles(){
-    const resp = await fetch(`${FILE_SERVICE_BASE}/dashboard`, {
+    const resp = await authFetch(`${FILE_SERVICE_BASE}/dashboard`, {
         method: "GET",
         headers: buildAuthHeaders(),
     });
@@ -55,7 +57,7 @@ export async function uploadFile(file){
     const formData = new FormData();
     formData.append("file", file); // filed name is "file"
 
-    const resp = await fetch(`${FILE_SERVICE_BASE}/dashboard/upload`, {
+    const resp = await authFetch(`${FILE_SERVICE_BASE}/dashboard/upload`, {
         method: "POST",
         headers: buildAuthHeaders(), // Note: Do NOT set Content-Type manually for FormData
         body: formData,
@@ -75,7 +77,7 @@ export async function uploadFile(file){
 
 // POST /dashboard/delete/<file_id>
 export async function deleteFile(fileId){
-    const resp = await fetch(`${FILE_SERVICE_BASE}/dashboard/delete/${fileId}`, {
+    const resp = await authFetch(`${FILE_SERVICE_BASE}/dashboard/delete/${fileId}`, {
         method: "POST",
         headers: buildAuthHeaders(),
     });
@@ -97,7 +99,7 @@ export async function deleteFile(fileId){
 
 // GET /dashboard/download/<file_id>
 export async function downloadFile(fileId){
-    const resp = await fetch (`${FILE_SERVICE_BASE}/dashboard/download/${fileId}`, {
+    const resp = await authFetch(`${FILE_SERVICE_BASE}/dashboard/download/${fileId}`, {
         method: "GET",
         headers: buildAuthHeaders(),
     });
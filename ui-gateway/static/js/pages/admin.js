@@ -6,11 +6,7 @@ if (!token) {
 }
 
 function loadUsers() {
-  fetch("/api/admin/users", {
-    headers: {
-      Authorization: `Bearer ${token}`
-    }
-  })
+  authFetch("/api/admin/users")
     .then(res => {
       if (!res.ok) throw new Error("Failed to fetch users");
       return res.json();
@@ -69,11 +65,10 @@ function addUser() {
     return;
   }
 
-  fetch("/api/admin/users", {
+  authFetch("/api/admin/users", {
     method: "POST",
     headers: {
-      "Content-Type": "application/json",
-      Authorization: `Bearer ${token}`
+      "Content-Type": "application/json"
     },
     body: JSON.stringify({
       username,
@@ -98,11 +93,8 @@ function addUser() {
 function deleteUser(id) {
   if (!confirm("Are you sure you want to delete this user?")) return;
 
-  fetch(`/api/admin/users/${id}`, {
-    method: "DELETE",
-    headers: {
-      Authorization: `Bearer ${token}`
-    }
+  authFetch(`/api/admin/users/${id}`, {
+    method: "DELETE"
   })
     .then(res => {
       if (!res.ok) throw new Error("Delete failed");
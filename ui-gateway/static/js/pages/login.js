@@ -41,6 +41,9 @@ document.addEventListener("DOMContentLoaded", () => {
 
 
       localStorage.setItem("access_token", data.access_token);
+      if (data.refresh_token) {
+        localStorage.setItem("refresh_token", data.refresh_token);
+      }
 
       if (data.role === "admin") {
         window.location.href = "/admin";
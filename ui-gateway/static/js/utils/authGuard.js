@@ -4,4 +4,50 @@
   if (!token) {
     window.location.href = "/login";
   }
+
+  // One refresh at a time: concurrent 401s all wait for the same request
+  let refreshing = null;
+
+  function refreshAccessToken() {
+    const refreshToken = localStorage.getItem("refresh_token");
+    if (!refreshToken) return Promise.resolve(false);
+
+    if (!refreshing) {
+      refreshing = fetch("/api/token/refresh", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ refresh_token: refreshToken })
+      })
+        .then(async (res) => {
+          if (!res.ok) return false;
+          const data = await res.json();
+          localStorage.setItem("access_token", data.access_token);
+          return true;
+        })
+        .catch(() => false)
+        .finally(() => {
+          refreshing = null;
+        });
+    }
+    return refreshing;
+  }
+
+  // fetch() with the current access token. On a 401 the token is refreshed
+  // once with the stored refresh token and the request retried, so an
+  // expired access token does not force a new login.
+  window.authFetch = async function (url, options = {}) {
+    const send = () => fetch(url, {
+      ...options,
+      headers: {
+        ...(options.headers || {}),
+        Authorization: `Bearer ${localStorage.getItem("access_token")}`
+      }
+    });
+
+    let res = await send();
+    if (res.status === 401 && await refreshAccessToken()) {
+      res = await send();
+    }
+    return res;
+  };
 })();
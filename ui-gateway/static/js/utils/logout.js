@@ -1,15 +1,22 @@
 async function logout() {
   const token = localStorage.getItem("access_token");
+  const refreshToken = localStorage.getItem("refresh_token");
 
   try {
     await fetch("/api/logout", {
       method: "POST",
-      headers: token ? { Authorization: `Bearer ${token}` } : {}
+      headers: {
+        "Content-Type": "application/json",
+        ...(token ? { Authorization: `Bearer ${token}` } : {})
+      },
+      // Revoke the server-side refresh session as well
+      body: JSON.stringify(refreshToken ? { refresh_token: refreshToken } : {})
     });
   } catch (error) {
     console.error("Logout error:", error);
   } finally {
     localStorage.removeItem("access_token");
+    localStorage.removeItem("refresh_token");
     window.location.href = "/login";
   }
 }
@@ -0,0 +1,148 @@
+import io
+import gzip
+import zlib
+import struct
+import threading
+import pytest
+from flask import Flask, Response, jsonify, request, send_file
+from werkzeug.serving import make_server
+
+import app as gateway
+from listing_cache import dashboard_cache
+from upstream import files_upstream as make_files_upstream
+
+
+def png_bytes(width=4, height=4):
+    """
+    A valid grey PNG, built by hand so the tests need no image library.
+    """
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    rows = b"".join(b"\x00" + bytes(range(width)) for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+# Stored like file-service stores them: the image as is, the text gzipped
+STUB_FILES = {
+    "image": ("photo.png", "image/png", png_bytes(), None),
+    "text": ("notes.txt", "text/plain", b"hello gateway\n" * 500, "gzip"),
+}
+
+
+class StubUpstream:
+    """
+    A real HTTP server standing in for file-service, so requests go through
+    the gateway's pooled sessions and sockets for real.
+    """
+
+    def __init__(self):
+        self.app = Flask("stub-upstream")
+        self.calls = []
+        self.hold = threading.Event()
+        self.dashboard_status = 200
+        self.received = None
+        self._server = None
+        self._thread = None
+
+        @self.app.get("/headers")
+        def headers():
+            self.calls.append(request.path)
+            return jsonify({k.lower(): v for k, v in request.headers})
+
+        @self.app.get("/dashboard")
+        def dashboard():
+            self.calls.append(request.path)
+            if self.dashboard_status != 200:
+                return jsonify({"error": "Unavailable"}), self.dashboard_status
+            return jsonify({"files": [], "served": len(self.calls)}), 200
+
+        @self.app.post("/dashboard/upload")
+        def upload():
+            self.calls.append(request.path)
+            self.received = {
+                "headers": {k.lower(): v for k, v in request.headers},
+                "body": request.get_data(),
+            }
+            if request.args.get("fail"):
+                return jsonify({"error": "Invalid upload"}), 400
+            return jsonify({"file": {"id": 1}}), 201
+
+        @self.app.get("/dashboard/download/<name>")
+        def download(name):
+            self.calls.append(request.path)
+            if name not in STUB_FILES:
+                return jsonify({"error": "Not found"}), 404
+            filename, content_type, data, encoding = STUB_FILES[name]
+
+            if encoding == "gzip":
+                if "gzip" not in request.headers.get("Accept-Encoding", ""):
+                    # Served decompressed, without ranges
+                    response = send_file(io.BytesIO(data), mimetype=content_type, as_attachment=True,
+                                         download_name=filename, conditional=False)
+                    response.accept_ranges = "none"
+                    return response
+                data = gzip.compress(data, mtime=0)
+
+            response = send_file(io.BytesIO(data), mimetype=content_type, as_attachment=True,
+                                 download_name=filename, conditional=True, etag=f"{name}-v1")
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+                response.headers["Vary"] = "Accept-Encoding"
+            return response
+
+        @self.app.get("/dashboard/download/held")
+        def held_download():
+            self.calls.append(request.path)
+
+            def body():
+                yield b"first"
+                self.hold.wait(5)
+                yield b"rest"
+
+            return Response(body(), content_type="application/octet-stream")
+
+        @self.app.get("/dashboard/download/missing")
+        def missing_download():
+            self.calls.append(request.path)
+            return jsonify({"error": "Not found"}), 404
+
+    def start(self):
+        self._server = make_server("127.0.0.1", 0, self.app, threaded=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def stop(self):
+        self.hold.set()
+        self._server.shutdown()
+        self._thread.join()
+
+
+@pytest.fixture
+def stub():
+    stub = StubUpstream()
+    stub.url = stub.start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def files_upstream(stub, monkeypatch):
+    upstream = make_files_upstream(stub.url)
+    monkeypatch.setattr(gateway, "FILES_UPSTREAM", upstream)
+    return upstream
+
+
+@pytest.fixture
+def client(files_upstream):
+    dashboard_cache.clear()
+    gateway.app.config["TESTING"] = True
+    yield gateway.app.test_client()
+    dashboard_cache.clear()
@@ -0,0 +1,95 @@
+import json
+import time
+import base64
+import listing_cache
+from app import DASHBOARD_VERSION_COOKIE
+
+
+def _token(user_id=1, exp=None):
+    """
+    An unsigned JWT: the stub upstream accepts any token, and the gateway
+    only reads claims from tokens the upstream accepted.
+    """
+    def segment(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+
+    claims = {"sub": str(user_id), "exp": exp if exp is not None else time.time() + 300}
+    return f"{segment({'alg': 'none'})}.{segment(claims)}.sig"
+
+
+def _headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_listing_is_served_from_cache_after_a_200(client, stub):
+    headers = _headers(_token())
+
+    first = client.get("/files/dashboard", headers=headers)
+    second = client.get("/files/dashboard", headers=headers)
+
+    assert stub.calls == ["/dashboard"]
+    assert second.status_code == first.status_code == 200
+    assert second.get_json() == first.get_json() == {"files": [], "served": 1}
+    assert second.headers["Content-Type"] == first.headers["Content-Type"]
+
+    # Another token of the same user never reads this one's entry
+    client.get("/files/dashboard", headers=_headers(_token(exp=time.time() + 301)))
+    assert len(stub.calls) == 2
+
+
+def test_non_200_listing_is_not_cached(client, stub):
+    headers = _headers(_token())
+    stub.dashboard_status = 503
+
+    assert client.get("/files/dashboard", headers=headers).status_code == 503
+    stub.dashboard_status = 200
+    assert client.get("/files/dashboard", headers=headers).status_code == 200
+    assert len(stub.calls) == 2
+
+
+def test_write_invalidates_the_user_and_bumps_the_version_cookie(client, stub):
+    import app as gateway
+
+    # Another user, in another browser (so without the bumped cookie)
+    other_client = gateway.app.test_client()
+    headers = _headers(_token(user_id=1))
+    other = _headers(_token(user_id=2))
+    client.get("/files/dashboard", headers=headers)
+    other_client.get("/files/dashboard", headers=other)
+
+    # A rejected write changes nothing
+    failed = client.post("/files/dashboard/upload?fail=1", headers=headers)
+    assert failed.status_code == 400
+    assert DASHBOARD_VERSION_COOKIE not in failed.headers.get("Set-Cookie", "")
+
+    resp = client.post("/files/dashboard/upload", headers=headers)
+    assert resp.status_code == 201
+    cookie = resp.headers["Set-Cookie"]
+    assert cookie.startswith(f"{DASHBOARD_VERSION_COOKIE}=")
+    assert "Path=/files/dashboard" in cookie
+    assert "HttpOnly" in cookie
+
+    # Dropped in this worker even for a request without the new cookie
+    # (e.g. the same user on another device)...
+    calls = len(stub.calls)
+    gateway.app.test_client().get("/files/dashboard", headers=headers)
+    assert len(stub.calls) == calls + 1
+
+    # ...while other users keep theirs
+    other_client.get("/files/dashboard", headers=other)
+    assert len(stub.calls) == calls + 1
+
+
+def test_entry_never_outlives_the_token(client, stub, monkeypatch):
+    now = time.time()
+    monkeypatch.setattr(listing_cache.time, "time", lambda: now)
+    headers = _headers(_token(exp=now + 2))
+
+    client.get("/files/dashboard", headers=headers)
+    client.get("/files/dashboard", headers=headers)
+    assert len(stub.calls) == 1
+
+    # Well within the cache TTL, but past the token's exp
+    monkeypatch.setattr(listing_cache.time, "time", lambda: now + 3)
+    client.get("/files/dashboard", headers=headers)
+    assert len(stub.calls) == 2
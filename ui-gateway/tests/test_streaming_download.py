@@ -0,0 +1,65 @@
+import gzip
+from conftest import STUB_FILES
+
+
+def _download(client, name, **headers):
+    return client.get(f"/files/dashboard/download/{name}", headers=headers)
+
+
+def test_png_passes_through_byte_for_byte(client):
+    _, _, data, _ = STUB_FILES["image"]
+
+    resp = _download(client, "image")
+
+    assert resp.status_code == 200
+    assert resp.data == data
+    assert resp.headers["Content-Type"] == "image/png"
+    assert resp.headers["Content-Length"] == str(len(data))
+    assert resp.headers["Content-Disposition"] == "attachment; filename=photo.png"
+    assert resp.headers["X-Content-Type-Options"] == "nosniff"
+    assert resp.headers["Content-Security-Policy"] == "sandbox"
+
+
+def test_gzip_stored_text_stays_compressed_for_a_gzip_client(client):
+    _, _, data, _ = STUB_FILES["text"]
+
+    resp = _download(client, "text", **{"Accept-Encoding": "gzip"})
+
+    assert resp.status_code == 200
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert resp.headers["Content-Length"] == str(len(resp.data))
+    assert len(resp.data) < len(data)
+    assert gzip.decompress(resp.data) == data
+    assert resp.headers["Content-Disposition"] == "attachment; filename=notes.txt"
+
+
+def test_client_without_gzip_gets_plain_text(client):
+    _, _, data, _ = STUB_FILES["text"]
+
+    resp = _download(client, "text")
+
+    assert resp.status_code == 200
+    assert "Content-Encoding" not in resp.headers
+    assert resp.headers["Accept-Ranges"] == "none"
+    assert resp.data == data
+
+
+def test_range_request_passes_through(client):
+    _, _, data, _ = STUB_FILES["image"]
+
+    resp = _download(client, "image", Range="bytes=8-23")
+
+    assert resp.status_code == 206
+    assert resp.headers["Content-Range"] == f"bytes 8-23/{len(data)}"
+    assert resp.data == data[8:24]
+
+
+def test_conditional_request_gets_304(client):
+    first = _download(client, "image")
+    etag = first.headers["ETag"]
+
+    resp = _download(client, "image", **{"If-None-Match": etag})
+
+    assert resp.status_code == 304
+    assert resp.data == b""
+    assert resp.headers["ETag"] == etag
@@ -0,0 +1,73 @@
+import os
+import io
+import app as gateway
+
+BOUNDARY = "----gatewaytestboundary7MA4YWxkTrZu0gW"
+
+
+def _multipart(filename, data, boundary=BOUNDARY):
+    return (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+
+
+def test_multipart_upload_reaches_upstream_byte_for_byte(client, stub):
+    # Every byte value, including CR/LF runs and dashes that look like a boundary
+    data = bytes(range(256)) * 64 + b"\r\n--" + os.urandom(4096)
+    body = _multipart("blob.bin", data)
+    content_type = f"multipart/form-data; boundary={BOUNDARY}"
+
+    resp = client.post("/files/dashboard/upload", data=body, content_type=content_type)
+
+    assert resp.status_code == 201
+    assert stub.received["body"] == body
+    assert stub.received["headers"]["content-type"] == content_type
+    assert stub.received["headers"]["content-length"] == str(len(body))
+    assert "transfer-encoding" not in stub.received["headers"]
+
+
+def test_body_over_the_limit_is_refused_before_upstream(client, stub, monkeypatch):
+    monkeypatch.setattr(gateway, "MAX_PROXY_BODY_BYTES", 1024)
+    body = _multipart("big.bin", b"x" * 2048)
+
+    resp = client.post(
+        "/files/dashboard/upload", data=body, content_type=f"multipart/form-data; boundary={BOUNDARY}"
+    )
+
+    assert resp.status_code == 413
+    assert stub.calls == []
+
+
+def test_chunked_body_without_length_is_refused(client, stub):
+    body = _multipart("a.txt", b"hello")
+
+    resp = client.post(
+        "/files/dashboard/upload",
+        input_stream=io.BytesIO(body),
+        content_type=f"multipart/form-data; boundary={BOUNDARY}",
+        headers={"Transfer-Encoding": "chunked"},
+    )
+
+    assert resp.status_code == 411
+    assert stub.calls == []
+
+
+def test_multipart_without_boundary_is_refused(client, stub):
+    resp = client.post("/files/dashboard/upload", data=_multipart("a.txt", b"hello"), content_type="multipart/form-data")
+
+    assert resp.status_code == 400
+    assert stub.calls == []
+
+
+def test_expect_header_is_not_forwarded(client, stub):
+    resp = client.post(
+        "/files/dashboard/upload",
+        data=_multipart("a.txt", b"hello"),
+        content_type=f"multipart/form-data; boundary={BOUNDARY}",
+        headers={"Expect": "100-continue"},
+    )
+
+    assert resp.status_code == 201
+    assert "expect" not in stub.received["headers"]
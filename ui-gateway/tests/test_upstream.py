@@ -0,0 +1,92 @@
+from prometheus_client import REGISTRY
+from upstream import Upstream
+
+
+def _exhausted():
+    return REGISTRY.get_sample_value("gateway_upstream_pool_exhausted_total", {"upstream": "files"}) or 0
+
+
+def test_requests_reuse_one_pooled_connection(client, files_upstream):
+    for _ in range(3):
+        assert client.get("/files/headers").status_code == 200
+
+    opened, sent, in_use, idle = files_upstream.stats()
+    assert (opened, sent, in_use, idle) == (1, 3, 0, 1)
+    assert files_upstream.in_flight() == 0
+
+
+def test_hop_by_hop_headers_are_not_forwarded(client):
+    forwarded = client.get("/files/headers", headers={"TE": "trailers", "Upgrade": "h2c", "X-Trace": "1"}).get_json()
+
+    assert "te" not in forwarded
+    assert "upgrade" not in forwarded
+    assert forwarded["x-trace"] == "1"
+
+
+def test_streamed_download_is_in_flight_until_its_body_is_closed(client, stub, files_upstream):
+    resp = client.get("/files/dashboard/download/held", buffered=False)
+    assert resp.status_code == 200
+
+    # Headers are back, but the body (and its connection) is still in use
+    chunks = iter(resp.response)
+    assert next(chunks) == b"first"
+    assert files_upstream.in_flight() == 1
+    assert files_upstream.stats()[2] == 1
+
+    stub.hold.set()
+    assert b"".join(chunks) == b"rest"
+    resp.close()
+    assert files_upstream.in_flight() == 0
+    assert files_upstream.stats()[2] == 0
+
+
+def test_client_leaving_before_the_body_releases_the_request(client, files_upstream):
+    resp = client.get("/files/dashboard/download/held", buffered=False)
+    assert files_upstream.in_flight() == 1
+
+    # Never iterated: the WSGI server only calls close()
+    resp.close()
+    assert files_upstream.in_flight() == 0
+
+
+def test_json_error_on_a_stream_path_is_released(client, files_upstream):
+    resp = client.get("/files/dashboard/download/missing")
+    assert resp.status_code == 404
+    assert resp.get_json() == {"error": "Not found"}
+    assert files_upstream.in_flight() == 0
+
+
+def test_requests_past_the_pool_size_count_as_exhaustion(client, stub, files_upstream):
+    files_upstream.pool_size = 1
+    before = _exhausted()
+
+    held = client.get("/files/dashboard/download/held", buffered=False)
+    assert _exhausted() == before
+
+    assert client.get("/files/headers").status_code == 200
+    assert _exhausted() == before + 1
+
+    stub.hold.set()
+    held.get_data()
+    held.close()
+    assert files_upstream.in_flight() == 0
+
+
+def test_unreachable_upstream_returns_503(client, monkeypatch):
+    import app as gateway
+
+    down = Upstream("files", "http://127.0.0.1:9", default_timeout=(0.5, 0.5))
+    monkeypatch.setattr(gateway, "FILES_UPSTREAM", down)
+
+    assert client.get("/files/headers").status_code == 503
+    assert down.in_flight() == 0
+
+
+def test_bulk_user_import_gets_a_longer_read_timeout():
+    from upstream import auth_upstream
+
+    auth = auth_upstream("http://auth:5000/api")
+
+    assert auth.timeout_for("login") == (2, 10)
+    assert auth.timeout_for("admin/users/import") == (2, 300)
+    assert auth.timeout_for("admin/users/import/extra") == (2, 10)
@@ -0,0 +1,328 @@
+import os
+import re
+import threading
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from prometheus_client import Counter, Gauge, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+
+def _event_loop_worker():
+    """
+    True under gunicorn's gevent worker, which patches sockets (and so
+    requests, urllib3 and their pools) to be cooperative before the app is
+    imported.
+    """
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("socket")
+
+
+def _default_pool_size():
+    if _event_loop_worker():
+        return os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000")
+    return os.getenv("GUNICORN_THREADS", "16")
+
+
+# Connections kept open per upstream, per worker process: one per request
+# the worker can have in flight (greenlets under gevent, else threads)
+UPSTREAM_POOL_SIZE = int(os.getenv("UPSTREAM_POOL_SIZE", _default_pool_size()))
+
+# Hop-by-hop headers describe the browser's connection to us, not ours to
+# the upstream; a forwarded "Connection: close" would kill a pooled socket
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "trailers", "transfer-encoding", "upgrade", "expect",
+}
+
+# Response headers a streamed download keeps; everything else (hop-by-hop,
+# upstream server details, cookies) is dropped
+STREAMED_RESPONSE_HEADERS = {
+    "content-type", "content-length", "content-disposition", "content-encoding",
+    "content-range", "accept-ranges", "etag", "last-modified", "cache-control",
+    "expires", "vary",
+}
+
+# Body chunk size for streamed responses
+STREAM_CHUNK_SIZE = int(os.getenv("GATEWAY_STREAM_CHUNK_SIZE", str(64 * 1024)))
+
+UPSTREAM_IN_FLIGHT = Gauge(
+    "gateway_upstream_requests_in_flight",
+    "Proxied requests currently waiting on an upstream",
+    ["upstream"],
+)
+UPSTREAM_POOL_EXHAUSTED = Counter(
+    "gateway_upstream_pool_exhausted_total",
+    "Proxied requests started while every pooled connection was busy "
+    "(served on a throwaway connection)",
+    ["upstream"],
+)
+
+
+def _timeout_env(name, default):
+    return float(os.getenv(name, default))
+
+
+class Upstream:
+    """
+    One backend service behind the gateway, with its own pooled,
+    keep-alive `requests.Session`.
+
+    - `timeouts` is a list of (path regex, (connect, read)); the first match
+      wins, otherwise `default_timeout` applies.
+    - Responses for paths matching one of `stream_paths` are passed through
+      as they arrive instead of being buffered (see `streams`).
+    - The session is built lazily per process: sockets inherited across
+      gunicorn's fork would be shared by every worker.
+    - The pool never blocks. Past `pool_size` concurrent requests, extra
+      connections are opened and closed after use, and counted as pool
+      exhaustion.
+    - A `stream=True` request stays in flight after `request` returns,
+      until the caller calls `release` (see `UpstreamBody`): its connection
+      is busy until the body has been read.
+    """
+
+    def __init__(self, name, base_url, default_timeout, timeouts=(), stream_paths=(), pool_size=UPSTREAM_POOL_SIZE):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.default_timeout = default_timeout
+        self.timeouts = [(re.compile(pattern), timeout) for pattern, timeout in timeouts]
+        self.stream_paths = [re.compile(pattern) for pattern in stream_paths]
+        self.pool_size = pool_size
+
+        self._lock = threading.Lock()
+        self._session = None
+        self._pid = None
+        self._in_flight = 0
+
+    def session(self):
+        with self._lock:
+            if self._session is None or self._pid != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=False)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+                self._pid = os.getpid()
+            return self._session
+
+    def timeout_for(self, path):
+        for pattern, timeout in self.timeouts:
+            if pattern.match(path):
+                return timeout
+        return self.default_timeout
+
+    def streams(self, path):
+        return any(pattern.match(path) for pattern in self.stream_paths)
+
+    def _pools(self):
+        """
+        The urllib3 pools behind the session (one per upstream host), empty
+        before first use in this process.
+        """
+        with self._lock:
+            session = self._session if self._pid == os.getpid() else None
+        if session is None:
+            return []
+
+        pools = session.get_adapter(self.base_url).poolmanager.pools
+        found = []
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None and pool.pool is not None:
+                found.append(pool)
+        return found
+
+    def stats(self):
+        """
+        Returns (connections opened, requests sent, connections in use,
+        idle connections) for this process.
+        """
+        opened = sent = in_use = idle = 0
+        for pool in self._pools():
+            opened += pool.num_connections
+            sent += pool.num_requests
+            # The queue holds idle connections, plus None placeholders for
+            # slots that were never filled or whose connection is checked out
+            queued = list(pool.pool.queue)
+            in_use += pool.pool.maxsize - len(queued)
+            idle += sum(1 for conn in queued if conn is not None)
+        return opened, sent, in_use, idle
+
+    def in_flight(self):
+        with self._lock:
+            return self._in_flight
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+        UPSTREAM_IN_FLIGHT.labels(self.name).dec()
+
+    def request(self, method, path, stream=False, **kwargs):
+        session = self.session()
+        with self._lock:
+            self._in_flight += 1
+            exhausted = self._in_flight > self.pool_size
+        if exhausted:
+            UPSTREAM_POOL_EXHAUSTED.labels(self.name).inc()
+
+        UPSTREAM_IN_FLIGHT.labels(self.name).inc()
+        try:
+            resp = session.request(
+                method=method,
+                url=f"{self.base_url}/{path.lstrip('/')}",
+                timeout=self.timeout_for(path),
+                stream=stream,
+                **kwargs,
+            )
+        except BaseException:
+            self.release()
+            raise
+
+        if not stream:
+            self.release()
+        return resp
+
+
+class StreamedBody:
+    """
+    The incoming request body as `requests` sees it. Having a length makes
+    requests send it with that Content-Length (not chunked), reading one
+    block at a time as the upstream socket accepts it.
+    """
+
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+
+class UpstreamBody:
+    """
+    A streamed upstream response body, passed on as it arrives and still
+    content-encoded.
+
+    The WSGI server calls `close` when the body is done, or when the client
+    goes away, even before the first chunk. That hands the connection back
+    to the pool and ends the request's in-flight accounting (`on_close`).
+    """
+
+    def __init__(self, resp, on_close=None, chunk_size=STREAM_CHUNK_SIZE):
+        self.resp = resp
+        self.on_close = on_close
+        self.chunk_size = chunk_size
+        self._closed = False
+
+    def __iter__(self):
+        try:
+            yield from self.resp.raw.stream(self.chunk_size, decode_content=False)
+        except (requests.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
+            # Headers are already sent; all we can do is cut the body short
+            print("PROXY STREAM ERROR:", repr(e))
+        finally:
+            self.close()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.resp.close()
+        finally:
+            if self.on_close is not None:
+                self.on_close()
+
+
+def streamed_response_headers(resp):
+    headers = [(k, v) for k, v in resp.headers.items() if k.lower() in STREAMED_RESPONSE_HEADERS]
+    # Uploaded content is served from the gateway's origin: never let the
+    # browser sniff it into HTML or run it as a page
+    headers.append(("X-Content-Type-Options", "nosniff"))
+    headers.append(("Content-Security-Policy", "sandbox"))
+    return headers
+
+
+class UpstreamPoolCollector:
+    """
+    Exports urllib3's own pool counters at scrape time, so the request path
+    pays nothing for them. Reuse rate is
+    1 - connections_opened_total / requests_total.
+    """
+
+    def __init__(self, upstreams):
+        self.upstreams = upstreams
+
+    def collect(self):
+        size = GaugeMetricFamily(
+            "gateway_upstream_pool_size", "Keep-alive connections kept per upstream", labels=["upstream"]
+        )
+        in_use = GaugeMetricFamily(
+            "gateway_upstream_pool_connections_in_use", "Pooled connections checked out", labels=["upstream"]
+        )
+        idle = GaugeMetricFamily(
+            "gateway_upstream_pool_connections_idle", "Open connections waiting for reuse", labels=["upstream"]
+        )
+        opened = CounterMetricFamily(
+            "gateway_upstream_connections_opened", "New TCP connections opened to an upstream", labels=["upstream"]
+        )
+        sent = CounterMetricFamily(
+            "gateway_upstream_requests", "Requests sent to an upstream", labels=["upstream"]
+        )
+
+        for upstream in self.upstreams:
+            num_connections, num_requests, checked_out, waiting = upstream.stats()
+            size.add_metric([upstream.name], upstream.pool_size)
+            in_use.add_metric([upstream.name], checked_out)
+            idle.add_metric([upstream.name], waiting)
+            opened.add_metric([upstream.name], num_connections)
+            sent.add_metric([upstream.name], num_requests)
+
+        yield from (size, in_use, idle, opened, sent)
+
+
+def register_pool_metrics(upstreams, registry=REGISTRY):
+    registry.register(UpstreamPoolCollector(upstreams))
+
+
+# Matches the bulk user import, which hashes whole batches of passwords
+# before it sends its first response byte
+AUTH_IMPORT_PATHS = r"^admin/users/import$"
+
+# Matches paths that move whole files, which need a longer read timeout
+FILE_TRANSFER_PATHS = r"^dashboard/(upload|uploads/.+|download(/.*)?)$"
+
+# Matches paths whose response is file content, streamed through as is
+FILE_CONTENT_PATHS = r"^dashboard/(download(/.*)?|thumbnail/.+)$"
+
+
+def auth_upstream(base_url):
+    connect = _timeout_env("AUTH_CONNECT_TIMEOUT", "2")
+    return Upstream(
+        "auth",
+        base_url,
+        default_timeout=(connect, _timeout_env("AUTH_READ_TIMEOUT", "10")),
+        timeouts=[
+            (AUTH_IMPORT_PATHS, (connect, _timeout_env("AUTH_IMPORT_READ_TIMEOUT", "300"))),
+        ],
+    )
+
+
+def files_upstream(base_url):
+    connect = _timeout_env("FILES_CONNECT_TIMEOUT", "2")
+    return Upstream(
+        "files",
+        base_url,
+        default_timeout=(connect, _timeout_env("FILES_READ_TIMEOUT", "10")),
+        timeouts=[
+            (FILE_TRANSFER_PATHS, (connect, _timeout_env("FILES_TRANSFER_READ_TIMEOUT", "120"))),
+        ],
+        stream_paths=[FILE_CONTENT_PATHS],
+    )